@@ -0,0 +1,214 @@
+"""
+ASGI entry point.
+
+The Hugging Face analysis endpoints are served natively on the event loop
+by AsyncHuggingFaceAnalyzer, so one process can keep hundreds of inference
+calls in flight. Every other route (transcription, jobs, stats, ...) is
+delegated to the Flask app through a WSGI bridge whose thread pool keeps
+CPU-bound work off the loop.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 7860
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+from contextlib import aclosing, asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+from modules.utils import LOGGER, validate_api_key
+from modules.async_analyzer import close_async_analyzer, get_async_huggingface_analyzer
+from modules.single_flight import get_single_flight
+from modules.long_audio import shutdown_pools
+from server import (
+    _stream_frame,
+    app as flask_app,
+    calculate_compatibility,
+    generate_recommendations,
+    start_background_services,
+    validate_question_list,
+)
+
+Handler = Callable[[Request], Awaitable[JSONResponse]]
+
+
+def _requires_api_key(handler: Handler) -> Handler:
+    async def wrapper(request: Request) -> JSONResponse:
+        if not validate_api_key(request.headers):
+            return JSONResponse({"error": True, "message": "Unauthorized"}, status_code=401)
+        return await handler(request)
+    return wrapper
+
+
+async def _json_body(request: Request) -> Any:
+    try:
+        return await request.json()
+    except Exception:
+        return None
+
+
+@_requires_api_key
+async def api_generate(request: Request) -> Response:
+    try:
+        data = await _json_body(request)
+        if not data or "prompt" not in data:
+            return JSONResponse({"error": True, "message": "No prompt provided"}, status_code=400)
+        analyzer = get_async_huggingface_analyzer()
+        if data.get("stream") or request.query_params.get("stream", "").lower() == "true":
+            return _generation_stream(request, analyzer.stream_text_async(data["prompt"], data.get("options", {})))
+        result = await analyzer.generate_text_async(data["prompt"], data.get("options", {}))
+        return JSONResponse({"success": True, "response": result})
+    except Exception as e:
+        LOGGER.error(f"Generation error: {e}")
+        return JSONResponse({"error": True, "message": str(e)}, status_code=500)
+
+
+def _generation_stream(request: Request, tokens: AsyncIterator[str]) -> StreamingResponse:
+    fmt = request.query_params.get("format", "").lower()
+    sse = fmt == "sse" if fmt else "text/event-stream" in request.headers.get("accept", "")
+
+    async def frames() -> AsyncIterator[str]:
+        # Starlette cancels or abandons this generator when the client goes away;
+        # aclosing() then closes `tokens`, which drops the upstream connection.
+        async with aclosing(tokens):
+            texts = []
+            try:
+                async for text in tokens:
+                    texts.append(text)
+                    yield _stream_frame("token", {"text": text}, sse)
+                yield _stream_frame("done", {"success": True, "response": "".join(texts)}, sse)
+            except Exception as e:
+                LOGGER.error(f"Streaming generation error: {e}")
+                yield _stream_frame("error", {"success": False, "message": str(e), "response": "".join(texts)}, sse)
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _single_analysis(namespace: str, field: str, missing: str, label: str,
+                     analyze: Callable[[Any], Awaitable[Dict[str, Any]]]) -> Handler:
+    @_requires_api_key
+    async def endpoint(request: Request) -> JSONResponse:
+        try:
+            data = await _json_body(request)
+            if not data or field not in data:
+                return JSONResponse({"error": True, "message": missing}, status_code=400)
+            analysis = await get_single_flight().do_async(namespace, data[field], lambda: analyze(data[field]))
+            return JSONResponse({"success": True, "analysis": analysis})
+        except Exception as e:
+            LOGGER.error(f"{label} error: {e}")
+            return JSONResponse({"error": True, "message": str(e)}, status_code=500)
+    return endpoint
+
+
+@_requires_api_key
+async def api_analyze_questions(request: Request) -> JSONResponse:
+    try:
+        questions, error = validate_question_list(await _json_body(request))
+        if error:
+            return JSONResponse({"error": True, "message": error}, status_code=400)
+        analyses = await get_single_flight().do_async(
+            "analyze-questions", questions, lambda: get_async_huggingface_analyzer().analyze_questions_async(questions)
+        )
+        return JSONResponse({"success": True, "analyses": analyses})
+    except Exception as e:
+        LOGGER.error(f"Questions analysis error: {e}")
+        return JSONResponse({"error": True, "message": str(e)}, status_code=500)
+
+
+async def _comprehensive_analysis(data: Dict[str, Any]) -> Dict[str, Any]:
+    analyzer = get_async_huggingface_analyzer()
+    tasks: Dict[str, Awaitable[Dict[str, Any]]] = {}
+    if "cv_text" in data:
+        tasks["cv"] = analyzer.analyze_cv_text_async(data["cv_text"])
+    if "job_description" in data:
+        tasks["job"] = analyzer.analyze_job_description_async(data["job_description"])
+    if "transcript" in data:
+        tasks["transcript"] = analyzer.refine_transcript_async(data["transcript"])
+    results = dict(zip(tasks, await asyncio.gather(*tasks.values())))
+
+    cv_analysis = results.get("cv", {})
+    job_analysis = results.get("job", {})
+    transcript_analysis = results.get("transcript", {})
+    compatibility_score = 0
+    if cv_analysis and job_analysis:
+        # embedding calls are blocking; keep them off the event loop
+        compatibility_score = await asyncio.to_thread(calculate_compatibility, cv_analysis, job_analysis)
+    return {
+        "success": True,
+        "comprehensive_analysis": {
+            "cv_analysis": cv_analysis,
+            "job_analysis": job_analysis,
+            "transcript_analysis": transcript_analysis,
+            "compatibility_score": compatibility_score,
+            "recommendations": generate_recommendations(cv_analysis, job_analysis, transcript_analysis),
+        },
+    }
+
+
+@_requires_api_key
+async def api_comprehensive_analysis(request: Request) -> JSONResponse:
+    try:
+        data = await _json_body(request)
+        if not data:
+            return JSONResponse({"error": True, "message": "No data provided"}, status_code=400)
+
+        body = await get_single_flight().do_async(
+            "comprehensive-analysis", data, lambda: _comprehensive_analysis(data)
+        )
+        return JSONResponse(body)
+    except Exception as e:
+        LOGGER.error(f"Comprehensive analysis error: {e}")
+        return JSONResponse({"error": True, "message": str(e)}, status_code=500)
+
+
+@_requires_api_key
+async def api_analyzer_async_stats(request: Request) -> JSONResponse:
+    return JSONResponse({"success": True, "async": get_async_huggingface_analyzer().async_stats()})
+
+
+@asynccontextmanager
+async def _lifespan(_app: Starlette) -> AsyncIterator[None]:
+    await asyncio.to_thread(start_background_services)
+    yield
+    await close_async_analyzer()
+    shutdown_pools()
+
+
+def _analyze(method: str) -> Callable[[Any], Awaitable[Dict[str, Any]]]:
+    return lambda value: getattr(get_async_huggingface_analyzer(), method)(value)
+
+
+routes = [
+    Route("/api/generate", api_generate, methods=["POST"]),
+    Route("/api/analyze-question", _single_analysis(
+        "analyze-question", "question", "No question provided", "Question analysis", _analyze("analyze_question_async")), methods=["POST"]),
+    Route("/api/analyze-questions", api_analyze_questions, methods=["POST"]),
+    Route("/api/analyze-cv", _single_analysis(
+        "analyze-cv", "cv_text", "No CV text provided", "CV analysis", _analyze("analyze_cv_text_async")), methods=["POST"]),
+    Route("/api/analyze-job", _single_analysis(
+        "analyze-job", "job_description", "No job description provided", "Job analysis",
+        _analyze("analyze_job_description_async")), methods=["POST"]),
+    Route("/api/comprehensive-analysis", api_comprehensive_analysis, methods=["POST"]),
+    Route("/api/analyzer/async-stats", api_analyzer_async_stats, methods=["GET"]),
+    # Everything else (transcription, jobs, health, ...) runs in the Flask app on worker threads.
+    Mount("/", app=WSGIMiddleware(flask_app, workers=int(os.getenv("ASGI_WSGI_THREADS", "10")))),
+]
+
+# Same policy as flask_cors on the Flask app (CORS_ORIGIN, all methods and headers), applied to
+# every route here; for the mounted Flask routes these headers replace flask_cors' identical ones.
+_cors_origins = [origin.strip() for origin in os.getenv("CORS_ORIGIN", "*").split(",") if origin.strip()]
+middleware = [Middleware(CORSMiddleware, allow_origins=_cors_origins, allow_methods=["*"], allow_headers=["*"])]
+
+app = Starlette(routes=routes, middleware=middleware, lifespan=_lifespan)
@@ -0,0 +1,321 @@
+"""
+Local stand-in for the Hugging Face Inference API, for load tests that must
+not spend quota and must be reproducible.
+
+Answers POST /models/<model id> with the response shapes HuggingFaceAnalyzer
+parses (zero-shot labels/scores, summary_text, sentiment label lists,
+generated_text, sentence embeddings), after a latency drawn from a configurable distribution,
+and fails a configurable fraction of calls. Point the ai-server at it with
+HF_INFERENCE_ENDPOINT:
+
+    python -m benchmarks.hf_stub --port 8500 --latency lognormal:0.3,0.4 --error-rate 0.01
+    HF_INFERENCE_ENDPOINT=http://127.0.0.1:8500 HF_CACHE_ENABLED=false python server.py
+
+Latency specs: fixed:S, uniform:LOW,HIGH, normal:MEAN,STD, lognormal:MEDIAN,SIGMA
+(seconds). --task-latency overrides them per task (zero_shot, summary,
+sentiment, generation, embedding). Generation requests with "stream": true are answered
+as server-sent token events, --token-latency apart; streams the client drops
+are counted as cancelled. GET /stats returns call, error and latency
+counters; POST /stats/reset clears them.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+TASKS = ("zero_shot", "summary", "sentiment", "generation", "embedding")
+
+_EMBEDDING_DIM = 384
+
+# Responses that are 503 on the real API send huggingface_hub into a retry loop, so
+# failures default to 500; --error-status 503 reproduces that behaviour on purpose.
+_ERROR_BODIES = {
+    429: {"error": "Rate limit reached. Please log in or use a HF access token"},
+    500: {"error": "Internal Server Error"},
+    503: {"error": "Model is currently loading", "estimated_time": 20.0},
+}
+
+_SENTIMENT_LABELS = ("positive", "neutral", "negative")
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Turn a latency spec into a sampler of seconds (never negative).
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()]
+    kind = kind.strip().lower()
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(values[0]) if values[0] > 0 else 0.0
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    raise argparse.ArgumentTypeError(f"bad latency spec: {spec!r}")
+
+
+def detect_task(model: str, payload: Dict[str, Any]) -> str:
+    params = payload.get("parameters") or {}
+    if not isinstance(params, dict):
+        params = {}
+    if "candidate_labels" in params:
+        return "zero_shot"
+    if any(marker in model.lower() for marker in ("sentence-transformers", "minilm", "embed", "bge", "e5-")):
+        return "embedding"
+    if "sentiment" in model:
+        return "sentiment"
+    if "max_new_tokens" in params or "temperature" in params:
+        return "generation"
+    if "max_length" in params or "min_length" in params or "cnn" in model or "summar" in model:
+        return "summary"
+    if not params:
+        return "sentiment"
+    return "generation"
+
+
+def _scores(rng: random.Random, count: int) -> List[float]:
+    raw = [rng.random() + 1e-6 for _ in range(count)]
+    total = sum(raw)
+    return sorted((r / total for r in raw), reverse=True)
+
+
+def stream_tokens(payload: Dict[str, Any]) -> List[str]:
+    """
+    The generation reply split into the token texts a streaming server would send.
+    """
+    text = respond("generation", payload, random.Random(0))[0]["generated_text"]
+    words = text.split(" ")
+    return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+
+def embed(text: str) -> List[float]:
+    """
+    Hashed bag-of-words vector: deterministic, and texts sharing words come out similar.
+    """
+    vector = [0.0] * _EMBEDDING_DIM
+    for word in str(text).lower().split():
+        digest = hashlib.md5(word.strip(".,;:()").encode("utf-8")).digest()
+        vector[int.from_bytes(digest[:4], "little") % _EMBEDDING_DIM] += 1.0 if digest[4] & 1 else -1.0
+    return vector
+
+
+def respond(task: str, payload: Dict[str, Any], rng: random.Random) -> Any:
+    """
+    A response shaped like the Inference API's for this task; list inputs get one result each.
+    """
+    inputs = payload.get("inputs", "")
+    params = payload.get("parameters") or {}
+    batch = inputs if isinstance(inputs, list) else [inputs]
+
+    def one(text: str) -> Any:
+        if task == "zero_shot":
+            labels = list(params.get("candidate_labels") or [])
+            rng.shuffle(labels)
+            return {"sequence": text, "labels": labels, "scores": _scores(rng, len(labels))}
+        if task == "sentiment":
+            labels = list(_SENTIMENT_LABELS)
+            rng.shuffle(labels)
+            return [{"label": label, "score": score} for label, score in zip(labels, _scores(rng, len(labels)))]
+        if task == "embedding":
+            return embed(text)
+        if task == "summary":
+            words = str(text).split()
+            return {"summary_text": " ".join(words[:max(5, min(len(words), int(params.get("max_length", 60)) // 2))])}
+        return {"generated_text": f"{text} This is a generated reply from the local stub."}
+
+    results = [one(text) for text in batch]
+    if isinstance(inputs, list):
+        return results
+    if task in ("zero_shot", "embedding"):
+        return results[0]
+    return [results[0]]
+
+
+class StubState:
+    def __init__(self, latency: Callable[[random.Random], float], task_latency: Dict[str, Callable[[random.Random], float]],
+                 error_rate: float, error_status: int, seed: int, token_latency: float = 0.02) -> None:
+        self.latency = latency
+        self.token_latency = token_latency
+        self.task_latency = task_latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts: Dict[str, Dict[str, float]] = {
+                task: {"calls": 0, "errors": 0, "latency_seconds": 0.0} for task in TASKS
+            }
+            self.peak_in_flight = self.in_flight
+            self.streams = {"started": 0, "completed": 0, "cancelled": 0, "tokens": 0}
+
+    def count_stream(self, field: str, amount: int = 1) -> None:
+        with self._lock:
+            self.streams[field] += amount
+
+    def draw(self, task: str) -> tuple:
+        """
+        (delay seconds, fail?, per-response rng) drawn under the lock, so a seed gives one sequence.
+        """
+        with self._lock:
+            delay = self.task_latency.get(task, self.latency)(self._rng)
+            fail = self._rng.random() < self.error_rate
+            rng = random.Random(self._rng.random())
+            counts = self.counts[task]
+            counts["calls"] += 1
+            counts["errors"] += 1 if fail else 0
+            counts["latency_seconds"] += delay
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return delay, fail, rng
+
+    def done(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tasks": {
+                    task: {**c, "mean_latency": round(c["latency_seconds"] / c["calls"], 4) if c["calls"] else None}
+                    for task, c in self.counts.items()
+                },
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "streams": dict(self.streams),
+                "error_rate": self.error_rate,
+            }
+
+
+def make_handler(state: StubState) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+        def _send(self, status: int, body: Any) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _stream(self, payload: Dict[str, Any]) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            state.count_stream("started")
+            try:
+                for token in stream_tokens(payload):
+                    event = {"token": {"id": 0, "text": token, "logprob": 0.0, "special": False}, "generated_text": None}
+                    self.wfile.write(f"data:{json.dumps(event)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    state.count_stream("tokens")
+                    time.sleep(state.token_latency)
+                self.wfile.write(b'data:{"token": {"id": 2, "text": "</s>", "logprob": 0.0, "special": true}}\n\n')
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                state.count_stream("cancelled")
+                return
+            state.count_stream("completed")
+
+        def do_GET(self) -> None:
+            if self.path == "/stats":
+                self._send(200, state.stats())
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self) -> None:
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.path == "/stats/reset":
+                state.reset()
+                self._send(200, {"reset": True})
+                return
+            if not self.path.startswith("/models/"):
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                self._send(400, {"error": "invalid JSON"})
+                return
+            task = detect_task(self.path[len("/models/"):], payload)
+            delay, fail, rng = state.draw(task)
+            try:
+                time.sleep(delay)
+                if fail:
+                    self._send(state.error_status, _ERROR_BODIES.get(state.error_status, {"error": "stub failure"}))
+                elif task == "generation" and payload.get("stream"):
+                    self._stream(payload)
+                else:
+                    self._send(200, respond(task, payload, rng))
+            finally:
+                state.done()
+
+    return Handler
+
+
+def serve(host: str, port: int, state: StubState) -> ThreadingHTTPServer:
+    """
+    Start the stub on a daemon thread and return the server (port 0 picks a free port).
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="hf-stub", daemon=True).start()
+    return server
+
+
+def _task_latency(values: Sequence[str]) -> Dict[str, Callable[[random.Random], float]]:
+    overrides: Dict[str, Callable[[random.Random], float]] = {}
+    for item in values:
+        task, _, spec = item.partition("=")
+        if task not in TASKS:
+            raise argparse.ArgumentTypeError(f"unknown task {task!r}; expected one of {', '.join(TASKS)}")
+        overrides[task] = parse_latency(spec)
+    return overrides
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Local Hugging Face Inference API stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8500)
+    parser.add_argument("--latency", default="lognormal:0.3,0.4", help="default latency spec")
+    parser.add_argument("--task-latency", action="append", default=[], metavar="TASK=SPEC",
+                        help="per-task latency spec, e.g. summary=uniform:0.5,1.5 (repeatable)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls that fail")
+    parser.add_argument("--error-status", type=int, default=500, choices=sorted(_ERROR_BODIES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--token-latency", type=float, default=0.02, help="seconds between streamed tokens")
+    args = parser.parse_args(argv)
+
+    state = StubState(parse_latency(args.latency), _task_latency(args.task_latency),
+                      args.error_rate, args.error_status, args.seed, args.token_latency)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    server.daemon_threads = True
+    print(f"HF stub listening on http://{args.host}:{server.server_port} (HF_INFERENCE_ENDPOINT)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,314 @@
+"""
+End-to-end load generator for the ai-server.
+
+Sends a weighted mix of /api/comprehensive-analysis, /api/analyze-* and
+/api/transcribe requests at a target rate (open loop: arrivals do not wait
+for earlier responses) and reports p50/p95/p99 latency and throughput per
+endpoint as JSON. Latency is measured from each request's scheduled send
+time, so a saturated server shows up as queueing instead of a lower rate.
+
+Run it against a server whose Hugging Face calls go to the local stub:
+
+    python -m benchmarks.hf_stub --port 8500 &
+    HF_INFERENCE_ENDPOINT=http://127.0.0.1:8500 HF_CACHE_ENABLED=false python server.py &
+    python -m benchmarks.load_test --base-url http://127.0.0.1:5002 --rps 20 --duration 60 \\
+        --mix comprehensive=1,analyze-question=3,analyze-cv=1,analyze-job=1,transcribe=0.2 \\
+        --stub-url http://127.0.0.1:8500 --output load.json
+
+--distinct controls how many different payloads each endpoint cycles
+through (0 = every request unique), and so how often the response caches
+and request coalescing can help.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import requests
+
+from .transcribe_bench import generate_fixture
+
+_WORDS = (
+    "python docker kubernetes react team project delivered customers data pipeline api design testing "
+    "led migrated improved latency cloud aws security mentoring agile sprint stakeholders reporting "
+    "analytics database postgres redis queue service deployment monitoring incident review hiring"
+).split()
+
+_QUESTIONS = (
+    "Describe a time you resolved a conflict in your team.",
+    "How would you design a rate limiter for a public API?",
+    "What is your highest level of education?",
+    "How many years have you worked with Python?",
+    "Which programming languages are you most comfortable with?",
+    "Tell us about a project you are proud of.",
+)
+
+Request = Tuple[str, str, Dict[str, Any]]
+
+
+def _text(rng: random.Random, sentences: int) -> str:
+    return " ".join(
+        " ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 16))).capitalize() + "."
+        for _ in range(sentences)
+    )
+
+
+class PayloadFactory:
+    """
+    Request bodies for each scenario. Variant i of a scenario is always the same body,
+    so runs with the same seed send the same traffic.
+    """
+
+    def __init__(self, seed: int, distinct: int, audio_files: Sequence[str]) -> None:
+        self.seed = seed
+        self.distinct = distinct
+        self.audio_files = list(audio_files)
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def _variant(self, rng: random.Random) -> int:
+        if self.distinct > 0:
+            return rng.randrange(self.distinct)
+        with self._lock:
+            self._counter += 1
+            return self._counter
+
+    def build(self, scenario: str, rng: random.Random) -> Request:
+        variant = self._variant(rng)
+        body_rng = random.Random(f"{self.seed}:{scenario}:{variant}")
+        if scenario == "comprehensive":
+            return "POST", "/api/comprehensive-analysis", {"json": {
+                "cv_text": _text(body_rng, 12),
+                "job_description": {"title": _text(body_rng, 1), "description": _text(body_rng, 6)},
+                "transcript": _text(body_rng, 20),
+            }}
+        if scenario == "analyze-question":
+            return "POST", "/api/analyze-question", {"json": {
+                "question": f"{body_rng.choice(_QUESTIONS)} ({variant})"}}
+        if scenario == "analyze-questions":
+            return "POST", "/api/analyze-questions", {"json": {
+                "questions": [f"{body_rng.choice(_QUESTIONS)} ({variant}.{i})" for i in range(20)]}}
+        if scenario == "analyze-cv":
+            return "POST", "/api/analyze-cv", {"json": {"cv_text": _text(body_rng, 12)}}
+        if scenario == "analyze-job":
+            return "POST", "/api/analyze-job", {"json": {"job_description": _text(body_rng, 6)}}
+        if scenario == "transcribe":
+            path = self.audio_files[variant % len(self.audio_files)]
+            with open(path, "rb") as fh:
+                data = fh.read()
+            return "POST", "/api/transcribe", {"files": {"audio": (os.path.basename(path), data, "audio/wav")}}
+        raise ValueError(f"unknown scenario: {scenario}")
+
+
+SCENARIOS = ("comprehensive", "analyze-question", "analyze-questions", "analyze-cv", "analyze-job", "transcribe")
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if not name:
+            continue
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}; expected one of {', '.join(SCENARIOS)}")
+        mix[name] = float(weight) if weight.strip() else 1.0
+    if not mix or sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("the mix needs at least one scenario with a positive weight")
+    return mix
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None, "mean": None}
+    arr = np.asarray(values) * 1000.0
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 1),
+        "p95": round(float(p95), 1),
+        "p99": round(float(p99), 1),
+        "max": round(float(arr.max()), 1),
+        "mean": round(float(arr.mean()), 1),
+    }
+
+
+class LoadRun:
+    def __init__(self, base_url: str, api_key: str, timeout: float, max_in_flight: int) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"X-API-Key": api_key} if api_key else {}
+        self.timeout = timeout
+        self.pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="load")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.records: List[Dict[str, Any]] = []
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def send(self, scenario: str, request: Request, scheduled: float) -> None:
+        method, path, kwargs = request
+        started = time.perf_counter()
+        status: Any = None
+        ok = False
+        try:
+            response = self._session().request(method, self.base_url + path, headers=self.headers,
+                                               timeout=self.timeout, **kwargs)
+            status = response.status_code
+            ok = status == 200
+            if ok and response.headers.get("Content-Type", "").startswith("application/json"):
+                ok = response.json().get("success", True) is not False
+        except requests.Timeout:
+            status = "timeout"
+        except requests.RequestException as e:
+            status = type(e).__name__
+        finished = time.perf_counter()
+        with self._lock:
+            self.records.append({
+                "scenario": scenario,
+                "ok": ok,
+                "status": status,
+                "latency": finished - scheduled,
+                "service": finished - started,
+                "finished": finished,
+            })
+
+
+def run(args: argparse.Namespace, mix: Dict[str, float], factory: PayloadFactory) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    load = LoadRun(args.base_url, args.api_key, args.timeout, args.max_in_flight)
+
+    total = int(args.rps * args.duration)
+    start = time.perf_counter()
+    next_at = start
+    for _ in range(total):
+        if args.arrivals == "poisson":
+            next_at += rng.expovariate(args.rps)
+        else:
+            next_at += 1.0 / args.rps
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        scenario = rng.choices(names, weights)[0]
+        load.pool.submit(load.send, scenario, factory.build(scenario, rng), next_at)
+    send_window = time.perf_counter() - start
+    load.pool.shutdown(wait=True)
+    elapsed = time.perf_counter() - start
+    return summarize(load.records, total, send_window, elapsed)
+
+
+def summarize(records: List[Dict[str, Any]], sent: int, send_window: float, elapsed: float) -> Dict[str, Any]:
+    def block(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for row in rows:
+            statuses[str(row["status"])] = statuses.get(str(row["status"]), 0) + 1
+        ok = [row for row in rows if row["ok"]]
+        return {
+            "count": len(rows),
+            "ok": len(ok),
+            "errors": len(rows) - len(ok),
+            "error_rate": round((len(rows) - len(ok)) / len(rows), 4) if rows else 0.0,
+            "status": statuses,
+            "throughput_rps": round(len(ok) / elapsed, 2) if elapsed > 0 else None,
+            "latency_ms": _percentiles([row["latency"] for row in ok]),
+            "service_ms": _percentiles([row["service"] for row in ok]),
+        }
+
+    scenarios = sorted({row["scenario"] for row in records})
+    return {
+        "sent": sent,
+        "send_window_seconds": round(send_window, 2),
+        "achieved_send_rps": round(sent / send_window, 2) if send_window > 0 else None,
+        "elapsed_seconds": round(elapsed, 2),
+        "overall": block(records),
+        "scenarios": {name: block([row for row in records if row["scenario"] == name]) for name in scenarios},
+    }
+
+
+def _stub_call(stub_url: Optional[str], method: str, path: str) -> Optional[Dict[str, Any]]:
+    if not stub_url:
+        return None
+    try:
+        return requests.request(method, stub_url.rstrip("/") + path, timeout=5).json()
+    except Exception as e:
+        print(f"stub {path} failed: {e}", file=sys.stderr)
+        return None
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Drive the ai-server at a target request rate and report latency percentiles.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5002")
+    parser.add_argument("--api-key", default=os.getenv("BACKEND_API_KEY", ""))
+    parser.add_argument("--rps", type=float, default=10.0, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of sending")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("comprehensive=1,analyze-question=2,analyze-cv=1,analyze-job=1"),
+                        help="scenario=weight pairs: " + ", ".join(SCENARIOS))
+    parser.add_argument("--arrivals", choices=("uniform", "poisson"), default="poisson")
+    parser.add_argument("--distinct", type=int, default=50, help="payload variants per scenario (0 = all unique)")
+    parser.add_argument("--audio-seconds", type=int, default=10, help="length of the generated transcription fixtures")
+    parser.add_argument("--audio-variants", type=int, default=4)
+    parser.add_argument("--max-in-flight", type=int, default=256, help="generator-side cap on concurrent requests")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stub-url", help="hf_stub base URL; its counters are reset before and reported after the run")
+    parser.add_argument("--max-error-rate", type=float, help="exit 1 when the overall error rate is higher")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+    if args.rps <= 0 or args.duration <= 0:
+        parser.error("--rps and --duration must be positive")
+
+    with tempfile.TemporaryDirectory(prefix="load-test-") as workdir:
+        audio_files: List[str] = []
+        if "transcribe" in args.mix:
+            for i in range(max(1, args.audio_variants)):
+                path = os.path.join(workdir, f"speech_{i}.wav")
+                audio_files.append(generate_fixture(path, args.audio_seconds, seed=args.seed * 1000 + i))
+        factory = PayloadFactory(args.seed, args.distinct, audio_files)
+        _stub_call(args.stub_url, "POST", "/stats/reset")
+        result = run(args, args.mix, factory)
+
+    report: Dict[str, Any] = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {
+            "base_url": args.base_url,
+            "rps": args.rps,
+            "duration": args.duration,
+            "mix": args.mix,
+            "arrivals": args.arrivals,
+            "distinct": args.distinct,
+            "seed": args.seed,
+        },
+        **result,
+    }
+    stub = _stub_call(args.stub_url, "GET", "/stats")
+    if stub is not None:
+        report["stub"] = stub
+
+    exit_code = 0
+    if args.max_error_rate is not None and report["overall"]["error_rate"] > args.max_error_rate:
+        exit_code = 1
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text)
+    else:
+        print(text)
+    return exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
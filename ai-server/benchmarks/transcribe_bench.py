@@ -0,0 +1,237 @@
+"""
+Transcription benchmark for modules/transcribe.py.
+
+Runs every (backend, model, beam_size, fixture) case in a fresh process and
+reports real-time factor, first-segment latency, model load time and peak RSS
+as JSON. Compare against a previous run to catch regressions:
+
+    python -m benchmarks.transcribe_bench --models tiny,small --output bench.json
+    python -m benchmarks.transcribe_bench --models tiny,small --compare bench.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(HERE, "fixtures")
+DEFAULT_LENGTHS = (10, 60, 300)
+SAMPLING_RATE = 16000
+
+
+def generate_fixture(path: str, seconds: int, seed: int = 0) -> str:
+    """
+    Write a deterministic speech-like 16 kHz mono WAV: voiced bursts of
+    harmonics with a syllable-rate envelope, separated by short pauses.
+    """
+    rng = np.random.default_rng(seed + seconds)
+    total = seconds * SAMPLING_RATE
+    audio = np.zeros(total, dtype=np.float32)
+    pos = 0
+    while pos < total:
+        burst = int(rng.uniform(0.8, 3.0) * SAMPLING_RATE)
+        t = np.arange(min(burst, total - pos)) / SAMPLING_RATE
+        f0 = rng.uniform(100, 220)
+        voiced = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 6))
+        envelope = 0.5 * (1 - np.cos(2 * np.pi * rng.uniform(3, 6) * t))
+        audio[pos:pos + len(t)] = 0.2 * voiced * envelope + 0.01 * rng.standard_normal(len(t))
+        pos += len(t) + int(rng.uniform(0.2, 1.0) * SAMPLING_RATE)
+    pcm = (np.clip(audio, -1, 1) * 32767).astype(np.int16)
+    with wave.open(path, "wb") as fh:
+        fh.setnchannels(1)
+        fh.setsampwidth(2)
+        fh.setframerate(SAMPLING_RATE)
+        fh.writeframes(pcm.tobytes())
+    return path
+
+
+def collect_fixtures(lengths: Sequence[int], workdir: str) -> List[Dict[str, Any]]:
+    """
+    Bundled fixtures (benchmarks/fixtures/*) first, then generated ones.
+    """
+    fixtures: List[Dict[str, Any]] = []
+    if os.path.isdir(FIXTURES_DIR):
+        for name in sorted(os.listdir(FIXTURES_DIR)):
+            if os.path.splitext(name)[1].lower() in (".wav", ".mp3", ".m4a", ".flac", ".ogg", ".webm"):
+                fixtures.append({"name": name, "path": os.path.join(FIXTURES_DIR, name)})
+    for seconds in lengths:
+        path = os.path.join(workdir, f"synthetic_{seconds}s.wav")
+        fixtures.append({"name": f"synthetic_{seconds}s", "path": generate_fixture(path, seconds)})
+    return fixtures
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Executed in a child process so load time and peak RSS belong to this case alone.
+    """
+    os.environ["TRANSCRIPT_CACHE_ENABLED"] = "false"
+    os.environ["TRANSCRIBE_LONG_AUDIO_SECONDS"] = "0"
+    os.environ["TRANSCRIBE_BEAM_SIZE"] = str(case["beam_size"])
+    os.environ["TRANSCRIBE_BEST_OF"] = str(case["beam_size"])
+    if case.get("language"):
+        os.environ["TRANSCRIBE_LANGUAGE"] = case["language"]
+    sys.path.insert(0, os.path.dirname(HERE))
+
+    from modules.audio import AudioSource
+    from modules.inference_profiles import active_profile
+    from modules.model_registry import get_model_registry
+    from modules.transcribe import iter_segments
+
+    result = {k: case[k] for k in ("backend", "model", "beam_size", "fixture")}
+    try:
+        source = AudioSource.from_path(case["path"])
+        decode_start = time.perf_counter()
+        duration = source.duration
+        result["audio_seconds"] = duration
+        result["audio_decode_time"] = round(time.perf_counter() - decode_start, 3)
+
+        # Load through the registry with the same key transcribe.py will use.
+        load_start = time.perf_counter()
+        device = os.getenv("WHISPER_DEVICE", "auto")
+        if case["backend"] == "faster-whisper":
+            profile = active_profile()
+            get_model_registry().get("faster-whisper", case["model"], device, profile["compute_type"],
+                                     profile["cpu_threads"], profile["num_workers"])
+            result["profile"] = profile["name"]
+        else:
+            get_model_registry().get("whisper", case["model"], device)
+        result["model_load_time"] = round(time.perf_counter() - load_start, 3)
+
+        metadata: Dict[str, Any] = {}
+        first_segment: Optional[float] = None
+        segments = 0
+        start = time.perf_counter()
+        for _segment in iter_segments(source, case["model"], metadata, backend=case["backend"]):
+            if first_segment is None:
+                first_segment = time.perf_counter() - start
+            segments += 1
+        elapsed = time.perf_counter() - start
+
+        result.update({
+            "ok": True,
+            "transcribe_time": round(elapsed, 3),
+            "rtf": round(elapsed / duration, 4) if duration else None,
+            "first_segment_latency": round(first_segment, 3) if first_segment is not None else None,
+            "segments": segments,
+            "peak_rss_mb": _peak_rss_mb(),
+        })
+    except Exception as e:
+        result.update({"ok": False, "error": f"{type(e).__name__}: {e}"})
+    return result
+
+
+def _backend_available(backend: str) -> bool:
+    module = "faster_whisper" if backend == "faster-whisper" else "whisper"
+    try:
+        __import__(module)
+        return True
+    except Exception:
+        return False
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """
+    Cases whose RTF or first-segment latency grew by more than `threshold` (fraction).
+    """
+    def key(r: Dict[str, Any]) -> tuple:
+        return (r["backend"], r["model"], r["beam_size"], r["fixture"])
+
+    previous = {key(r): r for r in baseline.get("results", []) if r.get("ok")}
+    regressions = []
+    for r in current.get("results", []):
+        if not r.get("ok"):
+            continue
+        old = previous.get(key(r))
+        if old is None:
+            continue
+        for metric in ("rtf", "first_segment_latency"):
+            if old.get(metric) and r.get(metric) and r[metric] > old[metric] * (1 + threshold):
+                regressions.append({
+                    "case": dict(zip(("backend", "model", "beam_size", "fixture"), key(r))),
+                    "metric": metric,
+                    "baseline": old[metric],
+                    "current": r[metric],
+                    "change": round(r[metric] / old[metric] - 1, 4),
+                })
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark transcribe_audio backends and decode settings.")
+    parser.add_argument("--backends", default="faster-whisper,whisper")
+    parser.add_argument("--models", default="tiny,base,small")
+    parser.add_argument("--beam-sizes", default="1,5")
+    parser.add_argument("--lengths", default=",".join(str(n) for n in DEFAULT_LENGTHS),
+                        help="seconds of generated audio per fixture (empty for bundled only)")
+    parser.add_argument("--language", default=os.getenv("TRANSCRIBE_LANGUAGE", "en"))
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="baseline report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown vs baseline (fraction)")
+    args = parser.parse_args(argv)
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+    beams = [int(b) for b in args.beam_sizes.split(",") if b.strip()]
+    lengths = [int(n) for n in args.lengths.split(",") if n.strip()]
+
+    report: Dict[str, Any] = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "machine": {
+            "cores": os.cpu_count(),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+        },
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="transcribe-bench-") as workdir:
+        fixtures = collect_fixtures(lengths, workdir)
+        ctx = multiprocessing.get_context("spawn")
+        for backend in backends:
+            if not _backend_available(backend):
+                report["results"].append({"backend": backend, "ok": False, "error": "backend not installed"})
+                continue
+            for model in models:
+                for beam in beams:
+                    for fixture in fixtures:
+                        case = {"backend": backend, "model": model, "beam_size": beam,
+                                "fixture": fixture["name"], "path": fixture["path"], "language": args.language}
+                        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                            result = pool.submit(run_case, case).result()
+                        print(json.dumps(result), file=sys.stderr)
+                        report["results"].append(result)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as fh:
+            report["regressions"] = compare(report, json.load(fh), args.threshold)
+        exit_code = 1 if report["regressions"] else 0
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text)
+    else:
+        print(text)
+    return exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
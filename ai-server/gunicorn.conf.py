@@ -0,0 +1,11 @@
+"""
+gunicorn settings picked up from the working directory (sync `server:app`
+and the ASGI `asgi:app` with uvicorn workers alike).
+"""
+
+
+def post_fork(server, worker):
+    # Model warm-ups, backend probes and job recovery run in each worker, never in the master.
+    from server import start_background_services
+
+    start_background_services()
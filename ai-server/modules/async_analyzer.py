@@ -0,0 +1,348 @@
+"""
+Asyncio counterpart of HuggingFaceAnalyzer on aiohttp.
+
+Payloads, parsing and fallbacks are inherited from HuggingFaceAnalyzer, so
+both analyzers return identical results; only the transport differs. All
+calls share one aiohttp session and connector, so a single event loop can
+keep hundreds of inference requests in flight. Requests are posted directly
+rather than through AsyncInferenceClient, which opens a new session per call
+and has no public way to share a connector.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .utils import LOGGER
+from .hf_cache import get_hf_cache
+from .chunking import ZERO_SHOT, ChunkPlan
+from .huggingface_analyzer import HuggingFaceAnalyzer
+from .local_inference import InferenceBackend
+from .model_router import AUTH, EMPTY, classify_error, get_generation_router
+from .generation_stream import InstStripper, is_event_stream, parse_stream_line, parse_whole_response
+
+
+class AsyncHuggingFaceAnalyzer(HuggingFaceAnalyzer):
+    """
+    Same analyses as HuggingFaceAnalyzer, as coroutines. Must be used from a
+    single event loop (the session, connector and semaphore are bound to it).
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.max_in_flight = int(os.getenv("HF_ASYNC_MAX_IN_FLIGHT", "256"))
+        self._connector: Any = None
+        self._session: Any = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+        self._stats = {"calls": 0, "errors": 0, "timeouts": 0, "max_in_flight": 0}
+
+    def _get_connector(self) -> Any:
+        import aiohttp  # type: ignore
+
+        if self._connector is None or self._connector.closed:
+            self._connector = aiohttp.TCPConnector(
+                limit=int(os.getenv("HF_ASYNC_MAX_CONNECTIONS", "256")),
+                limit_per_host=int(os.getenv("HF_ASYNC_CONNECTIONS_PER_HOST", "64")),
+                keepalive_timeout=float(os.getenv("HF_ASYNC_KEEPALIVE_SECONDS", "30")),
+            )
+        return self._connector
+
+    def _get_session(self) -> Any:
+        import aiohttp  # type: ignore
+
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=self._get_connector(), connector_owner=False)
+        return self._session
+
+    async def _post_async(self, model_name: str, payload: Dict, use_token: bool) -> Any:
+        url, headers = self._api_request(model_name, use_token)
+        # like huggingface_hub after a 503 "model is loading": wait for the model instead of failing
+        headers["X-Wait-For-Model"] = "true"
+        async with self._get_session().post(url, json=payload, headers=headers) as response:
+            response.raise_for_status()
+            return json.loads(await response.read())
+
+    async def _fetch_async(self, model_name: str, payload: Dict, use_token: bool = True) -> Any:
+        """Async API call to Hugging Face with the same caching as _fetch; raises on failure"""
+        return (await self._fetch_with_backend_async(model_name, payload, use_token))[1]
+
+    async def _fetch_with_backend_async(self, model_name: str, payload: Dict, use_token: bool = True,
+                                        use_cache: bool = True) -> Tuple[InferenceBackend, Any]:
+        """Like _fetch_async, but also returns the backend that answered"""
+        task = self._task_of(model_name, payload)
+        *preferred, _ = self._backends(task)
+        for backend in preferred:
+            # CPU-bound: keep it off the event loop
+            try:
+                result = await asyncio.to_thread(self._run_backend, backend, task, model_name, payload,
+                                                 use_token, None, use_cache)
+                return backend, result
+            except Exception as e:
+                LOGGER.warning(f"{backend.name.capitalize()} {task} inference failed, falling back to the async API: {e}")
+
+        # the last backend is always the remote API, called here over aiohttp
+
+        # the SQLite tier can block (busy timeout), so cache lookups run off the event loop too
+        cache = get_hf_cache() if use_cache else None
+        if cache is not None:
+            cached = await asyncio.to_thread(cache.get, model_name, payload)
+            if cached is not None:
+                return self.remote, cached
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        timeout = float(os.getenv("HF_CALL_TIMEOUT_SECONDS", "60"))
+        async with self._semaphore:
+            self._in_flight += 1
+            self._stats["calls"] += 1
+            self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._in_flight)
+            try:
+                result = await asyncio.wait_for(self._post_async(model_name, payload, use_token), timeout)
+            except asyncio.TimeoutError:
+                self._stats["timeouts"] += 1
+                raise
+            except Exception:
+                self._stats["errors"] += 1
+                raise
+            finally:
+                self._in_flight -= 1
+
+        if cache is not None:
+            await asyncio.to_thread(cache.put, model_name, payload, result)
+        return self.remote, result
+
+    async def _make_api_call_async(self, model_name: str, payload: Dict, use_token: bool = True) -> Optional[Any]:
+        """Async API call to Hugging Face; None on failure, like _make_api_call"""
+        try:
+            return await self._fetch_async(model_name, payload, use_token)
+        except asyncio.TimeoutError:
+            LOGGER.error(f"HF API call to {model_name} timed out after {os.getenv('HF_CALL_TIMEOUT_SECONDS', '60')}s")
+            return None
+        except Exception as e:
+            LOGGER.error(f"HF API error for {model_name} (Token={use_token}): {e}")
+            return None
+
+    async def _question_batch_async(self, model_name: str, payload: Dict) -> Optional[Tuple[str, Any]]:
+        """Async _question_batch: uncached batch call; (cache namespace, result) or None on failure"""
+        try:
+            backend, result = await self._fetch_with_backend_async(model_name, payload, use_cache=False)
+        except asyncio.TimeoutError:
+            LOGGER.error(f"HF API call to {model_name} timed out after {os.getenv('HF_CALL_TIMEOUT_SECONDS', '60')}s")
+            return None
+        except Exception as e:
+            LOGGER.error(f"HF API error for {model_name} (question batch): {e}")
+            return None
+        return backend.cache_name(ZERO_SHOT, model_name), result
+
+    async def _gather_calls(self, calls: Dict[str, Tuple[str, Dict]],
+                            call: Optional[Callable[..., Awaitable[Optional[Any]]]] = None) -> Dict[str, Optional[Any]]:
+        call = call or self._make_api_call_async
+        names = list(calls)
+        results = await asyncio.gather(*(call(*calls[name]) for name in names))
+        return dict(zip(names, results))
+
+    async def _gather_chunked(self, calls: Dict[str, Tuple[str, Dict]]) -> Dict[str, Optional[Any]]:
+        plan = ChunkPlan(calls, self._chunk_kind)
+        pending = plan.calls
+        while pending:
+            pending = plan.reduce(await self._gather_calls(pending))
+        return plan.results
+
+    async def generate_text_async(self, prompt: str, params: Optional[Dict] = None) -> str:
+        """توليد نص (نسخة async) مع نفس المحاولات الاحتياطية"""
+        try:
+            payload = self._generation_payload(prompt, params)
+            for model in get_generation_router().order(self._generation_models()):
+                LOGGER.info(f"Trying generation with model: {model}")
+                generated = await self._try_generation_async(model, payload)
+                if generated:
+                    return generated
+                LOGGER.warning(f"Model {model} returned empty or failed. Trying next...")
+            return ""
+        except Exception as e:
+            LOGGER.error(f"Error generating text: {e}")
+            return ""
+
+    async def _try_generation_async(self, model: str, payload: Dict) -> str:
+        started = time.time()
+        kind = None
+        try:
+            result = await self._fetch_async(model, payload, use_token=True)
+        except Exception as e:
+            kind = classify_error(e)
+            LOGGER.error(f"HF API error for {model} (Token=True, {kind}): {e}")
+            result = None
+            if kind == AUTH:
+                LOGGER.info(f"Retrying {model} without token...")
+                try:
+                    result = await self._fetch_async(model, payload, use_token=False)
+                    kind = None
+                except Exception as e:
+                    kind = classify_error(e)
+                    LOGGER.error(f"HF API error for {model} (Token=False, {kind}): {e}")
+        return self._record_generation(model, result, kind, started)
+
+    async def _open_stream_async(self, model: str, payload: Dict, use_token: bool) -> Any:
+        import aiohttp  # type: ignore
+
+        url, headers = self._api_request(model, use_token)
+        headers["Accept"] = "text/event-stream"
+        # a read timeout between tokens rather than a deadline on the whole generation
+        timeout = aiohttp.ClientTimeout(
+            sock_connect=float(os.getenv("HF_CONNECT_TIMEOUT_SECONDS", "5")),
+            sock_read=float(os.getenv("HF_READ_TIMEOUT_SECONDS", "60")),
+        )
+        response = await self._get_session().post(url, json={**payload, "stream": True}, headers=headers, timeout=timeout)
+        try:
+            response.raise_for_status()
+        except BaseException:
+            response.close()
+            raise
+        return response
+
+    async def _stream_model_async(self, model: str, payload: Dict) -> AsyncIterator[str]:
+        try:
+            response = await self._open_stream_async(model, payload, use_token=True)
+        except Exception as e:
+            if classify_error(e) != AUTH:
+                raise
+            LOGGER.info(f"Retrying {model} stream without token...")
+            response = await self._open_stream_async(model, payload, use_token=False)
+
+        stripper = InstStripper()
+        try:
+            if is_event_stream(response.headers.get("Content-Type")):
+                async for line in response.content:
+                    token = parse_stream_line(line)
+                    text = stripper.feed(token) if token else ""
+                    if text:
+                        yield text
+            else:
+                text = stripper.feed(parse_whole_response(await response.read()))
+                if text:
+                    yield text
+            tail = stripper.flush()
+            if tail:
+                yield tail
+        finally:
+            # also runs on cancellation (client disconnect): drop the upstream connection
+            response.close()
+
+    async def stream_text_async(self, prompt: str, params: Optional[Dict] = None) -> AsyncIterator[str]:
+        """نسخة async من stream_text"""
+        payload = self._generation_payload(prompt, params)
+        router = get_generation_router()
+        for model in router.order(self._generation_models()):
+            LOGGER.info(f"Streaming generation with model: {model}")
+            started = time.time()
+            emitted = False
+            try:
+                async with aclosing(self._stream_model_async(model, payload)) as texts:
+                    async for text in texts:
+                        emitted = True
+                        yield text
+            except Exception as e:
+                kind = classify_error(e)
+                LOGGER.error(f"HF stream error for {model} ({kind}): {e}")
+                router.record_failure(model, kind, time.time() - started)
+                if emitted:
+                    raise
+                continue
+            if emitted:
+                router.record_success(model, time.time() - started)
+                return
+            router.record_failure(model, EMPTY, time.time() - started)
+            LOGGER.warning(f"Model {model} streamed nothing. Trying next...")
+
+    async def analyze_question_async(self, question_text: str) -> Dict[str, Any]:
+        try:
+            model_name, payload = self._question_call(question_text)
+            return self._parse_question(await self._make_api_call_async(model_name, payload))
+        except Exception as e:
+            LOGGER.error(f"Error analyzing question: {e}")
+            return {"type": "unknown", "confidence": 0.0, "all_scores": {}}
+
+    async def analyze_questions_async(self, questions: List[str]) -> List[Dict[str, Any]]:
+        try:
+            known, calls, batches = await asyncio.to_thread(self._question_batch_calls, questions)
+            results = await self._gather_calls(calls, self._question_batch_async)
+            missing = await asyncio.to_thread(self._collect_question_batches, known, batches, results)
+            if missing:
+                LOGGER.warning(f"Batched classification failed for {len(missing)} questions, retrying one by one")
+                known.update(await self._gather_calls({q: self._question_call(q) for q in missing}))
+            return [self._parse_question(known.get(question)) for question in questions]
+        except Exception as e:
+            LOGGER.error(f"Error analyzing questions: {e}")
+            return [{"type": "unknown", "confidence": 0.0, "all_scores": {}} for _ in questions]
+
+    async def analyze_cv_text_async(self, cv_text: str) -> Dict[str, Any]:
+        try:
+            results = await self._gather_chunked(self._cv_calls(cv_text))
+            return self._parse_cv(results["skills"], results["summary"], cv_text)
+        except Exception as e:
+            LOGGER.error(f"Error analyzing CV: {e}")
+            return {"skills": {}, "summary": "", "education_level": "unknown", "experience_years": 0,
+                    "skill_phrases": self._skill_phrases(cv_text)}
+
+    async def analyze_job_description_async(self, job_text: Any) -> Dict[str, Any]:
+        try:
+            results = await self._gather_chunked({"requirements": self._job_call(job_text)})
+            return self._parse_job(results["requirements"], job_text)
+        except Exception as e:
+            LOGGER.error(f"Error analyzing job description: {e}")
+            return {"requirements": {}, "key_skills": [], "experience_level": "unknown",
+                    "requirement_phrases": self._requirement_phrases(job_text)}
+
+    async def refine_transcript_async(self, raw_transcript: str) -> Dict[str, Any]:
+        try:
+            results = await self._gather_chunked(self._refine_calls(raw_transcript))
+            return self._parse_refinement(raw_transcript, results["sentiment"], results["summary"])
+        except Exception as e:
+            LOGGER.error(f"Error refining transcript: {e}")
+            return self._refinement_fallback(raw_transcript)
+
+    def async_stats(self) -> Dict[str, Any]:
+        connector = self._connector
+        return {
+            **self._stats,
+            "in_flight": self._in_flight,
+            "max_in_flight_limit": self.max_in_flight,
+            "connections_limit": connector.limit if connector is not None else None,
+            "connections_per_host_limit": connector.limit_per_host if connector is not None else None,
+        }
+
+    async def aclose(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        if self._connector is not None and not self._connector.closed:
+            await self._connector.close()
+
+
+_ASYNC_ANALYZER: Optional[AsyncHuggingFaceAnalyzer] = None
+_ASYNC_ANALYZER_LOCK = threading.Lock()
+
+
+def get_async_huggingface_analyzer() -> AsyncHuggingFaceAnalyzer:
+    """
+    Return the process-wide async analyzer, creating it on first use.
+    """
+    global _ASYNC_ANALYZER
+    if _ASYNC_ANALYZER is None:
+        with _ASYNC_ANALYZER_LOCK:
+            if _ASYNC_ANALYZER is None:
+                _ASYNC_ANALYZER = AsyncHuggingFaceAnalyzer()
+    return _ASYNC_ANALYZER
+
+
+async def close_async_analyzer() -> None:
+    """
+    Release the pooled connections, if the analyzer was ever created.
+    """
+    if _ASYNC_ANALYZER is not None:
+        await _ASYNC_ANALYZER.aclose()
@@ -0,0 +1,125 @@
+"""In-memory audio decoding: upload bytes or file -> 16 kHz mono float32 PCM in one pass."""
+from __future__ import annotations
+
+import hashlib
+import io
+import threading
+from typing import Any, BinaryIO, Optional, Union
+
+import numpy as np
+
+from .utils import LOGGER
+
+SAMPLING_RATE = 16000
+
+
+class DecodedAudio:
+    """
+    PCM samples plus the metadata gathered while decoding them.
+    """
+
+    __slots__ = ("samples", "sample_rate", "source_sample_rate", "source_channels", "codec")
+
+    def __init__(self, samples: np.ndarray, sample_rate: int, source_sample_rate: Optional[int],
+                 source_channels: Optional[int], codec: Optional[str]) -> None:
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.source_sample_rate = source_sample_rate
+        self.source_channels = source_channels
+        self.codec = codec
+
+    @property
+    def duration(self) -> float:
+        return round(len(self.samples) / float(self.sample_rate), 3)
+
+    def metadata(self) -> dict:
+        return {
+            "duration": self.duration,
+            "sample_rate": self.source_sample_rate,
+            "channels": self.source_channels,
+            "codec": self.codec,
+        }
+
+
+def decode_audio(source: Union[str, BinaryIO], sampling_rate: int = SAMPLING_RATE) -> DecodedAudio:
+    """
+    Decode any ffmpeg-readable input with PyAV, resampling to mono s16 at
+    `sampling_rate` and returning float32 samples in [-1, 1].
+    """
+    import av  # type: ignore
+
+    resampler = av.audio.resampler.AudioResampler(format="s16", layout="mono", rate=sampling_rate)
+    pieces = []
+    with av.open(source, mode="r", metadata_errors="ignore") as container:
+        if not container.streams.audio:
+            raise ValueError("No audio stream found")
+        stream = container.streams.audio[0]
+        codec = stream.codec_context
+        source_rate = getattr(codec, "sample_rate", None) or getattr(stream, "rate", None)
+        source_channels = getattr(codec, "channels", None)
+        for frame in container.decode(stream):
+            # The resampler derives timing from pts; some containers leave it unset.
+            frame.pts = None
+            for out in resampler.resample(frame):
+                pieces.append(out.to_ndarray().reshape(-1))
+        for out in resampler.resample(None):
+            pieces.append(out.to_ndarray().reshape(-1))
+        codec_name = getattr(codec, "name", None)
+
+    pcm = np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.int16)
+    samples = pcm.astype(np.float32) / 32768.0
+    return DecodedAudio(samples, sampling_rate, source_rate, source_channels, codec_name)
+
+
+class AudioSource:
+    """
+    Audio handed to the transcriber: raw upload bytes or a file path. The
+    content hash and the decoded PCM are each computed at most once.
+    """
+
+    def __init__(self, data: Optional[bytes] = None, path: Optional[str] = None, name: Optional[str] = None) -> None:
+        if data is None and path is None:
+            raise ValueError("AudioSource needs either data or a path")
+        self.data = data
+        self.path = path
+        self.name = name or path or "<upload>"
+        self._sha256: Optional[str] = None
+        self._decoded: Optional[DecodedAudio] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, name: Optional[str] = None) -> "AudioSource":
+        return cls(data=data, name=name)
+
+    @classmethod
+    def from_path(cls, path: str) -> "AudioSource":
+        return cls(path=path)
+
+    @property
+    def sha256(self) -> str:
+        if self._sha256 is None:
+            digest = hashlib.sha256()
+            if self.data is not None:
+                digest.update(self.data)
+            else:
+                with open(self.path, "rb") as fh:  # type: ignore[arg-type]
+                    for block in iter(lambda: fh.read(1024 * 1024), b""):
+                        digest.update(block)
+            self._sha256 = digest.hexdigest()
+        return self._sha256
+
+    def decode(self) -> DecodedAudio:
+        with self._lock:
+            if self._decoded is None:
+                target: Any = io.BytesIO(self.data) if self.data is not None else self.path
+                self._decoded = decode_audio(target)
+                LOGGER.debug(f"Decoded '{self.name}': {self._decoded.duration}s")
+            return self._decoded
+
+    @property
+    def samples(self) -> np.ndarray:
+        return self.decode().samples
+
+    @property
+    def duration(self) -> float:
+        return self.decode().duration
@@ -0,0 +1,164 @@
+"""
+Benchmark faster-whisper CPU settings on a reference clip and save the fastest
+profile whose transcript stays within an accuracy tolerance.
+
+    python -m modules.autotune --clip samples/interview.wav --model medium
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from .utils import LOGGER
+from .audio import decode_audio
+from .inference_profiles import profiles_file
+
+DEFAULT_COMPUTE_TYPES = ("float32", "int8_float32", "int8")
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """
+    Word-level Levenshtein distance divided by the reference length.
+    """
+    ref = reference.split()
+    hyp = hypothesis.split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, start=1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, start=1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word),
+            )
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def _thread_options(cores: int) -> List[int]:
+    options = {cores}
+    step = cores // 2
+    while step >= 1:
+        options.add(step)
+        step //= 2
+    return sorted(options, reverse=True)
+
+
+def _run_config(samples: Any, model_name: str, compute_type: str, cpu_threads: int,
+                language: Optional[str], beam_size: int, repeat: int) -> Dict[str, Any]:
+    from faster_whisper import WhisperModel  # type: ignore
+
+    load_start = time.time()
+    model = WhisperModel(model_name, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+    load_time = time.time() - load_start
+
+    timings: List[float] = []
+    text = ""
+    for _ in range(max(1, repeat)):
+        start = time.time()
+        segments, _info = model.transcribe(samples, language=language, beam_size=beam_size)
+        text = " ".join((seg.text or "").strip() for seg in segments)
+        timings.append(time.time() - start)
+    return {
+        "compute_type": compute_type,
+        "cpu_threads": cpu_threads,
+        "load_time": round(load_time, 3),
+        "decode_time": round(min(timings), 3),
+        "text": " ".join(text.split()),
+    }
+
+
+def autotune(clip: str, model_name: str, tolerance: float = 0.05, language: Optional[str] = None,
+             compute_types: Sequence[str] = DEFAULT_COMPUTE_TYPES, threads: Optional[Sequence[int]] = None,
+             beam_size: int = 5, repeat: int = 1) -> Dict[str, Any]:
+    """
+    Time every (compute_type, cpu_threads) combination on `clip`. The
+    float32/all-cores transcript is the accuracy reference; the fastest
+    configuration within `tolerance` WER of it becomes the "autotuned" profile.
+    """
+    decoded = decode_audio(clip)
+    cores = os.cpu_count() or 1
+    thread_options = list(threads) if threads else _thread_options(cores)
+    LOGGER.info(f"Autotuning '{model_name}' on {decoded.duration}s clip: {list(compute_types)} x {thread_options} threads")
+
+    reference = _run_config(decoded.samples, model_name, "float32", cores, language, beam_size, 1)["text"]
+    results: List[Dict[str, Any]] = []
+    for compute_type in compute_types:
+        for cpu_threads in thread_options:
+            try:
+                result = _run_config(decoded.samples, model_name, compute_type, cpu_threads, language, beam_size, repeat)
+            except Exception as e:
+                LOGGER.warning(f"Skipping {compute_type}/{cpu_threads} threads: {e}")
+                continue
+            result["wer"] = round(word_error_rate(reference, result.pop("text")), 4)
+            result["rtf"] = round(result["decode_time"] / decoded.duration, 4) if decoded.duration else None
+            LOGGER.info(f"{compute_type:>13} threads={cpu_threads:<3} decode={result['decode_time']}s wer={result['wer']}")
+            results.append(result)
+
+    eligible = [r for r in results if r["wer"] <= tolerance]
+    if not eligible:
+        raise RuntimeError(f"No configuration stayed within WER tolerance {tolerance}")
+    best = min(eligible, key=lambda r: r["decode_time"])
+    # Leftover cores can serve a concurrent decode.
+    num_workers = max(1, cores // best["cpu_threads"])
+    return {
+        "selected": "autotuned",
+        "profiles": {
+            "autotuned": {
+                "compute_type": best["compute_type"],
+                "cpu_threads": best["cpu_threads"],
+                "num_workers": num_workers,
+            },
+        },
+        "benchmark": {
+            "clip": os.path.basename(clip),
+            "clip_seconds": decoded.duration,
+            "model": model_name,
+            "beam_size": beam_size,
+            "tolerance": tolerance,
+            "machine": {"cores": cores, "platform": platform.platform(), "processor": platform.processor()},
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "results": results,
+        },
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Find the fastest faster-whisper CPU profile for this machine.")
+    parser.add_argument("--clip", required=True, help="reference audio file")
+    parser.add_argument("--model", default=os.getenv("WHISPER_MODEL", "medium"))
+    parser.add_argument("--language", default=os.getenv("TRANSCRIBE_LANGUAGE", "ar"))
+    parser.add_argument("--tolerance", type=float, default=0.05, help="max WER against the float32 reference")
+    parser.add_argument("--compute-types", default=",".join(DEFAULT_COMPUTE_TYPES))
+    parser.add_argument("--threads", default="", help="comma separated cpu_threads values (default: cores, cores/2, ...)")
+    parser.add_argument("--beam-size", type=int, default=int(os.getenv("TRANSCRIBE_BEAM_SIZE", "5")))
+    parser.add_argument("--repeat", type=int, default=1, help="decodes per configuration (fastest is kept)")
+    parser.add_argument("--output", default=profiles_file())
+    args = parser.parse_args(argv)
+
+    report = autotune(
+        args.clip,
+        args.model,
+        tolerance=args.tolerance,
+        language=args.language or None,
+        compute_types=[c.strip() for c in args.compute_types.split(",") if c.strip()],
+        threads=[int(t) for t in args.threads.split(",") if t.strip()] or None,
+        beam_size=args.beam_size,
+        repeat=args.repeat,
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print(json.dumps(report["profiles"]["autotuned"]))
+    LOGGER.info(f"Wrote profile to {args.output}; set WHISPER_PROFILE=autotuned or leave it unset to use it")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
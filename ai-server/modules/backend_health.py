@@ -0,0 +1,247 @@
+"""Whisper backend health tracking with a circuit breaker per backend and model."""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .utils import LOGGER
+
+BACKENDS = ("faster-whisper", "whisper")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def _probe_faster_whisper() -> None:
+    from faster_whisper import WhisperModel  # type: ignore  # noqa: F401
+
+
+def _probe_whisper() -> None:
+    import whisper  # type: ignore  # noqa: F401
+
+
+_PROBES: Dict[str, Callable[[], None]] = {
+    "faster-whisper": _probe_faster_whisper,
+    "whisper": _probe_whisper,
+}
+
+
+class _Circuit:
+    __slots__ = ("state", "failures", "opened_at", "last_error",
+                 "last_failure", "last_success", "successes", "total_failures")
+
+    def __init__(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.last_error: Optional[str] = None
+        self.last_failure: Optional[float] = None
+        self.last_success: Optional[float] = None
+        self.successes = 0
+        self.total_failures = 0
+
+
+class _Backend:
+    __slots__ = ("installed", "import_error", "probed_at", "models")
+
+    def __init__(self) -> None:
+        self.installed: Optional[bool] = None
+        self.import_error: Optional[str] = None
+        self.probed_at = 0.0
+        # model name -> circuit, created on first use
+        self.models: Dict[str, _Circuit] = {}
+
+
+class BackendHealth:
+    """
+    Remembers which whisper backends, and which models on them, work in this process.
+
+    Each backend is probed (imported) once; a failed probe skips the backend
+    for `cooldown_seconds` before it is imported again. Circuits are kept
+    per (backend, model), so a model that fails to load does not take the
+    backend down for the other models: `failure_threshold` consecutive
+    transcription failures open the circuit for `cooldown_seconds`. While
+    open the pair is skipped without being tried. After the cool-down a
+    single request is let through (half-open): success closes the circuit,
+    failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: Optional[int] = None, cooldown_seconds: Optional[float] = None) -> None:
+        self.failure_threshold = max(1, failure_threshold if failure_threshold is not None
+                                     else int(os.getenv("TRANSCRIBE_BACKEND_FAILURE_THRESHOLD", "3")))
+        self.cooldown_seconds = (cooldown_seconds if cooldown_seconds is not None
+                                 else float(os.getenv("TRANSCRIBE_BACKEND_COOLDOWN_SECONDS", "300")))
+        self._backends: Dict[str, _Backend] = {name: _Backend() for name in BACKENDS}
+        self._lock = threading.Lock()
+
+    def probe(self, backend: str) -> bool:
+        """
+        Import the backend's package and record whether it is installed.
+        """
+        try:
+            _PROBES[backend]()
+        except Exception as e:
+            LOGGER.warning(f"Whisper backend '{backend}' unavailable: {e}")
+            with self._lock:
+                state = self._backends[backend]
+                state.installed = False
+                state.import_error = f"import failed: {e}"
+                state.probed_at = time.time()
+            return False
+        with self._lock:
+            state = self._backends[backend]
+            state.installed = True
+            state.import_error = None
+            state.probed_at = time.time()
+        return True
+
+    def probe_all(self) -> Dict[str, bool]:
+        return {name: self.probe(name) for name in BACKENDS}
+
+    def allow(self, backend: str, model: str) -> bool:
+        """
+        Whether a request may use `model` on `backend` right now. Moving an
+        open circuit to half-open hands the single trial to the caller that
+        gets True; a trial that never reports back expires after another cool-down.
+        """
+        with self._lock:
+            state = self._backends[backend]
+            installed = state.installed
+            if installed is False and time.time() - state.probed_at < self.cooldown_seconds:
+                return False
+        # Not probed yet, or the cool-down after a failed import expired.
+        if not installed and not self.probe(backend):
+            return False
+        with self._lock:
+            circuit = self._circuit(backend, model)
+            if circuit.state == CLOSED:
+                return True
+            if time.time() - circuit.opened_at < self.cooldown_seconds:
+                return False
+            circuit.state = HALF_OPEN
+            circuit.opened_at = time.time()
+            LOGGER.info(f"Whisper backend '{backend}' ({model}) half-open; trying one request")
+            return True
+
+    def healthy(self, backend: str, model: Optional[str] = None) -> bool:
+        """
+        Installed, and (for a given model) with a closed circuit; unlike
+        allow(), never starts a trial or probe.
+        """
+        with self._lock:
+            state = self._backends[backend]
+            if not state.installed:
+                return False
+            circuit = state.models.get(model) if model is not None else None
+            return circuit is None or circuit.state == CLOSED
+
+    def available(self, model: str) -> List[str]:
+        """
+        Backends a request for `model` may be routed to, in preference order.
+        """
+        return [name for name in BACKENDS if self.allow(name, model)]
+
+    def installed(self) -> bool:
+        """
+        Whether any backend imported successfully.
+        """
+        with self._lock:
+            return any(state.installed for state in self._backends.values())
+
+    def record_success(self, backend: str, model: str) -> None:
+        with self._lock:
+            circuit = self._circuit(backend, model)
+            circuit.successes += 1
+            circuit.last_success = time.time()
+            if circuit.state != CLOSED:
+                LOGGER.info(f"Whisper backend '{backend}' ({model}) recovered")
+            self._close(circuit)
+
+    def record_failure(self, backend: str, model: str, error: BaseException) -> None:
+        with self._lock:
+            circuit = self._circuit(backend, model)
+            circuit.failures += 1
+            circuit.total_failures += 1
+            circuit.last_failure = time.time()
+            circuit.last_error = f"{type(error).__name__}: {error}"
+            if circuit.state == HALF_OPEN or circuit.failures >= self.failure_threshold:
+                self._open(circuit, circuit.last_error)
+                LOGGER.warning(
+                    f"Whisper backend '{backend}' ({model}) disabled for {self.cooldown_seconds}s "
+                    f"after {circuit.failures} failure(s): {circuit.last_error}"
+                )
+
+    def reset(self, backend: Optional[str] = None) -> None:
+        with self._lock:
+            for name in [backend] if backend else list(self._backends):
+                self._backends[name] = _Backend()
+
+    def status(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            backends: Dict[str, Any] = {}
+            for name, state in self._backends.items():
+                models: Dict[str, Any] = {}
+                for model, circuit in state.models.items():
+                    retry_in = None
+                    if circuit.state == OPEN:
+                        retry_in = round(max(0.0, self.cooldown_seconds - (now - circuit.opened_at)), 1)
+                    models[model] = {
+                        "state": circuit.state,
+                        "consecutive_failures": circuit.failures,
+                        "failures": circuit.total_failures,
+                        "successes": circuit.successes,
+                        "last_error": circuit.last_error,
+                        "last_failure": circuit.last_failure,
+                        "last_success": circuit.last_success,
+                        "retry_in_seconds": retry_in,
+                    }
+                backends[name] = {
+                    "installed": state.installed,
+                    "import_error": state.import_error,
+                    "models": models,
+                }
+            return {
+                "failure_threshold": self.failure_threshold,
+                "cooldown_seconds": self.cooldown_seconds,
+                "backends": backends,
+            }
+
+    # -- internals (callers hold self._lock) --
+
+    def _circuit(self, backend: str, model: str) -> _Circuit:
+        models = self._backends[backend].models
+        circuit = models.get(model)
+        if circuit is None:
+            circuit = models[model] = _Circuit()
+        return circuit
+
+    @staticmethod
+    def _open(circuit: _Circuit, error: str) -> None:
+        circuit.state = OPEN
+        circuit.opened_at = time.time()
+        circuit.last_error = error
+
+    @staticmethod
+    def _close(circuit: _Circuit) -> None:
+        circuit.state = CLOSED
+        circuit.failures = 0
+
+
+_HEALTH: Optional[BackendHealth] = None
+_HEALTH_LOCK = threading.Lock()
+
+
+def get_backend_health() -> BackendHealth:
+    """
+    Return the process-wide backend health tracker, creating it on first use.
+    """
+    global _HEALTH
+    if _HEALTH is None:
+        with _HEALTH_LOCK:
+            if _HEALTH is None:
+                _HEALTH = BackendHealth()
+    return _HEALTH
@@ -0,0 +1,292 @@
+"""
+Token-aware chunking of long inputs for the Hugging Face analyses, with
+map-reduce merging of the per-chunk results.
+
+Summarization, zero-shot and sentiment models behind the Inference API
+accept roughly 512-1024 tokens; longer inputs are truncated or rejected.
+A ChunkPlan splits each oversized call on sentence boundaries into
+chunk calls that run in parallel (at most HF_CHUNK_MAX_CHUNKS per input
+at a time; the rest follow in later waves), then reduces the results of
+every chunk into one response shaped like the model's own: weighted score
+averages for zero-shot and sentiment, and a summary of the chunk summaries.
+"""
+from __future__ import annotations
+
+import math
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .utils import LOGGER
+
+ZERO_SHOT = "zero_shot"
+SENTIMENT = "sentiment"
+SUMMARY = "summary"
+
+Call = Tuple[str, Dict[str, Any]]
+
+# Input limits (in model tokens) with headroom for special tokens and estimate error.
+_DEFAULT_TOKEN_LIMITS = {
+    "facebook/bart-large-mnli": 900,
+    "facebook/bart-large-cnn": 900,
+    "cardiffnlp/twitter-roberta-base-sentiment-latest": 450,
+}
+_FALLBACK_TOKEN_LIMIT = 450
+# Summary-of-summaries rounds before the joined chunk summaries are returned as is.
+_MAX_REDUCE_ROUNDS = 4
+
+_SENTENCE_END = re.compile(r"(?<=[.!?؟。])\s+|\n+")
+_WORD = re.compile(r"\S+")
+
+
+def chunking_enabled() -> bool:
+    return os.getenv("HF_CHUNKING_ENABLED", "true").lower() == "true"
+
+
+def _parse_token_limits() -> Dict[str, int]:
+    """
+    HF_CHUNK_TOKEN_LIMITS: comma separated model=tokens pairs overriding the defaults.
+    """
+    limits = dict(_DEFAULT_TOKEN_LIMITS)
+    for item in os.getenv("HF_CHUNK_TOKEN_LIMITS", "").split(","):
+        model, _, value = item.rpartition("=")
+        if model.strip() and value.strip():
+            try:
+                limits[model.strip()] = int(value)
+            except ValueError:
+                LOGGER.warning(f"Ignoring bad HF_CHUNK_TOKEN_LIMITS entry: {item}")
+    return limits
+
+
+def token_limit(model_name: str) -> int:
+    return _parse_token_limits().get(model_name, _FALLBACK_TOKEN_LIMIT)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Conservative BPE token estimate without loading a tokenizer: ~4/3 tokens
+    per ASCII word, and one per non-ASCII character (Arabic script is split
+    into byte-level pieces by the English vocabularies).
+    """
+    ascii_words = 0
+    other = 0
+    for word in _WORD.findall(text):
+        if word.isascii():
+            ascii_words += 1
+        else:
+            other += sum(1 for ch in word if not ch.isascii()) + 1
+    return math.ceil(ascii_words * 4 / 3) + other
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_END.split(text) if s and s.strip()]
+
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Pack whole sentences into chunks of at most max_tokens (estimated).
+    A sentence longer than a chunk is split on word boundaries.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for sentence in split_sentences(text):
+        tokens = estimate_tokens(sentence)
+        if tokens > max_tokens:
+            pieces = _split_words(sentence, max_tokens)
+        else:
+            pieces = [(sentence, tokens)]
+        for piece, piece_tokens in pieces:
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _split_words(sentence: str, max_tokens: int) -> List[Tuple[str, int]]:
+    pieces: List[Tuple[str, int]] = []
+    words: List[str] = []
+    tokens = 0
+    for word in sentence.split():
+        word_tokens = estimate_tokens(word)
+        if words and tokens + word_tokens > max_tokens:
+            pieces.append((" ".join(words), tokens))
+            words, tokens = [], 0
+        words.append(word)
+        tokens += word_tokens
+    if words:
+        pieces.append((" ".join(words), tokens))
+    return pieces
+
+
+def merge_zero_shot(results: List[Any], weights: List[float]) -> Optional[Dict[str, Any]]:
+    """
+    Weighted mean of each label's score across chunks, as one zero-shot response.
+    """
+    totals: Dict[str, float] = {}
+    weight_sum = 0.0
+    for result, weight in zip(results, weights):
+        if not (isinstance(result, dict) and "labels" in result and "scores" in result):
+            continue
+        weight_sum += weight
+        for label, score in zip(result["labels"], result["scores"]):
+            totals[label] = totals.get(label, 0.0) + score * weight
+    if weight_sum <= 0:
+        return None
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    return {"labels": [label for label, _ in ranked], "scores": [score / weight_sum for _, score in ranked]}
+
+
+def merge_sentiment(results: List[Any], weights: List[float]) -> Optional[List[List[Dict[str, Any]]]]:
+    """
+    Weighted mean of each sentiment label's score across chunks, as one text-classification response.
+    """
+    totals: Dict[str, float] = {}
+    weight_sum = 0.0
+    for result, weight in zip(results, weights):
+        if not (result and isinstance(result, list)):
+            continue
+        entries = result[0] if isinstance(result[0], list) else result
+        if not all(isinstance(e, dict) and "label" in e and "score" in e for e in entries):
+            continue
+        weight_sum += weight
+        for entry in entries:
+            totals[entry["label"]] = totals.get(entry["label"], 0.0) + entry["score"] * weight
+    if weight_sum <= 0:
+        return None
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    return [[{"label": label, "score": score / weight_sum} for label, score in ranked]]
+
+
+def _summary_text(result: Any) -> str:
+    if result and isinstance(result, list) and isinstance(result[0], dict):
+        return result[0].get("summary_text", "") or ""
+    return ""
+
+
+def _chunk_payload(kind: str, payload: Dict[str, Any], chunk: str, chunk_tokens: int) -> Dict[str, Any]:
+    """
+    The call for one chunk. Summary length bounds are set for the whole input,
+    so per chunk max_length is capped at the chunk's own size and a min_length
+    over half of it is dropped rather than forcing the model to pad.
+    """
+    chunk_payload = {**payload, "inputs": chunk}
+    params = payload.get("parameters")
+    if kind != SUMMARY or not isinstance(params, dict):
+        return chunk_payload
+    params = dict(params)
+    if isinstance(params.get("max_length"), int):
+        params["max_length"] = max(1, min(params["max_length"], chunk_tokens))
+    if isinstance(params.get("min_length"), int) and params["min_length"] * 2 > chunk_tokens:
+        del params["min_length"]
+    chunk_payload["parameters"] = params
+    return chunk_payload
+
+
+class _Group:
+    """
+    One original call and its chunk calls, some of them possibly not sent yet.
+    """
+
+    __slots__ = ("kind", "keys", "weights", "call", "round_no", "chunk_calls", "sent", "parts")
+
+    def __init__(self, kind: str, chunk_calls: Dict[str, Call], weights: List[float], call: Call, round_no: int) -> None:
+        self.kind = kind
+        self.keys = list(chunk_calls)
+        self.weights = weights
+        self.call = call
+        self.round_no = round_no
+        self.chunk_calls = chunk_calls
+        self.sent = 0
+        self.parts: Dict[str, Any] = {}
+
+
+class ChunkPlan:
+    """
+    Expands oversized calls into chunk calls and reduces their results.
+
+        plan = ChunkPlan(calls, kind_of)
+        pending = plan.calls
+        while pending:
+            pending = plan.reduce(run_all(pending))
+        plan.results  # name -> merged response
+
+    Calls whose kind is None, or whose input fits the model, pass through
+    unchanged. An input with more than `max_chunks` chunks is sent in waves
+    of `max_chunks`, and summaries may need extra rounds (summary of
+    summaries), so a plan can take several batches; no chunk is dropped.
+    """
+
+    def __init__(self, calls: Dict[str, Call], kind_of: Callable[[str, Dict[str, Any]], Optional[str]],
+                 max_chunks: Optional[int] = None) -> None:
+        self.max_chunks = max(1, max_chunks if max_chunks is not None else int(os.getenv("HF_CHUNK_MAX_CHUNKS", "32")))
+        self.results: Dict[str, Any] = {}
+        self.calls: Dict[str, Call] = {}
+        self._groups: Dict[str, _Group] = {}
+        for name, (model_name, payload) in calls.items():
+            self._expand(name, model_name, payload, kind_of(model_name, payload), 0)
+
+    def _expand(self, name: str, model_name: str, payload: Dict[str, Any], kind: Optional[str], round_no: int) -> None:
+        text = payload.get("inputs")
+        limit = token_limit(model_name)
+        if kind is None or not isinstance(text, str) or estimate_tokens(text) <= limit:
+            group = _Group("", {name: (model_name, payload)}, [1.0], (model_name, payload), round_no)
+        else:
+            chunks = chunk_text(text, limit)
+            if len(chunks) > self.max_chunks:
+                LOGGER.info(f"{name}: {len(chunks)} chunks for {model_name}, sent {self.max_chunks} at a time")
+            weights = [float(max(1, estimate_tokens(chunk))) for chunk in chunks]
+            chunk_calls = {
+                f"{name}#{round_no}.{i}": (model_name, _chunk_payload(kind, payload, chunk, int(tokens)))
+                for i, (chunk, tokens) in enumerate(zip(chunks, weights))
+            }
+            group = _Group(kind, chunk_calls, weights, (model_name, payload), round_no)
+        self._groups[name] = group
+        self._send(group)
+
+    def _send(self, group: _Group) -> None:
+        wave = group.keys[group.sent:group.sent + self.max_chunks]
+        for key in wave:
+            self.calls[key] = group.chunk_calls[key]
+        group.sent += len(wave)
+
+    def reduce(self, results: Dict[str, Any]) -> Dict[str, Call]:
+        """
+        Fold in the results of the last batch of calls; returns the next batch (empty when done).
+        """
+        self.calls = {}
+        for name, group in list(self._groups.items()):
+            if name in self.results:
+                continue
+            for key in group.keys[len(group.parts):group.sent]:
+                group.parts[key] = results.get(key)
+            if group.sent < len(group.keys):
+                self._send(group)
+                continue
+            parts = [group.parts[key] for key in group.keys]
+            if not group.kind:
+                self.results[name] = parts[0]
+            elif group.kind == ZERO_SHOT:
+                self.results[name] = merge_zero_shot(parts, group.weights)
+            elif group.kind == SENTIMENT:
+                self.results[name] = merge_sentiment(parts, group.weights)
+            else:
+                self._reduce_summary(name, parts, group.call, group.round_no)
+        return self.calls
+
+    def _reduce_summary(self, name: str, parts: List[Any], call: Call, round_no: int) -> None:
+        summaries = [text for text in (_summary_text(part) for part in parts) if text]
+        if not summaries:
+            self.results[name] = None
+            return
+        joined = " ".join(summaries)
+        if len(summaries) == 1 or round_no + 1 >= _MAX_REDUCE_ROUNDS:
+            self.results[name] = [{"summary_text": joined}]
+            return
+        model_name, payload = call
+        # One more round: summarize the concatenated chunk summaries (chunked again if still too long).
+        self._expand(name, model_name, {**payload, "inputs": joined}, SUMMARY, round_no + 1)
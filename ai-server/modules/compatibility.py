@@ -0,0 +1,273 @@
+"""
+CV/job compatibility from the embedding similarity of the candidate's skill
+phrases and the job's requirement phrases.
+
+Phrases are embedded with a sentence-embedding model (HF_EMBEDDING_MODEL,
+through HuggingFaceAnalyzer.embed_texts). Vectors are kept L2-normalized in
+a per-text LRU, and each job's requirement vectors are stacked once into a
+matrix, so scoring candidates against a known job is one matrix product.
+A requirement is covered by its best-matching skill: cosine similarity at
+or below HF_COMPAT_SIMILARITY_FLOOR counts as nothing, 1.0 as fully
+covered. The score is the mean coverage, 0-100. When embeddings are
+unavailable the score falls back to case-insensitive phrase matching.
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .utils import LOGGER
+
+# Bullets, semicolons/pipes, sentence ends and commas (Latin and Arabic); lines are split first
+_PHRASE_SPLIT = re.compile(r"[•·▪●;|,،؛]+|(?<=[.!?؟])\s+")
+_PHRASE_STRIP = " \t-–—*:.()[]{}\"'"
+# "Label: value" at the start of a line
+_LABELLED = re.compile(r"^([^\W\d][\w &/+'-]{0,40}?)\s*[:：]\s*(.*)$")
+_CONTACT = re.compile(
+    r"[\w.+-]+@[\w-]+\.[\w.]+|https?://|www\.|linkedin\.com|github\.com|\+?\d[\d\s().-]{6,}\d"
+)
+
+# Section headings whose phrases are skills or requirements, and so come first
+_SKILL_HEADINGS = {
+    "skills", "technical skills", "core skills", "key skills", "hard skills", "soft skills", "skills & tools",
+    "technologies", "tools", "tech stack", "technical stack", "competencies", "core competencies", "expertise",
+    "requirements", "qualifications", "must have", "nice to have", "what you'll need", "what we're looking for",
+    "المهارات", "المهارات التقنية", "المتطلبات", "المؤهلات",
+}
+# Sections whose content is never a skill
+_IGNORED_HEADINGS = {
+    "contact", "contact information", "contact details", "personal information", "personal details",
+    "email", "e-mail", "phone", "mobile", "tel", "address", "location", "name", "linkedin", "github",
+    "website", "date of birth", "nationality", "references", "hobbies", "interests",
+    "معلومات الاتصال", "البريد الإلكتروني", "الهاتف", "العنوان", "الاسم",
+}
+_OTHER_HEADINGS = {
+    "summary", "profile", "about", "about me", "objective", "experience", "work experience",
+    "professional experience", "employment", "projects", "education", "certifications", "certificates",
+    "courses", "training", "languages", "responsibilities", "about the role", "what you'll do",
+    "الخبرة", "الخبرات", "التعليم", "المشاريع", "الشهادات", "اللغات", "الملخص",
+}
+_SKILLS, _IGNORED, _OTHER = "skills", "ignored", "other"
+
+
+def _heading_kind(label: str) -> Optional[str]:
+    label = label.strip(_PHRASE_STRIP).lower()
+    if label in _SKILL_HEADINGS:
+        return _SKILLS
+    if label in _IGNORED_HEADINGS:
+        return _IGNORED
+    if label in _OTHER_HEADINGS:
+        return _OTHER
+    return None
+
+
+def _sectioned_lines(text: str) -> List[Tuple[str, str]]:
+    """
+    (section kind, content) per line. Section headings ("Skills", "Email: ..."
+    style labels) set the kind; once the text has any heading, the block
+    before the first one (name, city, contact details) is dropped.
+    """
+    lines: List[Tuple[str, str]] = []
+    header: List[str] = []
+    kind: Optional[str] = None
+    for raw in str(text or "").splitlines():
+        line = raw.strip().lstrip("•·▪●-–—* \t")
+        if not line:
+            continue
+        heading = _heading_kind(line) if len(line) <= 40 else None
+        labelled = _LABELLED.match(line) if heading is None else None
+        label_kind = _heading_kind(labelled.group(1)) if labelled else None
+        if heading is not None:
+            kind = heading
+        elif label_kind is not None:
+            # "Skills: Python, SQL" is a one-line section
+            kind = kind or _OTHER
+            if label_kind != _IGNORED:
+                lines.append((label_kind, labelled.group(2)))
+        elif kind is None:
+            header.append(line)
+        elif kind != _IGNORED:
+            lines.append((kind, line))
+    # no headings at all: the whole text is body
+    return lines if kind is not None else [(_OTHER, line) for line in header]
+
+
+def extract_phrases(text: Any, limit: Optional[int] = None, known: Sequence[str] = ()) -> List[str]:
+    """
+    Short skill/requirement phrases from free text (lists are taken item by
+    item), de-duplicated case-insensitively, at most HF_COMPAT_MAX_PHRASES.
+
+    `known` (skills the analyzer already extracted) come first, then phrases
+    under skill/requirement headings, then the rest of the body. Contact
+    details, section labels and the header block are dropped.
+    """
+    limit = limit if limit is not None else int(os.getenv("HF_COMPAT_MAX_PHRASES", "64"))
+    if isinstance(text, (list, tuple)):
+        ranked = [str(item) for item in text]
+    else:
+        sections = _sectioned_lines(text)
+        ranked = [line for kind, line in sections if kind == _SKILLS] + [line for kind, line in sections if kind != _SKILLS]
+    candidates = list(known) + [part for line in ranked for part in _PHRASE_SPLIT.split(line)]
+    phrases: Dict[str, str] = {}
+    for item in candidates:
+        phrase = " ".join(item.split()).strip(_PHRASE_STRIP)
+        if not 2 <= len(phrase) <= 200 or _CONTACT.search(phrase) or _heading_kind(phrase) is not None:
+            continue
+        if phrase.lower() not in phrases:
+            phrases[phrase.lower()] = phrase
+            if len(phrases) >= limit:
+                break
+    return list(phrases.values())
+
+
+def _unit_vector(raw: Any) -> np.ndarray:
+    vector = np.asarray(raw, dtype=np.float32)
+    # token-level output (models without a pooling head): mean-pool it
+    while vector.ndim > 1:
+        vector = vector.mean(axis=0)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+def phrase_match_score(skills: Sequence[str], requirements: Sequence[str]) -> float:
+    """
+    Share of requirements (0-100) contained in, or containing, some skill phrase.
+    """
+    if not requirements:
+        return 0.0
+    lowered = [skill.lower() for skill in skills]
+    matched = sum(
+        1 for req in requirements
+        if any(req.lower() in skill or skill in req.lower() for skill in lowered)
+    )
+    return round(matched / len(requirements) * 100, 2)
+
+
+class CompatibilityEngine:
+    """
+    Scores skill phrases against requirement phrases. `embed` maps a list of
+    texts to one vector each (None for a text that could not be embedded).
+    """
+
+    def __init__(self, embed: Callable[[List[str]], List[Optional[Any]]]) -> None:
+        self._embed = embed
+        self.floor = min(float(os.getenv("HF_COMPAT_SIMILARITY_FLOOR", "0.3")), 0.99)
+        self.max_vectors = int(os.getenv("HF_EMBEDDING_CACHE_SIZE", "20000"))
+        self.max_jobs = int(os.getenv("HF_COMPAT_JOB_CACHE_SIZE", "256"))
+        self._vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._jobs: "OrderedDict[Tuple[str, ...], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"embedded": 0, "vector_hits": 0, "job_builds": 0, "job_hits": 0, "scored": 0, "fallbacks": 0}
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        (len(texts), dim) matrix of unit vectors; only texts not seen before are sent to the model.
+        """
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for text in texts:
+                vector = self._vectors.get(text)
+                if vector is not None:
+                    self._vectors.move_to_end(text)
+                    found[text] = vector
+            self._stats["vector_hits"] += len(found)
+
+        missing = [text for text in dict.fromkeys(texts) if text not in found]
+        if missing:
+            raw = self._embed(missing)
+            if len(raw) != len(missing):
+                raise RuntimeError(f"expected {len(missing)} embeddings, got {len(raw)}")
+            for text, vector in zip(missing, raw):
+                if vector is None:
+                    raise RuntimeError(f"no embedding for {text[:40]!r}")
+                found[text] = _unit_vector(vector)
+            with self._lock:
+                self._stats["embedded"] += len(missing)
+                for text in missing:
+                    self._vectors[text] = found[text]
+                while len(self._vectors) > self.max_vectors:
+                    self._vectors.popitem(last=False)
+        return np.stack([found[text] for text in texts])
+
+    def job_matrix(self, requirements: Sequence[str]) -> np.ndarray:
+        """
+        The precomputed (requirements, dim) matrix for a job, built on first use.
+        """
+        key = tuple(requirements)
+        with self._lock:
+            matrix = self._jobs.get(key)
+            if matrix is not None:
+                self._jobs.move_to_end(key)
+                self._stats["job_hits"] += 1
+                return matrix
+        matrix = self.embed(requirements)
+        with self._lock:
+            self._stats["job_builds"] += 1
+            self._jobs[key] = matrix
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        return matrix
+
+    def score(self, skills: Sequence[str], requirements: Sequence[str]) -> float:
+        return self.score_candidates([skills], requirements)[0]
+
+    def score_candidates(self, candidates: Sequence[Sequence[str]], requirements: Sequence[str]) -> List[float]:
+        """
+        Scores (0-100) of several candidates' skill phrases against one job.
+        All skills are stacked into one matrix, so the job is compared with
+        every candidate in a single product; each candidate's best match per
+        requirement is a segmented max over its columns.
+        """
+        scores = [0.0] * len(candidates)
+        nonempty = [i for i, skills in enumerate(candidates) if skills]
+        if not requirements or not nonempty:
+            return scores
+        try:
+            jobs = self.job_matrix(requirements)
+            skills = self.embed([skill for i in nonempty for skill in candidates[i]])
+            starts = np.cumsum([0] + [len(candidates[i]) for i in nonempty[:-1]])
+            best = np.maximum.reduceat(jobs @ skills.T, starts, axis=1)
+            coverage = np.clip((best - self.floor) / (1.0 - self.floor), 0.0, 1.0).mean(axis=0)
+            for i, value in zip(nonempty, coverage):
+                scores[i] = round(float(value) * 100, 2)
+        except Exception as e:
+            LOGGER.warning(f"Embedding compatibility failed, using phrase matching: {e}")
+            with self._lock:
+                self._stats["fallbacks"] += 1
+            for i in nonempty:
+                scores[i] = phrase_match_score(candidates[i], requirements)
+        with self._lock:
+            self._stats["scored"] += len(nonempty)
+        return scores
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "cached_vectors": len(self._vectors),
+                "cached_jobs": len(self._jobs),
+                "similarity_floor": self.floor,
+            }
+
+
+_ENGINE: Optional[CompatibilityEngine] = None
+_ENGINE_LOCK = threading.Lock()
+
+
+def get_compatibility_engine() -> CompatibilityEngine:
+    """
+    Return the process-wide engine (embedding through the shared HF analyzer), creating it on first use.
+    """
+    global _ENGINE
+    if _ENGINE is None:
+        with _ENGINE_LOCK:
+            if _ENGINE is None:
+                from .huggingface_analyzer import get_huggingface_analyzer
+
+                _ENGINE = CompatibilityEngine(lambda texts: get_huggingface_analyzer().embed_texts(texts))
+    return _ENGINE
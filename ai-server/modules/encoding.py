@@ -0,0 +1,104 @@
+"""Response encoding negotiated from Accept / Accept-Encoding: JSON, columnar JSON, MessagePack, gzip."""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flask import Response
+
+from .segments import SegmentTable
+from .utils import LOGGER
+
+JSON = "application/json"
+COLUMNAR_JSON = "application/vnd.smartrecruit.columnar+json"
+MSGPACK = "application/msgpack"
+_MSGPACK_ALIASES = (MSGPACK, "application/x-msgpack", "application/vnd.msgpack")
+
+
+def _get_orjson():
+    try:
+        import orjson  # type: ignore
+        return orjson
+    except Exception:  # pragma: no cover
+        return None
+
+
+def _get_msgpack():
+    try:
+        import msgpack  # type: ignore
+        return msgpack
+    except Exception:  # pragma: no cover
+        return None
+
+
+_ORJSON = _get_orjson()
+_MSGPACK = _get_msgpack()
+
+
+def _rows(obj: Any) -> Any:
+    if isinstance(obj, SegmentTable):
+        return obj.to_dicts()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _columns(obj: Any) -> Any:
+    if isinstance(obj, SegmentTable):
+        return obj.to_columnar()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def dumps_json(payload: Any, columnar: bool = False) -> bytes:
+    """
+    Encode with orjson when installed, otherwise the stdlib encoder.
+    SegmentTables become row dicts, or {"start": [...], ...} when `columnar`.
+    """
+    default: Callable[[Any], Any] = _columns if columnar else _rows
+    if _ORJSON is not None:
+        # non-str keys (e.g. int) are turned into strings, as the stdlib encoder does
+        return _ORJSON.dumps(payload, default=default, option=_ORJSON.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _negotiate(accept: str) -> str:
+    accept = (accept or "").lower()
+    if _MSGPACK is not None and any(alias in accept for alias in _MSGPACK_ALIASES):
+        return MSGPACK
+    if COLUMNAR_JSON in accept:
+        return COLUMNAR_JSON
+    return JSON
+
+
+def encode_body(payload: Any, accept: str = "") -> Tuple[bytes, str]:
+    """
+    Serialize `payload` for the given Accept header; returns (body, mimetype).
+    """
+    mimetype = _negotiate(accept)
+    if mimetype == MSGPACK:
+        return _MSGPACK.packb(payload, default=_columns, use_bin_type=True), MSGPACK
+    if mimetype == COLUMNAR_JSON:
+        return dumps_json(payload, columnar=True), COLUMNAR_JSON
+    return dumps_json(payload), JSON
+
+
+def encoded_response(payload: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Build a Flask response for the current request, negotiating the format
+    from Accept and gzip-compressing large bodies when Accept-Encoding allows.
+    The default (application/json) body carries the same data as jsonify's,
+    but keys keep their insertion order (jsonify sorts them), non-ASCII text
+    is not escaped, and with orjson NaN/Infinity are written as null.
+    """
+    from flask import request
+
+    body, mimetype = encode_body(payload, request.headers.get("Accept", ""))
+    response_headers = {"Vary": "Accept, Accept-Encoding", **(headers or {})}
+    min_gzip = int(os.getenv("RESPONSE_GZIP_MIN_BYTES", "1024"))
+    if min_gzip >= 0 and len(body) >= min_gzip and "gzip" in request.headers.get("Accept-Encoding", "").lower():
+        compressed = gzip.compress(body, compresslevel=int(os.getenv("RESPONSE_GZIP_LEVEL", "5")))
+        if len(compressed) < len(body):
+            LOGGER.debug(f"gzip response {len(body)} -> {len(compressed)} bytes")
+            body = compressed
+            response_headers["Content-Encoding"] = "gzip"
+    return Response(body, status=status, content_type=mimetype, headers=response_headers)
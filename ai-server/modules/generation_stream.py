@@ -0,0 +1,113 @@
+"""
+Token streaming for text generation: parsing the Inference API's
+server-sent events and stripping the [INST] prompt as tokens arrive.
+"""
+from __future__ import annotations
+
+import json
+from typing import Optional
+
+MARKER = "[/INST]"
+_ECHO_PREFIXES = ("<s>", "[INST]")
+
+
+class StreamError(RuntimeError):
+    """
+    An error event inside a generation stream (the HTTP status was already 200).
+    """
+
+
+def parse_stream_line(line: bytes) -> Optional[str]:
+    """
+    One line of a text-generation SSE stream: the token text, "" for
+    special tokens and keep-alives, or None for non-data lines. Raises
+    StreamError on an error event.
+    """
+    line = line.strip()
+    if not line.startswith(b"data:"):
+        return None
+    body = line[len(b"data:"):].strip()
+    if not body or body == b"[DONE]":
+        return ""
+    event = json.loads(body.decode("utf-8"))
+    if isinstance(event, dict) and event.get("error"):
+        raise StreamError(str(event["error"]))
+    token = (event.get("token") if isinstance(event, dict) else None) or {}
+    if token.get("special"):
+        return ""
+    return token.get("text") or ""
+
+
+def is_event_stream(content_type: Optional[str]) -> bool:
+    return "text/event-stream" in (content_type or "")
+
+
+def parse_whole_response(body: bytes) -> str:
+    """
+    The raw generated_text of a plain JSON reply, from models whose backend
+    ignores "stream" and answers in one piece.
+    """
+    result = json.loads(body.decode("utf-8"))
+    if isinstance(result, dict) and result.get("error"):
+        raise StreamError(str(result["error"]))
+    if isinstance(result, list) and result and isinstance(result[0], dict):
+        return result[0].get("generated_text") or ""
+    return ""
+
+
+def _could_be_echo(head: str) -> bool:
+    if not head or head.startswith(_ECHO_PREFIXES):
+        return True
+    return any(prefix.startswith(head) for prefix in _ECHO_PREFIXES)
+
+
+class InstStripper:
+    """
+    Incremental form of the clean-up in HuggingFaceAnalyzer._parse_generation.
+
+    If the model echoes the "<s>[INST] ... [/INST]" prompt, nothing is
+    released until the closing marker has passed. Afterwards text is
+    released as it arrives (leading whitespace trimmed), except for a tail
+    that may be the start of a "[/INST]" marker; complete markers are dropped.
+    """
+
+    def __init__(self) -> None:
+        self._pending = ""
+        self._in_echo = True
+        self._released = False
+
+    def feed(self, text: str) -> str:
+        self._pending += text
+        if self._in_echo:
+            head = self._pending.lstrip()
+            if MARKER in head:
+                self._pending = head.rsplit(MARKER, 1)[1].lstrip()
+            elif _could_be_echo(head):
+                return ""
+            else:
+                self._pending = head
+            self._in_echo = False
+        if not self._released:
+            self._pending = self._pending.lstrip()
+        return self._drain()
+
+    def flush(self) -> str:
+        """
+        Whatever is still held back, at the end of the stream.
+        """
+        rest = self._pending.strip() if self._in_echo else self._pending
+        self._pending = ""
+        return rest
+
+    def _drain(self) -> str:
+        if MARKER in self._pending:
+            self._pending = "".join(self._pending.split(MARKER))
+        hold = 0
+        for size in range(min(len(MARKER) - 1, len(self._pending)), 0, -1):
+            if MARKER.startswith(self._pending[-size:]):
+                hold = size
+                break
+        out = self._pending[:len(self._pending) - hold]
+        self._pending = self._pending[len(self._pending) - hold:]
+        self._released = self._released or bool(out)
+        return out
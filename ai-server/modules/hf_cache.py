@@ -0,0 +1,239 @@
+"""Two-tier (in-process LRU + shared SQLite) cache of Hugging Face inference responses."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from .utils import LOGGER
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hf_responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+
+# Expired rows are swept, and the row cap enforced, once every this many stores.
+_SWEEP_EVERY = 200
+
+
+def _default_db_path() -> str:
+    here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.getenv("HF_CACHE_DB", os.path.join(here, "data", "hf_cache.db"))
+
+
+def _parse_model_ttls() -> Dict[str, float]:
+    """
+    HF_CACHE_MODEL_TTLS: comma separated model=seconds pairs; 0 disables caching for that model.
+    """
+    ttls: Dict[str, float] = {}
+    for item in os.getenv("HF_CACHE_MODEL_TTLS", "").split(","):
+        model, _, value = item.rpartition("=")
+        if model.strip() and value.strip():
+            try:
+                ttls[model.strip()] = float(value)
+            except ValueError:
+                LOGGER.warning(f"Ignoring bad HF_CACHE_MODEL_TTLS entry: {item}")
+    return ttls
+
+
+def _cacheable(payload: Dict[str, Any], value: Any) -> bool:
+    if not value:
+        return False
+    if isinstance(value, dict) and "error" in value:
+        return False
+    # Sampled generations are meant to differ between calls.
+    params = payload.get("parameters") or {}
+    return not (isinstance(params, dict) and params.get("do_sample"))
+
+
+class HFResponseCache:
+    """
+    Responses keyed by model name plus a canonical hash of the payload.
+
+    Lookups check an in-process LRU first, then a SQLite file (WAL mode)
+    shared by all gunicorn workers; disk hits are promoted to memory. Each
+    entry expires after its model's TTL. Only successful responses are
+    stored.
+    """
+
+    def __init__(self, path: Optional[str] = None, memory_entries: Optional[int] = None,
+                 default_ttl: Optional[float] = None, model_ttls: Optional[Dict[str, float]] = None,
+                 max_disk_entries: Optional[int] = None) -> None:
+        self.path = path or _default_db_path()
+        self.memory_entries = memory_entries if memory_entries is not None else int(os.getenv("HF_CACHE_MEMORY_ENTRIES", "2048"))
+        self.default_ttl = default_ttl if default_ttl is not None else float(os.getenv("HF_CACHE_TTL_SECONDS", "86400"))
+        self.model_ttls = model_ttls if model_ttls is not None else _parse_model_ttls()
+        self.max_disk_entries = max_disk_entries if max_disk_entries is not None else int(os.getenv("HF_CACHE_MAX_ENTRIES", "50000"))
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stores_since_sweep = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "skipped": 0, "errors": 0}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS hf_responses_expires ON hf_responses (expires_at)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        # the connection's own context manager only commits; closing() releases it
+        with closing(conn), conn:
+            yield conn
+
+    @staticmethod
+    def key(model_name: str, payload: Dict[str, Any]) -> str:
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(f"{model_name}\n{canonical}".encode("utf-8")).hexdigest()
+
+    def ttl(self, model_name: str) -> float:
+        return self.model_ttls.get(model_name, self.default_ttl)
+
+    def get(self, model_name: str, payload: Dict[str, Any]) -> Optional[Any]:
+        """
+        The cached response, or None on a miss.
+        """
+        if self.ttl(model_name) <= 0:
+            return None
+        key = self.key(model_name, payload)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM hf_responses WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+        except Exception as e:
+            LOGGER.warning(f"HF cache read failed: {e}")
+            row = None
+            with self._lock:
+                self._stats["errors"] += 1
+        if row is None:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+        value = json.loads(row[0])
+        with self._lock:
+            self._stats["disk_hits"] += 1
+            self._remember(key, row[1], value)
+        return value
+
+    def put(self, model_name: str, payload: Dict[str, Any], value: Any) -> None:
+        ttl = self.ttl(model_name)
+        if ttl <= 0 or not _cacheable(payload, value):
+            with self._lock:
+                self._stats["skipped"] += 1
+            return
+        key = self.key(model_name, payload)
+        now = time.time()
+        expires_at = now + ttl
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO hf_responses (key, model, value, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, model_name, json.dumps(value, ensure_ascii=False), now, expires_at),
+                )
+        except Exception as e:
+            LOGGER.warning(f"HF cache write failed: {e}")
+            with self._lock:
+                self._stats["errors"] += 1
+            return
+        with self._lock:
+            self._stats["stores"] += 1
+            self._remember(key, expires_at, value)
+            self._stores_since_sweep += 1
+            sweep = self._stores_since_sweep >= _SWEEP_EVERY
+            if sweep:
+                self._stores_since_sweep = 0
+        if sweep:
+            self.sweep()
+
+    def sweep(self) -> int:
+        """
+        Delete expired rows and the oldest rows beyond HF_CACHE_MAX_ENTRIES.
+        """
+        try:
+            with self._connect() as conn:
+                removed = conn.execute("DELETE FROM hf_responses WHERE expires_at <= ?", (time.time(),)).rowcount
+                if self.max_disk_entries > 0:
+                    removed += conn.execute(
+                        "DELETE FROM hf_responses WHERE key IN ("
+                        "SELECT key FROM hf_responses ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_disk_entries,),
+                    ).rowcount
+            return removed
+        except Exception as e:
+            LOGGER.warning(f"HF cache sweep failed: {e}")
+            return 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM hf_responses")
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            with self._connect() as conn:
+                disk_entries = conn.execute("SELECT COUNT(*) FROM hf_responses").fetchone()[0]
+        except Exception:
+            disk_entries = None
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "default_ttl": self.default_ttl,
+                "model_ttls": dict(self.model_ttls),
+                "path": self.path,
+            }
+
+    # -- internals (callers hold self._lock) --
+
+    def _remember(self, key: str, expires_at: float, value: Any) -> None:
+        if self.memory_entries <= 0:
+            return
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+
+_CACHE: Optional[HFResponseCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_hf_cache() -> Optional[HFResponseCache]:
+    """
+    Return the process-wide cache, or None when HF_CACHE_ENABLED is false.
+    """
+    global _CACHE
+    if os.getenv("HF_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = HFResponseCache()
+    return _CACHE
@@ -0,0 +1,135 @@
+"""Shared keep-alive HTTP connection pool for Hugging Face Inference API calls."""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .utils import LOGGER
+
+
+def _timeouts() -> Tuple[float, float]:
+    return (
+        float(os.getenv("HF_CONNECT_TIMEOUT_SECONDS", "5")),
+        float(os.getenv("HF_READ_TIMEOUT_SECONDS", "60")),
+    )
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    HTTPAdapter with a default (connect, read) timeout and request counters.
+    One instance is mounted on every session, so all threads draw from the
+    same per-host urllib3 pools.
+    """
+
+    def __init__(self, pool_connections: int, pool_maxsize: int, pool_block: bool,
+                 timeout: Tuple[float, float]) -> None:
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        self.default_timeout = timeout
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0}
+
+    def send(self, request: Any, **kwargs: Any) -> Any:
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.default_timeout
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["in_flight"] += 1
+            self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._stats["in_flight"])
+        try:
+            return super().send(request, **kwargs)
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._stats["in_flight"] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        hosts: Dict[str, Any] = {}
+        pools = getattr(self.poolmanager, "pools", None)
+        for key in list(pools.keys()) if pools is not None else []:
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            idle = pool.pool.qsize() if getattr(pool, "pool", None) is not None else 0
+            hosts[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                # Connections opened over the pool's lifetime; low relative to requests means keep-alive works.
+                "connections_opened": getattr(pool, "num_connections", 0),
+                "requests": getattr(pool, "num_requests", 0),
+                "idle": idle,
+                "maxsize": self._pool_maxsize,
+            }
+        with self._lock:
+            counters = dict(self._stats)
+        return {
+            **counters,
+            "pool_connections": self._pool_connections,
+            "pool_maxsize": self._pool_maxsize,
+            "pool_block": self._pool_block,
+            "timeout": {"connect": self.default_timeout[0], "read": self.default_timeout[1]},
+            "hosts": hosts,
+        }
+
+
+_ADAPTER: Optional[PooledAdapter] = None
+_ADAPTER_LOCK = threading.Lock()
+
+
+def get_http_adapter() -> PooledAdapter:
+    """
+    Return the process-wide adapter, sized from HF_POOL_CONNECTIONS (host
+    pools kept), HF_POOL_MAXSIZE (connections per host) and HF_POOL_BLOCK.
+    """
+    global _ADAPTER
+    if _ADAPTER is None:
+        with _ADAPTER_LOCK:
+            if _ADAPTER is None:
+                _ADAPTER = PooledAdapter(
+                    pool_connections=int(os.getenv("HF_POOL_CONNECTIONS", "4")),
+                    pool_maxsize=int(os.getenv("HF_POOL_MAXSIZE", "16")),
+                    pool_block=os.getenv("HF_POOL_BLOCK", "true").lower() == "true",
+                    timeout=_timeouts(),
+                )
+    return _ADAPTER
+
+
+def new_session() -> requests.Session:
+    """
+    A Session backed by the shared adapter. Sessions are cheap; the
+    connections live in the adapter.
+    """
+    session = requests.Session()
+    adapter = get_http_adapter()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_CONFIGURED = False
+
+
+def configure_hf_http_backend() -> bool:
+    """
+    Make huggingface_hub build its (per-thread) sessions on the shared adapter.
+    Returns False when the installed huggingface_hub has no requests backend hook.
+    """
+    global _CONFIGURED
+    if _CONFIGURED:
+        return True
+    try:
+        from huggingface_hub import configure_http_backend  # type: ignore
+    except ImportError:
+        LOGGER.warning("huggingface_hub has no configure_http_backend; HF calls will not use the shared pool")
+        return False
+    configure_http_backend(backend_factory=new_session)
+    _CONFIGURED = True
+    return True
+
+
+def pool_stats() -> Dict[str, Any]:
+    return {"configured": _CONFIGURED, **get_http_adapter().stats()}
@@ -2,9 +2,20 @@
 Hugging Face API integration for 5-step analysis using InferenceClient
 """
 import os
-from typing import Dict, List, Optional, Any
-from huggingface_hub import InferenceClient
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import closing
+from typing import Callable, Dict, Iterator, List, Optional, Any, Tuple
+from huggingface_hub import InferenceClient, constants
 from modules.utils import LOGGER
+from modules.http_pool import configure_hf_http_backend, new_session
+from modules.hf_cache import get_hf_cache
+from modules.chunking import SENTIMENT, SUMMARY, ZERO_SHOT, ChunkPlan, chunking_enabled
+from modules.local_inference import LOCAL, InferenceBackend, RemoteInferenceBackend, backend_for, get_local_backend
+from modules.model_router import AUTH, EMPTY, classify_error, get_generation_router
+from modules.generation_stream import InstStripper, is_event_stream, parse_stream_line, parse_whole_response
+from modules.compatibility import extract_phrases
 
 
 class HuggingFaceAnalyzer:
@@ -13,8 +24,15 @@ class HuggingFaceAnalyzer:
         if not self.api_token:
             raise ValueError("HUGGINGFACE_API_TOKEN not found in environment")
         
-        # Initialize the client (handles URL routing automatically)
+        # كل الاتصالات تمر عبر pool مشترك (keep-alive) بدل اتصال TLS جديد لكل طلب
+        configure_hf_http_backend()
+
+        # Initialize the clients once (handles URL routing automatically)
         self.client = InferenceClient(token=self.api_token)
+        self.public_client = InferenceClient(token=None)
+        self.remote = RemoteInferenceBackend(self.client, self.public_client, self._model_url)
+        # بديل محلي للـ API (مثلاً benchmarks/hf_stub.py) لاختبارات الحمل
+        self.inference_endpoint = os.getenv("HF_INFERENCE_ENDPOINT", "").rstrip("/")
         
         # نماذج التحليل المختلفة
         self.models = {
@@ -23,6 +41,7 @@ class HuggingFaceAnalyzer:
             "text_summarization": "facebook/bart-large-cnn",
             "text_classification": "facebook/bart-large-mnli",
             "arabic_nlp": "aubmindlab/bert-base-arabertv02",
+            "embedding": os.getenv("HF_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2"),
             "generation": "HuggingFaceH4/zephyr-7b-beta",
             "generation_fallback": [
                 "mistralai/Mistral-7B-Instruct-v0.2",
@@ -32,57 +51,486 @@ class HuggingFaceAnalyzer:
             ]
         }
     
-    def _make_api_call(self, model_name: str, payload: Dict, use_token: bool = True) -> Optional[Any]:
-        """API call to Hugging Face using InferenceClient"""
+    def _fetch(self, model_name: str, payload: Dict, use_token: bool = True,
+               deadline: Optional[float] = None) -> Any:
+        """API call to Hugging Face on the task's backends; raises on failure"""
+        return self._fetch_with_backend(model_name, payload, use_token, deadline)[1]
+
+    def _fetch_with_backend(self, model_name: str, payload: Dict, use_token: bool = True,
+                            deadline: Optional[float] = None, use_cache: bool = True) -> Tuple[InferenceBackend, Any]:
+        """Like _fetch, but also returns the backend that answered"""
+        task = self._task_of(model_name, payload)
+        *preferred, last = self._backends(task)
+        for backend in preferred:
+            try:
+                return backend, self._run_backend(backend, task, model_name, payload, use_token, deadline, use_cache)
+            except Exception as e:
+                LOGGER.warning(f"{backend.name.capitalize()} {task} inference failed, falling back to {last.name}: {e}")
+        return last, self._run_backend(last, task, model_name, payload, use_token, deadline, use_cache)
+
+    def _backends(self, task: Optional[str]) -> List[InferenceBackend]:
+        """الـ backends بالترتيب: المحلي أولاً إن كان مختاراً ومتاحاً للمهمة، ثم الـ API"""
+        if backend_for(task) == LOCAL and get_local_backend().available():
+            return [get_local_backend(), self.remote]
+        return [self.remote]
+
+    def _run_backend(self, backend: InferenceBackend, task: Optional[str], model_name: str,
+                     payload: Dict, use_token: bool = True, deadline: Optional[float] = None,
+                     use_cache: bool = True) -> Any:
+        # نفس النموذج ونفس الـ payload => نفس النتيجة، نعيدها من الكاش
+        cache = get_hf_cache() if use_cache else None
+        cache_name = backend.cache_name(task, model_name)
+        if cache is not None:
+            cached = cache.get(cache_name, payload)
+            if cached is not None:
+                return cached
+        # المهلة المتبقية تُمرَّر للطلب نفسه حتى يتحرر الـ thread عند انتهائها
+        timeout = None
+        if deadline is not None:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                raise TimeoutError(f"deadline passed before the {backend.name} call to {model_name}")
+        result = backend.run(task, model_name, payload, use_token, timeout=timeout)
+        if cache is not None:
+            cache.put(cache_name, payload, result)
+        return result
+
+    def _model_url(self, model_name: str) -> str:
+        """عنوان النموذج: عبر HF_INFERENCE_ENDPOINT إن وُجد، وإلا يحدده الـ client"""
+        if self.inference_endpoint and not model_name.startswith(("http://", "https://")):
+            return f"{self.inference_endpoint}/models/{model_name}"
+        if model_name == self.models["embedding"]:
+            # نماذج sentence-transformers تعمل افتراضياً كـ sentence-similarity؛ نطلب feature-extraction صراحةً
+            return f"{constants.INFERENCE_ENDPOINT}/pipeline/feature-extraction/{model_name}"
+        return model_name
+
+    def _make_api_call(self, model_name: str, payload: Dict, use_token: bool = True,
+                       deadline: Optional[float] = None) -> Optional[Any]:
+        """API call to Hugging Face using InferenceClient; None on failure"""
         try:
-            # We use the generic post method to maintain compatibility with existing payload structure
-            # If use_token is False, we create a temporary client without token (though most router endpoints require auth now)
-            client = self.client if use_token else InferenceClient(token=None)
-            
-            # The client.post method expects json body
-            response = client.post(json=payload, model=model_name)
-            
-            # response is already parsed JSON (bytes or dict/list depending on response)
-            import json
-            return json.loads(response.decode('utf-8'))
-                
+            return self._fetch(model_name, payload, use_token, deadline)
         except Exception as e:
             LOGGER.error(f"HF API error for {model_name} (Token={use_token}): {e}")
             return None
     
-    def generate_text(self, prompt: str, params: Optional[Dict] = None) -> str:
-        """توليد نص باستخدام نموذج توليدي مع محاولات احتياطية"""
+    def _call_concurrently(self, calls: Dict[str, Tuple[str, Dict]],
+                           call: Optional[Callable[..., Optional[Any]]] = None) -> Dict[str, Optional[Any]]:
+        """
+        Run independent _make_api_call's (or `call`'s, same signature) on the shared call executor.
+        A call that runs longer than HF_CALL_TIMEOUT_SECONDS yields None, like
+        any failed call; time spent queued behind other calls does not count.
+        The deadline is also passed down to the request, so a timed-out call
+        gives its executor thread back instead of running on in the background.
+        """
+        timeout = float(os.getenv("HF_CALL_TIMEOUT_SECONDS", "60"))
+        call = call or self._make_api_call
+        started: Dict[str, float] = {}
+
+        def timed_call(name: str, model_name: str, payload: Dict) -> Optional[Any]:
+            started[name] = time.time()
+            return call(model_name, payload, deadline=started[name] + timeout)
+
+        futures = {
+            name: _call_executor().submit(timed_call, name, model_name, payload)
+            for name, (model_name, payload) in calls.items()
+        }
+        results: Dict[str, Optional[Any]] = {}
+        for name, future in futures.items():
+            model_name = calls[name][0]
+            while True:
+                begun = started.get(name)
+                remaining = timeout if begun is None else begun + timeout - time.time()
+                try:
+                    results[name] = future.result(timeout=max(0.0, remaining))
+                except FutureTimeoutError:
+                    if begun is None:
+                        # was still queued; wait again from its own start time
+                        continue
+                    LOGGER.error(f"HF API call to {model_name} timed out after {timeout}s")
+                    results[name] = None
+                except Exception as e:
+                    LOGGER.error(f"HF API error for {model_name}: {e}")
+                    results[name] = None
+                break
+        return results
+
+    def _task_of(self, model_name: str, payload: Dict) -> Optional[str]:
+        """نوع المهمة (zero-shot / sentiment / summary) أو None للتوليد وغيره"""
+        params = payload.get("parameters") or {}
+        if isinstance(params, dict) and "candidate_labels" in params:
+            return ZERO_SHOT
+        if model_name == self.models["text_summarization"]:
+            return SUMMARY
+        if model_name == self.models["sentiment_analysis"]:
+            return SENTIMENT
+        return None
+
+    def _chunk_kind(self, model_name: str, payload: Dict) -> Optional[str]:
+        """نوع الدمج المناسب لنتائج الأجزاء، أو None إذا كان الطلب لا يُقسَّم"""
+        return self._task_of(model_name, payload) if chunking_enabled() else None
+
+    def _call_chunked(self, calls: Dict[str, Tuple[str, Dict]]) -> Dict[str, Optional[Any]]:
+        """
+        Like _call_concurrently, but inputs longer than the model's limit are split
+        on sentence boundaries, sent as parallel chunk calls and merged back.
+        """
+        plan = ChunkPlan(calls, self._chunk_kind)
+        pending = plan.calls
+        while pending:
+            pending = plan.reduce(self._call_concurrently(pending))
+        return plan.results
+
+    def run_concurrently(self, tasks: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+        """
+        Run independent analyses (e.g. analyze_cv_text, refine_transcript) side by side.
+        Each analysis keeps its own error fallback; their remote calls share the call executor.
+        """
+        futures = {name: _analysis_executor().submit(task) for name, task in tasks.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    # -- payloads and parsing, shared with AsyncHuggingFaceAnalyzer --
+
+    def _generation_payload(self, prompt: str, params: Optional[Dict] = None) -> Dict[str, Any]:
+        return {
+            "inputs": f"<s>[INST] {prompt} [/INST]",
+            "parameters": params or {
+                "max_new_tokens": 512,
+                "temperature": 0.3,
+                "top_p": 0.9,
+                "do_sample": True
+            }
+        }
+
+    def _generation_models(self) -> List[str]:
+        # محاولة النموذج الأساسي
+        return [self.models["generation"]] + self.models["generation_fallback"]
+
+    @staticmethod
+    def _parse_generation(result: Any) -> str:
+        if result and isinstance(result, list) and len(result) > 0:
+            generated = result[0].get("generated_text", "")
+            # تنظيف النص
+            if "[/INST]" in generated:
+                generated = generated.split("[/INST]")[-1].strip()
+            if generated.strip(): # تأكد من أن النص ليس فارغاً
+                return generated
+        return ""
+
+    def _try_generation(self, model: str, payload: Dict) -> str:
+        """محاولة واحدة مع نموذج توليد واحد، وتسجيل النتيجة في الـ router"""
+        started = time.time()
+        kind = None
+        try:
+            result = self._fetch(model, payload, use_token=True)
+        except Exception as e:
+            kind = classify_error(e)
+            LOGGER.error(f"HF API error for {model} (Token=True, {kind}): {e}")
+            result = None
+            # Only an auth failure can be fixed by going unauthenticated (public model)
+            if kind == AUTH:
+                LOGGER.info(f"Retrying {model} without token...")
+                try:
+                    result = self._fetch(model, payload, use_token=False)
+                    kind = None
+                except Exception as e:
+                    kind = classify_error(e)
+                    LOGGER.error(f"HF API error for {model} (Token=False, {kind}): {e}")
+        return self._record_generation(model, result, kind, started)
+
+    def _record_generation(self, model: str, result: Any, kind: Optional[str], started: float) -> str:
+        generated = self._parse_generation(result)
+        latency = time.time() - started
+        if generated:
+            get_generation_router().record_success(model, latency)
+        else:
+            get_generation_router().record_failure(model, kind or EMPTY, latency)
+        return generated
+
+    def _api_request(self, model_name: str, use_token: bool) -> Tuple[str, Dict[str, str]]:
+        """عنوان وترويسات طلب يُرسل مباشرة دون InferenceClient (البث، والنسخة async)"""
+        url = self._model_url(model_name)
+        if not url.startswith(("http://", "https://")):
+            url = f"{constants.INFERENCE_ENDPOINT}/models/{model_name}"
+        headers: Dict[str, str] = {}
+        if use_token:
+            headers["Authorization"] = f"Bearer {self.api_token}"
+        return url, headers
+
+    def _open_stream(self, model: str, payload: Dict, use_token: bool) -> Any:
+        # يُرسل مباشرة عبر الـ pool لأن الـ client لا يتيح إغلاق اتصال البث
+        url, headers = self._api_request(model, use_token)
+        headers["Accept"] = "text/event-stream"
+        response = new_session().post(url, json={**payload, "stream": True}, headers=headers, stream=True)
+        try:
+            response.raise_for_status()
+        except Exception:
+            response.close()
+            raise
+        return response
+
+    def _stream_model(self, model: str, payload: Dict) -> Iterator[str]:
+        """بث نموذج واحد مع تنظيف [INST] تدريجياً؛ إعادة المحاولة بدون token عند خطأ المصادقة فقط"""
+        try:
+            response = self._open_stream(model, payload, use_token=True)
+        except Exception as e:
+            if classify_error(e) != AUTH:
+                raise
+            LOGGER.info(f"Retrying {model} stream without token...")
+            response = self._open_stream(model, payload, use_token=False)
+
+        stripper = InstStripper()
         try:
-            payload = {
-                "inputs": f"<s>[INST] {prompt} [/INST]",
-                "parameters": params or {
-                    "max_new_tokens": 512,
-                    "temperature": 0.3,
-                    "top_p": 0.9,
-                    "do_sample": True
-                }
+            if is_event_stream(response.headers.get("Content-Type")):
+                tokens = (parse_stream_line(line) for line in response.iter_lines())
+            else:
+                tokens = iter([parse_whole_response(response.content)])
+            for token in tokens:
+                text = stripper.feed(token) if token else ""
+                if text:
+                    yield text
+            tail = stripper.flush()
+            if tail:
+                yield tail
+        finally:
+            # إغلاق الاتصال يوقف التوليد في المصدر عندما ينقطع العميل
+            response.close()
+
+    def _question_call(self, question_text: str) -> Tuple[str, Dict]:
+        payload = {
+            "inputs": question_text,
+            "parameters": {
+                "candidate_labels": ["technical", "behavioral", "experience", "education", "skills"]
+            }
+        }
+        return self.models["question_classification"], payload
+
+    @staticmethod
+    def _parse_question(result: Any) -> Dict[str, Any]:
+        if result and "labels" in result and "scores" in result:
+            # نحصل على أعلى تصنيف
+            max_score_idx = result["scores"].index(max(result["scores"]))
+            question_type = result["labels"][max_score_idx]
+            confidence = result["scores"][max_score_idx]
+            
+            return {
+                "type": question_type,
+                "confidence": confidence,
+                "all_scores": dict(zip(result["labels"], result["scores"]))
+            }
+        
+        return {"type": "unknown", "confidence": 0.0, "all_scores": {}}
+
+    def _question_batch_calls(self, questions: List[str]) -> Tuple[Dict[str, Any], Dict[str, Tuple[str, Dict]], Dict[str, List[str]]]:
+        """
+        Split distinct questions into those already in the response cache (under the same key
+        as analyze_question) and zero-shot calls with up to HF_QUESTION_BATCH_SIZE inputs each.
+        """
+        batch_size = max(1, int(os.getenv("HF_QUESTION_BATCH_SIZE", "16")))
+        cache = get_hf_cache()
+        known: Dict[str, Any] = {}
+        pending: List[str] = []
+        for question in dict.fromkeys(questions):
+            cached = self._cached_question(cache, question) if cache is not None else None
+            if cached is not None:
+                known[question] = cached
+            else:
+                pending.append(question)
+
+        calls: Dict[str, Tuple[str, Dict]] = {}
+        batches: Dict[str, List[str]] = {}
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            model_name, payload = self._question_call(batch[0])
+            name = f"batch{start // batch_size}"
+            calls[name] = (model_name, {**payload, "inputs": batch})
+            batches[name] = batch
+        return known, calls, batches
+
+    def _cached_question(self, cache: Any, question: str) -> Optional[Any]:
+        # نفس مفاتيح الكاش التي يستخدمها _fetch للسؤال المفرد، بترتيب الـ backends (المحلي ثم الـ API)
+        model_name, payload = self._question_call(question)
+        for backend in self._backends(ZERO_SHOT):
+            cached = cache.get(backend.cache_name(ZERO_SHOT, model_name), payload)
+            if cached is not None:
+                return cached
+        return None
+
+    def _question_batch(self, model_name: str, payload: Dict,
+                        deadline: Optional[float] = None) -> Optional[Tuple[str, Any]]:
+        """
+        One batched zero-shot call, not cached as a whole (its questions are cached
+        one by one). (cache namespace of the backend that answered, result); None on failure.
+        """
+        try:
+            backend, result = self._fetch_with_backend(model_name, payload, deadline=deadline, use_cache=False)
+        except Exception as e:
+            LOGGER.error(f"HF API error for {model_name} (question batch): {e}")
+            return None
+        return backend.cache_name(ZERO_SHOT, model_name), result
+
+    def _collect_question_batches(self, known: Dict[str, Any], batches: Dict[str, List[str]],
+                                  results: Dict[str, Optional[Tuple[str, Any]]]) -> List[str]:
+        """
+        Spread batched responses over their questions, caching each one singly under
+        the namespace of the backend that answered; returns the questions whose batch
+        failed, to be retried one by one.
+        """
+        cache = get_hf_cache()
+        missing: List[str] = []
+        for name, batch in batches.items():
+            cache_name, result = results.get(name) or (None, None)
+            # a single input may come back unwrapped
+            if isinstance(result, dict) and len(batch) == 1:
+                result = [result]
+            if not (isinstance(result, list) and len(result) == len(batch)):
+                missing.extend(batch)
+                continue
+            for question, item in zip(batch, result):
+                known[question] = item
+                if cache is not None:
+                    cache.put(cache_name, self._question_call(question)[1], item)
+        return missing
+
+    def _cv_calls(self, cv_text: str) -> Dict[str, Tuple[str, Dict]]:
+        # تحليل المهارات
+        skills_payload = {
+            "inputs": cv_text,
+            "parameters": {
+                "candidate_labels": ["technical_skills", "soft_skills", "languages", "education", "experience"]
+            }
+        }
+        
+        # تلخيص النص
+        summary_payload = {
+            "inputs": cv_text,
+            "parameters": {
+                "max_length": 150,
+                "min_length": 50
+            }
+        }
+        return {
+            "skills": (self.models["text_classification"], skills_payload),
+            "summary": (self.models["text_summarization"], summary_payload),
+        }
+
+    def _skill_phrases(self, text: str) -> List[str]:
+        """عبارات المهارات/المتطلبات، تبدأ بالكلمات التقنية التي يعرفها _extract_keywords"""
+        return extract_phrases(text, known=self._extract_keywords(text, limit=None))
+
+    def _parse_cv(self, skills_result: Any, summary_result: Any, cv_text: str = "") -> Dict[str, Any]:
+        analysis = {
+            "skills": {},
+            "summary": "",
+            "education_level": "unknown",
+            "experience_years": 0,
+            # عبارات المهارات التي يُحسب منها التوافق مع متطلبات الوظيفة
+            "skill_phrases": self._skill_phrases(cv_text)
+        }
+        
+        if skills_result and "labels" in skills_result:
+            analysis["skills"] = dict(zip(skills_result["labels"], skills_result["scores"]))
+        
+        if summary_result and isinstance(summary_result, list) and len(summary_result) > 0:
+            analysis["summary"] = summary_result[0].get("summary_text", "")
+        
+        return analysis
+
+    @staticmethod
+    def _job_text(job: Any) -> str:
+        """وصف الوظيفة كنص للتحليل المحلي (الكلمات المفتاحية والخبرة)؛ الواجهات ترسله أحياناً ككائن {position, required_skills, key_topics}"""
+        if isinstance(job, dict):
+            parts = [str(job.get("position") or "")]
+            for field in ("required_skills", "key_topics"):
+                parts.append(", ".join(str(item) for item in job.get(field) or []))
+            return ". ".join(part for part in parts if part)
+        return str(job or "")
+
+    def _requirement_phrases(self, job: Any) -> List[str]:
+        if isinstance(job, dict):
+            return extract_phrases(list(job.get("required_skills") or []) + list(job.get("key_topics") or []))
+        return self._skill_phrases(str(job or ""))
+
+    def _job_call(self, job_text: str) -> Tuple[str, Dict]:
+        payload = {
+            "inputs": job_text,
+            "parameters": {
+                "candidate_labels": ["technical_requirements", "soft_skills", "education", "experience", "responsibilities"]
             }
+        }
+        return self.models["text_classification"], payload
+
+    def _parse_job(self, result: Any, job_text: Any) -> Dict[str, Any]:
+        requirement_phrases = self._requirement_phrases(job_text)
+        job_text = self._job_text(job_text)
+        if result and "labels" in result:
+            requirements = {}
+            for label, score in zip(result["labels"], result["scores"]):
+                if score > 0.3:  # فقط المتطلبات المهمة
+                    requirements[label] = score
             
-            # محاولة النموذج الأساسي
-            models_to_try = [self.models["generation"]] + self.models["generation_fallback"]
+            return {
+                "requirements": requirements,
+                "key_skills": self._extract_keywords(job_text),
+                "experience_level": self._detect_experience_level(job_text),
+                "requirement_phrases": requirement_phrases
+            }
+        
+        return {"requirements": {}, "key_skills": [], "experience_level": "unknown", "requirement_phrases": requirement_phrases}
+
+    def _refine_calls(self, raw_transcript: str) -> Dict[str, Tuple[str, Dict]]:
+        # تحليل المشاعر
+        sentiment_payload = {"inputs": raw_transcript}
+        
+        # تلخيص
+        summary_payload = {
+            "inputs": raw_transcript,
+            "parameters": {"max_length": 200, "min_length": 50}
+        }
+        return {
+            "sentiment": (self.models["sentiment_analysis"], sentiment_payload),
+            "summary": (self.models["text_summarization"], summary_payload),
+        }
+
+    def _parse_refinement(self, raw_transcript: str, sentiment_result: Any, summary_result: Any) -> Dict[str, Any]:
+        refinement = {
+            "cleaned_text": self._clean_text(raw_transcript),
+            "sentiment": "neutral",
+            "summary": "",
+            "key_points": []
+        }
+        
+        if sentiment_result and isinstance(sentiment_result, list) and len(sentiment_result) > 0:
+            # نحصل على أعظم مشاعر
+            top_sentiment = max(sentiment_result[0], key=lambda x: x["score"])
+            refinement["sentiment"] = top_sentiment["label"]
+        
+        if summary_result and isinstance(summary_result, list) and len(summary_result) > 0:
+            refinement["summary"] = summary_result[0].get("summary_text", "")
+        
+        refinement["key_points"] = self._extract_key_points(raw_transcript)
+        
+        return refinement
+
+    def _refinement_fallback(self, raw_transcript: str) -> Dict[str, Any]:
+        return {
+            "cleaned_text": self._clean_text(raw_transcript),
+            "sentiment": "neutral",
+            "summary": "",
+            "key_points": []
+        }
+
+    # -- analyses --
+
+    def generate_text(self, prompt: str, params: Optional[Dict] = None) -> str:
+        """توليد نص باستخدام نموذج توليدي مع محاولات احتياطية"""
+        try:
+            payload = self._generation_payload(prompt, params)
             
-            for model in models_to_try:
+            for model in get_generation_router().order(self._generation_models()):
                 LOGGER.info(f"Trying generation with model: {model}")
-                # Try with token first
-                result = self._make_api_call(model, payload, use_token=True)
-                
-                # If failed (likely auth error), try without token for public models
-                if not result:
-                     LOGGER.info(f"Retrying {model} without token...")
-                     result = self._make_api_call(model, payload, use_token=False)
-
-                if result and isinstance(result, list) and len(result) > 0:
-                    generated = result[0].get("generated_text", "")
-                    # تنظيف النص
-                    if "[/INST]" in generated:
-                        generated = generated.split("[/INST]")[-1].strip()
-                    if generated.strip(): # تأكد من أن النص ليس فارغاً
-                        return generated
+                generated = self._try_generation(model, payload)
+                if generated:
+                    return generated
                 
                 LOGGER.warning(f"Model {model} returned empty or failed. Trying next...")
                 
@@ -92,150 +540,124 @@ class HuggingFaceAnalyzer:
             LOGGER.error(f"Error generating text: {e}")
             return ""
 
+    def stream_text(self, prompt: str, params: Optional[Dict] = None) -> Iterator[str]:
+        """
+        توليد نص على شكل أجزاء فور وصولها. ينتقل للنموذج التالي فقط إذا لم يُرسل
+        أي جزء بعد؛ إغلاق الـ generator يغلق الاتصال بالنموذج.
+        """
+        payload = self._generation_payload(prompt, params)
+        router = get_generation_router()
+        for model in router.order(self._generation_models()):
+            LOGGER.info(f"Streaming generation with model: {model}")
+            started = time.time()
+            emitted = False
+            try:
+                with closing(self._stream_model(model, payload)) as texts:
+                    for text in texts:
+                        emitted = True
+                        yield text
+            except Exception as e:
+                kind = classify_error(e)
+                LOGGER.error(f"HF stream error for {model} ({kind}): {e}")
+                router.record_failure(model, kind, time.time() - started)
+                if emitted:
+                    # part of the answer is already with the client; another model cannot continue it
+                    raise
+                continue
+            if emitted:
+                router.record_success(model, time.time() - started)
+                return
+            router.record_failure(model, EMPTY, time.time() - started)
+            LOGGER.warning(f"Model {model} streamed nothing. Trying next...")
+
+    def embed_texts(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        embedding لكل نص (None عند الفشل). الكاش لكل نص على حدة، مثل دفعات الأسئلة:
+        النصوص المعروفة لا تُرسل مجدداً، والباقي يُرسل عبر _make_api_call في دفعات من HF_EMBEDDING_BATCH_SIZE.
+        """
+        model_name = self.models["embedding"]
+        cache = get_hf_cache()
+        vectors: Dict[str, Any] = {}
+        missing = []
+        for text in dict.fromkeys(texts):
+            cached = cache.get(model_name, {"inputs": text}) if cache is not None else None
+            if cached is not None:
+                vectors[text] = cached
+            else:
+                missing.append(text)
+
+        batch_size = max(1, int(os.getenv("HF_EMBEDDING_BATCH_SIZE", "64")))
+        batches = {f"batch{start // batch_size}": missing[start:start + batch_size] for start in range(0, len(missing), batch_size)}
+        results = self._call_concurrently({name: (model_name, {"inputs": batch}) for name, batch in batches.items()})
+        for name, batch in batches.items():
+            result = results.get(name)
+            if not (isinstance(result, list) and len(result) == len(batch)):
+                LOGGER.error(f"Embedding batch of {len(batch)} texts failed for {model_name}")
+                continue
+            for text, vector in zip(batch, result):
+                vectors[text] = vector
+                if cache is not None:
+                    cache.put(model_name, {"inputs": text}, vector)
+        return [vectors.get(text) for text in texts]
+
     def analyze_question(self, question_text: str) -> Dict[str, Any]:
         """تحليل نوع السؤال"""
         try:
-            payload = {
-                "inputs": question_text,
-                "parameters": {
-                    "candidate_labels": ["technical", "behavioral", "experience", "education", "skills"]
-                }
-            }
-            
-            result = self._make_api_call(self.models["question_classification"], payload)
-            
-            if result and "labels" in result and "scores" in result:
-                # نحصل على أعلى تصنيف
-                max_score_idx = result["scores"].index(max(result["scores"]))
-                question_type = result["labels"][max_score_idx]
-                confidence = result["scores"][max_score_idx]
-                
-                return {
-                    "type": question_type,
-                    "confidence": confidence,
-                    "all_scores": dict(zip(result["labels"], result["scores"]))
-                }
-            
-            return {"type": "unknown", "confidence": 0.0, "all_scores": {}}
+            model_name, payload = self._question_call(question_text)
+            return self._parse_question(self._make_api_call(model_name, payload))
             
         except Exception as e:
             LOGGER.error(f"Error analyzing question: {e}")
             return {"type": "unknown", "confidence": 0.0, "all_scores": {}}
     
+    def analyze_questions(self, questions: List[str]) -> List[Dict[str, Any]]:
+        """تصنيف مجموعة أسئلة دفعة واحدة (بنفس ترتيب الإدخال)"""
+        try:
+            known, calls, batches = self._question_batch_calls(questions)
+            missing = self._collect_question_batches(known, batches, self._call_concurrently(calls, self._question_batch))
+            if missing:
+                LOGGER.warning(f"Batched classification failed for {len(missing)} questions, retrying one by one")
+                singles = self._call_concurrently({q: self._question_call(q) for q in missing})
+                known.update(singles)
+            return [self._parse_question(known.get(question)) for question in questions]
+            
+        except Exception as e:
+            LOGGER.error(f"Error analyzing questions: {e}")
+            return [{"type": "unknown", "confidence": 0.0, "all_scores": {}} for _ in questions]
+    
     def analyze_cv_text(self, cv_text: str) -> Dict[str, Any]:
         """تحليل السيرة الذاتية"""
         try:
-            # تحليل المهارات
-            skills_payload = {
-                "inputs": cv_text,
-                "parameters": {
-                    "candidate_labels": ["technical_skills", "soft_skills", "languages", "education", "experience"]
-                }
-            }
-            
-            skills_result = self._make_api_call(self.models["text_classification"], skills_payload)
-            
-            # تلخيص النص
-            summary_payload = {
-                "inputs": cv_text,
-                "parameters": {
-                    "max_length": 150,
-                    "min_length": 50
-                }
-            }
-            
-            summary_result = self._make_api_call(self.models["text_summarization"], summary_payload)
-            
-            analysis = {
-                "skills": {},
-                "summary": "",
-                "education_level": "unknown",
-                "experience_years": 0
-            }
-            
-            if skills_result and "labels" in skills_result:
-                analysis["skills"] = dict(zip(skills_result["labels"], skills_result["scores"]))
-            
-            if summary_result and isinstance(summary_result, list) and len(summary_result) > 0:
-                analysis["summary"] = summary_result[0].get("summary_text", "")
-            
-            return analysis
+            # الطلبان مستقلان، نرسلهما بالتوازي
+            results = self._call_chunked(self._cv_calls(cv_text))
+            return self._parse_cv(results["skills"], results["summary"], cv_text)
             
         except Exception as e:
             LOGGER.error(f"Error analyzing CV: {e}")
-            return {"skills": {}, "summary": "", "education_level": "unknown", "experience_years": 0}
+            return {"skills": {}, "summary": "", "education_level": "unknown", "experience_years": 0,
+                    "skill_phrases": self._skill_phrases(cv_text)}
     
-    def analyze_job_description(self, job_text: str) -> Dict[str, Any]:
-        """تحليل وصف الوظيفة"""
+    def analyze_job_description(self, job_text: Any) -> Dict[str, Any]:
+        """تحليل وصف الوظيفة (نص أو كائن {position, required_skills, key_topics})"""
         try:
-            payload = {
-                "inputs": job_text,
-                "parameters": {
-                    "candidate_labels": ["technical_requirements", "soft_skills", "education", "experience", "responsibilities"]
-                }
-            }
-            
-            result = self._make_api_call(self.models["text_classification"], payload)
-            
-            if result and "labels" in result:
-                requirements = {}
-                for label, score in zip(result["labels"], result["scores"]):
-                    if score > 0.3:  # فقط المتطلبات المهمة
-                        requirements[label] = score
-                
-                return {
-                    "requirements": requirements,
-                    "key_skills": self._extract_keywords(job_text),
-                    "experience_level": self._detect_experience_level(job_text)
-                }
-            
-            return {"requirements": {}, "key_skills": [], "experience_level": "unknown"}
+            results = self._call_chunked({"requirements": self._job_call(job_text)})
+            return self._parse_job(results["requirements"], job_text)
             
         except Exception as e:
             LOGGER.error(f"Error analyzing job description: {e}")
-            return {"requirements": {}, "key_skills": [], "experience_level": "unknown"}
+            return {"requirements": {}, "key_skills": [], "experience_level": "unknown",
+                    "requirement_phrases": self._requirement_phrases(job_text)}
     
     def refine_transcript(self, raw_transcript: str) -> Dict[str, Any]:
         """تنقية النصوص (البديل للتحليل المحلي)"""
         try:
-            # تحليل المشاعر
-            sentiment_payload = {"inputs": raw_transcript}
-            sentiment_result = self._make_api_call(self.models["sentiment_analysis"], sentiment_payload)
-            
-            # تلخيص
-            summary_payload = {
-                "inputs": raw_transcript,
-                "parameters": {"max_length": 200, "min_length": 50}
-            }
-            summary_result = self._make_api_call(self.models["text_summarization"], summary_payload)
-            
-            refinement = {
-                "cleaned_text": self._clean_text(raw_transcript),
-                "sentiment": "neutral",
-                "summary": "",
-                "key_points": []
-            }
-            
-            if sentiment_result and isinstance(sentiment_result, list) and len(sentiment_result) > 0:
-                # نحصل على أعظم مشاعر
-                top_sentiment = max(sentiment_result[0], key=lambda x: x["score"])
-                refinement["sentiment"] = top_sentiment["label"]
-            
-            if summary_result and isinstance(summary_result, list) and len(summary_result) > 0:
-                refinement["summary"] = summary_result[0].get("summary_text", "")
-            
-            refinement["key_points"] = self._extract_key_points(raw_transcript)
-            
-            return refinement
+            # المشاعر والتلخيص بالتوازي
+            results = self._call_chunked(self._refine_calls(raw_transcript))
+            return self._parse_refinement(raw_transcript, results["sentiment"], results["summary"])
             
         except Exception as e:
             LOGGER.error(f"Error refining transcript: {e}")
-            return {
-                "cleaned_text": self._clean_text(raw_transcript),
-                "sentiment": "neutral",
-                "summary": "",
-                "key_points": []
-            }
+            return self._refinement_fallback(raw_transcript)
     
     def _clean_text(self, text: str) -> str:
         """تنظيف النص من الكلمات الزائدة"""
@@ -251,7 +673,7 @@ class HuggingFaceAnalyzer:
         
         return cleaned.strip()
     
-    def _extract_keywords(self, text: str) -> List[str]:
+    def _extract_keywords(self, text: str, limit: Optional[int] = 5) -> List[str]:
         """استخراج الكلمات المفتاحية"""
         # كلمات مفتاحية تقنية شائعة
         tech_keywords = [
@@ -263,7 +685,7 @@ class HuggingFaceAnalyzer:
         text_lower = text.lower()
         found_keywords = [kw for kw in tech_keywords if kw in text_lower]
         
-        return found_keywords[:5]  # أول 5 كلمات
+        return found_keywords[:limit]  # أول 5 كلمات افتراضياً
     
     def _detect_experience_level(self, text: str) -> str:
         """كشف مستوى الخبرة المطلوب"""
@@ -293,7 +715,43 @@ class HuggingFaceAnalyzer:
         return key_points[:3]  # أول 3 نقاط مهمة
 
 
+_ANALYZER: Optional[HuggingFaceAnalyzer] = None
+_ANALYZER_LOCK = threading.Lock()
+
+# Two pools so an analysis waiting on its calls can never starve them of threads.
+_CALL_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_ANALYSIS_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _call_executor() -> ThreadPoolExecutor:
+    global _CALL_EXECUTOR
+    if _CALL_EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _CALL_EXECUTOR is None:
+                _CALL_EXECUTOR = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("HF_CALL_CONCURRENCY", "8")), thread_name_prefix="hf-call"
+                )
+    return _CALL_EXECUTOR
+
+
+def _analysis_executor() -> ThreadPoolExecutor:
+    global _ANALYSIS_EXECUTOR
+    if _ANALYSIS_EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _ANALYSIS_EXECUTOR is None:
+                _ANALYSIS_EXECUTOR = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("HF_ANALYSIS_CONCURRENCY", "6")), thread_name_prefix="hf-analysis"
+                )
+    return _ANALYSIS_EXECUTOR
+
+
 # دالة مساعدة للاستخدام السهل
 def get_huggingface_analyzer() -> HuggingFaceAnalyzer:
-    """إرجاع مثيل المحلل"""
-    return HuggingFaceAnalyzer()
+    """إرجاع مثيل المحلل المشترك (يُنشأ مرة واحدة لكل عملية)"""
+    global _ANALYZER
+    if _ANALYZER is None:
+        with _ANALYZER_LOCK:
+            if _ANALYZER is None:
+                _ANALYZER = HuggingFaceAnalyzer()
+    return _ANALYZER
@@ -0,0 +1,87 @@
+"""Named CPU inference profiles (compute_type / cpu_threads / num_workers) for faster-whisper."""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from .utils import LOGGER
+
+# Built-in profiles; cpu_threads=0 lets CTranslate2 use all cores.
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {"compute_type": "default", "cpu_threads": 0, "num_workers": 1},
+    "cpu-float32": {"compute_type": "float32", "cpu_threads": 0, "num_workers": 1},
+    "cpu-int8-float32": {"compute_type": "int8_float32", "cpu_threads": 0, "num_workers": 1},
+    "cpu-int8": {"compute_type": "int8", "cpu_threads": 0, "num_workers": 1},
+    # Two decodes in parallel, each on half the cores: better throughput under concurrent load.
+    "cpu-int8-throughput": {
+        "compute_type": "int8",
+        "cpu_threads": max(1, (os.cpu_count() or 2) // 2),
+        "num_workers": 2,
+    },
+}
+
+
+def profiles_file() -> str:
+    here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.getenv("WHISPER_PROFILES_FILE", os.path.join(here, "data", "whisper_profiles.json"))
+
+
+# (path, mtime) -> parsed profiles file; re-read only when the autotune command rewrites it
+_FILE_CACHE: Optional[Tuple[Tuple[str, float], Dict[str, Any]]] = None
+_FILE_LOCK = threading.Lock()
+
+
+def _load_profiles_file() -> Dict[str, Any]:
+    global _FILE_CACHE
+    path = profiles_file()
+    try:
+        stamp = (path, os.stat(path).st_mtime)
+    except OSError:
+        return {}
+    with _FILE_LOCK:
+        if _FILE_CACHE is not None and _FILE_CACHE[0] == stamp:
+            return _FILE_CACHE[1]
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+    except Exception as e:
+        LOGGER.warning(f"Could not read whisper profiles file '{path}': {e}")
+        return {}
+    with _FILE_LOCK:
+        _FILE_CACHE = (stamp, data)
+    return data
+
+
+def available_profiles() -> Dict[str, Dict[str, Any]]:
+    """
+    Built-in profiles merged with the ones written by the autotune command.
+    """
+    merged = {name: dict(p) for name, p in PROFILES.items()}
+    for name, profile in (_load_profiles_file().get("profiles") or {}).items():
+        merged[name] = {**PROFILES["default"], **profile}
+    return merged
+
+
+def active_profile() -> Dict[str, Any]:
+    """
+    Resolve the profile for this process.
+
+    WHISPER_PROFILE names the profile (falling back to the one the profiles
+    file marks as selected, then "default"); WHISPER_COMPUTE_TYPE,
+    WHISPER_CPU_THREADS and WHISPER_NUM_WORKERS override individual fields.
+    """
+    profiles = available_profiles()
+    name: Optional[str] = os.getenv("WHISPER_PROFILE") or _load_profiles_file().get("selected") or "default"
+    if name not in profiles:
+        LOGGER.warning(f"Unknown WHISPER_PROFILE '{name}', using 'default'")
+        name = "default"
+    profile = {"name": name, **profiles[name]}
+    if os.getenv("WHISPER_COMPUTE_TYPE"):
+        profile["compute_type"] = os.getenv("WHISPER_COMPUTE_TYPE")
+    if os.getenv("WHISPER_CPU_THREADS"):
+        profile["cpu_threads"] = int(os.getenv("WHISPER_CPU_THREADS", "0"))
+    if os.getenv("WHISPER_NUM_WORKERS"):
+        profile["num_workers"] = int(os.getenv("WHISPER_NUM_WORKERS", "1"))
+    return profile
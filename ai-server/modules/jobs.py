@@ -0,0 +1,354 @@
+"""
+Background transcription jobs persisted in SQLite (submit / poll / result).
+
+Each process owns the jobs it queued or is running under a random instance
+id and renews their lease (heartbeat_at) every TRANSCRIBE_JOB_HEARTBEAT_SECONDS.
+Any process reclaims queued or running jobs whose lease is older than
+TRANSCRIBE_JOB_LEASE_SECONDS, so the jobs of a worker that died (or of a
+restarted container, where PIDs are reused) are picked up again.
+"""
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .utils import LOGGER
+
+# runner(audio_path, options, report_progress) -> result dict
+JobRunner = Callable[[str, Dict[str, Any], Callable[[float], None]], Dict[str, Any]]
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    audio_path TEXT NOT NULL,
+    filename TEXT,
+    options TEXT,
+    result TEXT,
+    error TEXT,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL
+)
+"""
+
+
+def _default_db_path() -> str:
+    here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.getenv("TRANSCRIBE_JOBS_DB", os.path.join(here, "data", "transcription_jobs.db"))
+
+
+# Unique per process start: hostname and PID alone repeat across container restarts.
+_INSTANCE_ID = uuid.uuid4().hex[:12]
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{_INSTANCE_ID}"
+
+
+class JobStore:
+    """
+    Thin SQLite wrapper; one short-lived connection per call so it is safe
+    across threads and across gunicorn workers sharing the same file.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or _default_db_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "heartbeat_at" not in columns:
+                # databases created before job leases
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        # the connection's own context manager only commits; closing() releases it
+        with closing(conn), conn:
+            yield conn
+
+    def create(self, audio_path: str, filename: Optional[str], options: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, audio_path, filename, options, worker, created_at, heartbeat_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, audio_path, filename, json.dumps(options), _worker_id(), now, now),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["options"] = json.loads(job["options"] or "{}")
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def claim(self, job_id: str) -> bool:
+        """
+        Atomically move a queued job to running; False if someone else got it.
+        """
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, started_at = ?, heartbeat_at = ? WHERE id = ? AND status = ?",
+                (RUNNING, _worker_id(), time.time(), time.time(), job_id, QUEUED),
+            )
+            return cur.rowcount == 1
+
+    def set_progress(self, job_id: str, progress: float) -> None:
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET progress = ? WHERE id = ?", (progress, job_id))
+
+    def finish(self, job_id: str, result: Dict[str, Any]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, progress = 1, result = ?, finished_at = ? WHERE id = ?",
+                (DONE, json.dumps(result, ensure_ascii=False), time.time(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (FAILED, error, time.time(), job_id),
+            )
+
+    def heartbeat(self) -> int:
+        """
+        Renew the lease on every queued or running job this process owns.
+        """
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE worker = ? AND status IN (?, ?)",
+                (time.time(), _worker_id(), QUEUED, RUNNING),
+            )
+            return cur.rowcount
+
+    def requeue_orphans(self, lease_seconds: float) -> List[str]:
+        """
+        Take over queued or running jobs whose lease expired (their process is
+        gone or hung): back to queued, owned by this process. Returns their ids.
+        """
+        cutoff = time.time() - lease_seconds
+        expired = "status IN (?, ?) AND (heartbeat_at IS NULL OR heartbeat_at < ?)"
+        adopted: List[str] = []
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT id FROM jobs WHERE {expired}", (QUEUED, RUNNING, cutoff)).fetchall()
+            for row in rows:
+                # the lease condition again, so only one process adopts each job
+                cur = conn.execute(
+                    f"UPDATE jobs SET status = ?, worker = ?, progress = 0, heartbeat_at = ? WHERE id = ? AND {expired}",
+                    (QUEUED, _worker_id(), time.time(), row["id"], QUEUED, RUNNING, cutoff),
+                )
+                if cur.rowcount == 1:
+                    adopted.append(row["id"])
+        return adopted
+
+    def queued_ids(self) -> List[str]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)).fetchall()
+        return [r["id"] for r in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {r["status"]: r["n"] for r in rows}
+
+    def purge_finished(self, older_than: float) -> List[str]:
+        """
+        Delete finished jobs older than `older_than` (epoch seconds); returns their audio paths.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT audio_path FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (DONE, FAILED, older_than),
+            ).fetchall()
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (DONE, FAILED, older_than),
+            )
+        return [r["audio_path"] for r in rows]
+
+
+class JobQueueFull(Exception):
+    """Raised when TRANSCRIBE_JOB_MAX_PENDING jobs are already waiting."""
+
+
+class TranscriptionJobQueue:
+    """
+    Bounded pool of background workers running `runner` for submitted audio files.
+    """
+
+    def __init__(self, runner: JobRunner, store: Optional[JobStore] = None,
+                 max_workers: Optional[int] = None, max_pending: Optional[int] = None) -> None:
+        self.runner = runner
+        self.store = store or JobStore()
+        self.max_workers = max_workers or int(os.getenv("TRANSCRIBE_JOB_WORKERS", "1"))
+        self.max_pending = max_pending if max_pending is not None else int(os.getenv("TRANSCRIBE_JOB_MAX_PENDING", "100"))
+        self.retention_seconds = float(os.getenv("TRANSCRIBE_JOB_RETENTION_HOURS", "24")) * 3600
+        self.heartbeat_seconds = float(os.getenv("TRANSCRIBE_JOB_HEARTBEAT_SECONDS", "10"))
+        self.lease_seconds = float(os.getenv("TRANSCRIBE_JOB_LEASE_SECONDS", "60"))
+        self._monitor: Optional[threading.Thread] = None
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="transcribe-job")
+        self._pending = 0
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def submit(self, audio_path: str, filename: Optional[str] = None,
+               options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Record a new job and schedule it; returns the job id.
+        """
+        with self._lock:
+            if self.max_pending and self._pending >= self.max_pending:
+                raise JobQueueFull(f"{self._pending} transcription jobs already pending")
+        self._purge_expired()
+        self._start_monitor()
+        job_id = self.store.create(audio_path, filename, options or {})
+        self._schedule(job_id)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def recover(self) -> int:
+        """
+        Re-schedule jobs left queued or orphaned by a previous worker process,
+        and start renewing this process's leases and reclaiming expired ones.
+        """
+        orphans = self.store.requeue_orphans(self.lease_seconds)
+        queued = self.store.queued_ids()
+        for job_id in queued:
+            self._schedule(job_id)
+        if queued:
+            LOGGER.info(f"Recovered {len(queued)} transcription job(s) ({len(orphans)} orphaned)")
+        self._start_monitor()
+        return len(queued)
+
+    def check_leases(self) -> List[str]:
+        """
+        One monitor round: renew our leases, then adopt and schedule jobs whose lease expired.
+        """
+        self.store.heartbeat()
+        orphans = self.store.requeue_orphans(self.lease_seconds)
+        for job_id in orphans:
+            self._schedule(job_id)
+        if orphans:
+            LOGGER.warning(f"Requeued {len(orphans)} transcription job(s) whose worker stopped renewing its lease")
+        return orphans
+
+    def _start_monitor(self) -> None:
+        with self._lock:
+            if self._monitor is not None or self.heartbeat_seconds <= 0:
+                return
+            self._monitor = threading.Thread(target=self._monitor_loop, name="transcribe-job-leases", daemon=True)
+        self._monitor.start()
+
+    def _monitor_loop(self) -> None:
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            try:
+                self.check_leases()
+            except Exception as e:
+                LOGGER.error(f"Transcription job lease check failed: {e}")
+
+    def pending(self) -> int:
+        """
+        Jobs scheduled on this process that have not finished yet.
+        """
+        with self._lock:
+            return self._pending
+
+    def waiting(self) -> int:
+        """
+        Jobs scheduled on this process that have not started decoding yet.
+        """
+        with self._lock:
+            return self._pending - self._running
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "pending_local": self.pending(),
+            "running_local": self._running,
+            "max_pending": self.max_pending,
+            "by_status": self.store.counts(),
+        }
+
+    def _schedule(self, job_id: str) -> None:
+        with self._lock:
+            self._pending += 1
+        self._executor.submit(self._run, job_id)
+
+    def _run(self, job_id: str) -> None:
+        try:
+            # Another worker process may have picked it up during recovery.
+            if not self.store.claim(job_id):
+                return
+            job = self.store.get(job_id)
+            if job is None:
+                return
+            last = [0.0]
+
+            def report_progress(fraction: float) -> None:
+                fraction = max(0.0, min(fraction, 0.99))
+                if fraction - last[0] >= 0.01:
+                    last[0] = fraction
+                    self.store.set_progress(job_id, round(fraction, 3))
+
+            LOGGER.info(f"Running transcription job {job_id}")
+            with self._lock:
+                self._running += 1
+            try:
+                result = self.runner(job["audio_path"], job["options"], report_progress)
+                self.store.finish(job_id, result)
+            except Exception as e:
+                LOGGER.error(f"Transcription job {job_id} failed: {e}")
+                self.store.fail(job_id, str(e))
+            finally:
+                with self._lock:
+                    self._running -= 1
+            self._remove_audio(job["audio_path"])
+        except Exception as e:
+            LOGGER.error(f"Transcription job {job_id} bookkeeping error: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _purge_expired(self) -> None:
+        if self.retention_seconds <= 0:
+            return
+        for path in self.store.purge_finished(time.time() - self.retention_seconds):
+            self._remove_audio(path)
+
+    @staticmethod
+    def _remove_audio(path: str) -> None:
+        if os.getenv("DELETE_INPUT_FILES", "true").lower() == "true" and os.path.exists(path):
+            try:
+                os.remove(path)
+            except Exception as re:
+                LOGGER.warning(f"Failed to remove temp file: {re}")
@@ -0,0 +1,151 @@
+"""Language-identification prepass on the first seconds of speech."""
+from __future__ import annotations
+
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .utils import LOGGER
+from .audio import AudioSource
+from .model_registry import get_model_registry
+from .inference_profiles import active_profile
+from .transcript_cache import get_transcript_cache
+
+SAMPLING_RATE = 16000
+# Whisper looks at 30 s windows; more than a few windows adds cost, not accuracy.
+_WINDOW_SECONDS = 30
+_MEMORY_ENTRIES = 1024
+
+_memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+def detection_enabled() -> bool:
+    """
+    On with TRANSCRIBE_DETECT_LANGUAGE=true or TRANSCRIBE_LANGUAGE=auto.
+    """
+    if os.getenv("TRANSCRIBE_LANGUAGE", "").lower() == "auto":
+        return True
+    return os.getenv("TRANSCRIBE_DETECT_LANGUAGE", "false").lower() == "true"
+
+
+def _detect_seconds() -> float:
+    return float(os.getenv("TRANSCRIBE_DETECT_SECONDS", "30"))
+
+
+def _allowed_languages() -> List[str]:
+    raw = os.getenv("TRANSCRIBE_DETECT_LANGUAGES", "")
+    return [lang.strip() for lang in raw.split(",") if lang.strip()]
+
+
+def _leading_speech(samples: Any, seconds: float) -> Any:
+    """
+    The first `seconds` of speech, found with Silero VAD over a bounded
+    window at the start of the recording; falls back to the raw start.
+    """
+    import numpy as np
+
+    wanted = int(seconds * SAMPLING_RATE)
+    window = samples[: wanted * 3]
+    try:
+        from faster_whisper.vad import VadOptions, get_speech_timestamps  # type: ignore
+
+        regions = get_speech_timestamps(window, VadOptions(), sampling_rate=SAMPLING_RATE)
+    except Exception as e:
+        LOGGER.debug(f"VAD for language detection failed: {e}")
+        regions = []
+    pieces = []
+    collected = 0
+    for region in regions:
+        piece = window[int(region["start"]):int(region["end"])]
+        pieces.append(piece[: wanted - collected])
+        collected += len(pieces[-1])
+        if collected >= wanted:
+            break
+    if not pieces:
+        return window[:wanted]
+    return np.concatenate(pieces)
+
+
+def _run_detection(source: AudioSource, model_name: str, seconds: float) -> Dict[str, Any]:
+    profile = active_profile()
+    model = get_model_registry().get(
+        "faster-whisper", model_name, os.getenv("WHISPER_DEVICE", "auto"), profile["compute_type"],
+        profile["cpu_threads"], profile["num_workers"],
+    )
+    speech = _leading_speech(source.samples, seconds)
+    language, probability, all_probs = model.detect_language(
+        audio=speech,
+        language_detection_segments=max(1, math.ceil(seconds / _WINDOW_SECONDS)),
+    )
+    allowed = _allowed_languages()
+    if allowed and language not in allowed:
+        # Best candidate among the languages we actually interview in.
+        candidates = [(lang, prob) for lang, prob in all_probs if lang in allowed]
+        if candidates:
+            language, probability = max(candidates, key=lambda item: item[1])
+    return {
+        "language": language,
+        "probability": round(float(probability), 4),
+        "model": model_name,
+        "seconds": round(len(speech) / SAMPLING_RATE, 2),
+    }
+
+
+def detect_language(source: AudioSource) -> Optional[Dict[str, Any]]:
+    """
+    Detect the spoken language from the first TRANSCRIBE_DETECT_SECONDS of
+    speech with the small TRANSCRIBE_DETECT_MODEL. Results are cached per
+    audio hash (in memory and in the transcript cache). Returns None when
+    detection fails.
+    """
+    model_name = os.getenv("TRANSCRIBE_DETECT_MODEL", "tiny")
+    seconds = _detect_seconds()
+    memory_key = f"{source.sha256}:{model_name}:{seconds}:{','.join(_allowed_languages())}"
+    with _memory_lock:
+        found = _memory.get(memory_key)
+        if found is not None:
+            _memory.move_to_end(memory_key)
+            return {**found, "cached": True}
+
+    cache = get_transcript_cache()
+    cache_key = None
+    result: Optional[Dict[str, Any]] = None
+    from_disk = False
+    if cache is not None:
+        cache_key = cache.key(source.sha256, f"language-id:{model_name}", ",".join(_allowed_languages()), 0, int(seconds))
+        stored = cache.get(cache_key)
+        if stored is not None and stored.get("language"):
+            result, from_disk = stored, True
+
+    if result is None:
+        try:
+            result = _run_detection(source, model_name, seconds)
+        except Exception as e:
+            LOGGER.warning(f"Language detection failed for '{source.name}': {e}")
+            return None
+        LOGGER.info(f"Detected language '{result['language']}' (p={result['probability']}) for '{source.name}'")
+        if cache is not None and cache_key is not None:
+            cache.put(cache_key, result)
+
+    with _memory_lock:
+        _memory[memory_key] = result
+        while len(_memory) > _MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+    return {**result, "cached": from_disk}
+
+
+def resolve_language(source: AudioSource, default: Optional[str]) -> Dict[str, Any]:
+    """
+    Pick the decode language: the detected one when detection is enabled and
+    confident enough (TRANSCRIBE_DETECT_MIN_PROBABILITY), otherwise `default`.
+    Returns {"language": ..., "detection": detection result or None}.
+    """
+    detection = detect_language(source)
+    if detection is None:
+        return {"language": default, "detection": None}
+    min_probability = float(os.getenv("TRANSCRIBE_DETECT_MIN_PROBABILITY", "0.5"))
+    detection["used"] = detection["probability"] >= min_probability or default is None
+    return {"language": detection["language"] if detection["used"] else default, "detection": detection}
@@ -0,0 +1,307 @@
+"""
+Inference backends for the analysis calls: the Hugging Face Inference API
+(remote) and in-process CPU inference (local) for the zero-shot, sentiment
+and summarization analyses.
+
+Each task is routed through the environment: HF_BACKEND_ZERO_SHOT,
+HF_BACKEND_SENTIMENT and HF_BACKEND_SUMMARY are "remote" (default) or
+"local". Local models are loaded once per process and answer with the same
+JSON shapes as the Inference API, so parsing and caching do not change. A
+local failure (missing dependency, load error) falls back to the remote API.
+
+Engines:
+  onnx   transformers pipeline over an optimum ONNX Runtime model, with
+         intra-op threads from HF_LOCAL_THREADS. HF_LOCAL_ONNX_FILE_<TASK>
+         selects a pre-quantized file from the model repo, e.g.
+         onnx/model_quantized.onnx; otherwise the checkpoint is exported.
+  torch  plain transformers on CPU, int8 dynamic quantization of the Linear
+         layers unless HF_LOCAL_QUANTIZE=false.
+
+transformers plus optimum[onnxruntime] (or torch) are optional
+dependencies; without them the local backend reports itself unavailable.
+"""
+from __future__ import annotations
+
+import copy
+import importlib.util
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+
+from .utils import LOGGER
+from .chunking import SENTIMENT, SUMMARY, ZERO_SHOT
+
+LOCAL = "local"
+REMOTE = "remote"
+
+_PIPELINE_TASKS = {
+    ZERO_SHOT: "zero-shot-classification",
+    SENTIMENT: "text-classification",
+    SUMMARY: "summarization",
+}
+
+_DEFAULT_MODELS = {
+    ZERO_SHOT: "facebook/bart-large-mnli",
+    SENTIMENT: "cardiffnlp/twitter-roberta-base-sentiment-latest",
+    SUMMARY: "facebook/bart-large-cnn",
+}
+
+# Pipeline keyword arguments accepted from the API "parameters" object, per task.
+_ALLOWED_PARAMETERS = {
+    ZERO_SHOT: ("candidate_labels", "multi_label", "hypothesis_template"),
+    SENTIMENT: ("top_k", "function_to_apply"),
+    SUMMARY: ("max_length", "min_length", "do_sample", "num_beams", "length_penalty"),
+}
+
+
+def backend_for(task: Optional[str]) -> str:
+    """
+    "local" or "remote" for an analysis task, from HF_BACKEND_<TASK>.
+    """
+    if task is None:
+        return REMOTE
+    return os.getenv(f"HF_BACKEND_{task.upper()}", REMOTE).strip().lower()
+
+
+class InferenceBackend(ABC):
+    """
+    Runs one Inference API style request (task, model, payload) and returns the API's JSON shape.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def available(self) -> bool:
+        ...
+
+    @abstractmethod
+    def cache_name(self, task: Optional[str], model_name: str) -> str:
+        """
+        Response-cache namespace for this backend's answers to the call.
+        """
+
+    @abstractmethod
+    def run(self, task: Optional[str], model_name: str, payload: Dict[str, Any], use_token: bool = True,
+            timeout: Optional[float] = None) -> Any:
+        """
+        `timeout` (seconds) bounds the request where the backend can enforce it.
+        """
+
+
+class RemoteInferenceBackend(InferenceBackend):
+    """
+    The Hugging Face Inference API, through the analyzer's InferenceClient's
+    (with and without the token). `model_url` maps a model name to what the
+    client posts to (HF_INFERENCE_ENDPOINT override, pipeline URLs).
+    """
+
+    name = REMOTE
+
+    def __init__(self, client: Any, public_client: Any, model_url: Callable[[str], str]) -> None:
+        self.client = client
+        self.public_client = public_client
+        self.model_url = model_url
+
+    def available(self) -> bool:
+        return True
+
+    def cache_name(self, task: Optional[str], model_name: str) -> str:
+        return model_name
+
+    def run(self, task: Optional[str], model_name: str, payload: Dict[str, Any], use_token: bool = True,
+            timeout: Optional[float] = None) -> Any:
+        # If use_token is False, we use the client without token (though most router endpoints require auth now)
+        client = self.client if use_token else self.public_client
+        if timeout is not None:
+            # the clients are shared between threads, so the deadline goes on a per-call copy;
+            # it bounds the HTTP read and the client's retries while the model is loading (503)
+            client = copy.copy(client)
+            client.timeout = timeout
+        response = client.post(json=payload, model=self.model_url(model_name))
+        return json.loads(response.decode("utf-8"))
+
+
+class LocalInferenceBackend(InferenceBackend):
+    """
+    transformers pipelines on CPU, one per task, loaded on first use.
+    Calls into a pipeline are serialized; list inputs run as one batch of
+    HF_LOCAL_BATCH_SIZE, and ONNX Runtime parallelizes each call across
+    the intra-op threads.
+    """
+
+    name = LOCAL
+
+    def __init__(self) -> None:
+        self.engine = os.getenv("HF_LOCAL_ENGINE", "onnx").strip().lower()
+        self.threads = int(os.getenv("HF_LOCAL_THREADS", "0")) or (os.cpu_count() or 1)
+        self.batch_size = max(1, int(os.getenv("HF_LOCAL_BATCH_SIZE", "8")))
+        self.quantize = os.getenv("HF_LOCAL_QUANTIZE", "true").lower() == "true"
+        self._pipelines: Dict[str, Any] = {}
+        self._available: Optional[bool] = None
+        self._task_locks = {task: threading.Lock() for task in _PIPELINE_TASKS}
+        self._load_lock = threading.Lock()
+        # task -> time of the last failed load; retried after HF_LOCAL_RETRY_SECONDS
+        self._load_failures: Dict[str, float] = {}
+        self.retry_seconds = float(os.getenv("HF_LOCAL_RETRY_SECONDS", "300"))
+        self._stats: Dict[str, Dict[str, Any]] = {
+            task: {"calls": 0, "errors": 0, "inputs": 0, "seconds": 0.0, "load_seconds": None}
+            for task in _PIPELINE_TASKS
+        }
+
+    def available(self) -> bool:
+        # checked on every routed call, so the import lookup is done once
+        if self._available is None:
+            required = ["transformers", "optimum", "onnxruntime"] if self.engine == "onnx" else ["transformers", "torch"]
+            self._available = all(importlib.util.find_spec(name) is not None for name in required)
+        return self._available
+
+    def model_for(self, task: str) -> str:
+        return os.getenv(f"HF_LOCAL_MODEL_{task.upper()}", _DEFAULT_MODELS[task])
+
+    def cache_name(self, task: Optional[str], model_name: str) -> str:
+        """
+        Response-cache namespace for this task's local model, kept apart from the remote model's entries.
+        """
+        return f"local:{self.engine}:{self.model_for(task)}"
+
+    def _pipeline(self, task: str) -> Any:
+        pipe = self._pipelines.get(task)
+        if pipe is None:
+            with self._load_lock:
+                pipe = self._pipelines.get(task)
+                if pipe is None:
+                    failed_at = self._load_failures.get(task)
+                    if failed_at is not None and time.time() - failed_at < self.retry_seconds:
+                        raise RuntimeError(f"local {task} model failed to load; retrying after {self.retry_seconds}s")
+                    started = time.time()
+                    try:
+                        pipe = self._pipelines[task] = self._load(task)
+                    except Exception:
+                        self._load_failures[task] = time.time()
+                        raise
+                    self._load_failures.pop(task, None)
+                    self._stats[task]["load_seconds"] = round(time.time() - started, 3)
+                    LOGGER.info(f"Loaded local {task} model {self.model_for(task)} ({self.engine}) "
+                                f"in {self._stats[task]['load_seconds']}s")
+        return pipe
+
+    def _load(self, task: str) -> Any:
+        from transformers import AutoTokenizer, pipeline  # type: ignore
+
+        model_name = self.model_for(task)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        if self.engine == "onnx":
+            import onnxruntime  # type: ignore
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTModelForSequenceClassification  # type: ignore
+
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = self.threads
+            options.inter_op_num_threads = 1
+            model_cls = ORTModelForSeq2SeqLM if task == SUMMARY else ORTModelForSequenceClassification
+            onnx_file = os.getenv(f"HF_LOCAL_ONNX_FILE_{task.upper()}")
+            source: Dict[str, Any] = {"file_name": onnx_file} if onnx_file and task != SUMMARY else {"export": True}
+            model = model_cls.from_pretrained(
+                model_name, provider="CPUExecutionProvider", session_options=options, **source
+            )
+        else:
+            import torch  # type: ignore
+            from transformers import AutoModelForSeq2SeqLM, AutoModelForSequenceClassification  # type: ignore
+
+            torch.set_num_threads(self.threads)
+            model_cls = AutoModelForSeq2SeqLM if task == SUMMARY else AutoModelForSequenceClassification
+            model = model_cls.from_pretrained(model_name).eval()
+            if self.quantize:
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return pipeline(_PIPELINE_TASKS[task], model=model, tokenizer=tokenizer, device=-1)
+
+    def warm_up(self, tasks: Any) -> None:
+        for task in tasks:
+            try:
+                self._pipeline(task)
+            except Exception as e:
+                LOGGER.warning(f"Local {task} model warm-up failed: {e}")
+
+    def run(self, task: Optional[str], model_name: str, payload: Dict[str, Any], use_token: bool = True,
+            timeout: Optional[float] = None) -> Any:
+        # an in-process pipeline call cannot be cut short, so `timeout` is not enforced here
+        if task not in _PIPELINE_TASKS:
+            raise ValueError(f"no local model for task {task!r}")
+        inputs = payload.get("inputs")
+        params = payload.get("parameters") or {}
+        kwargs = {k: v for k, v in params.items() if k in _ALLOWED_PARAMETERS[task]}
+        if task == SENTIMENT:
+            # the API returns every label's score
+            kwargs.setdefault("top_k", None)
+        if task != ZERO_SHOT:
+            kwargs["truncation"] = True
+        batched = isinstance(inputs, list)
+        if batched:
+            kwargs["batch_size"] = self.batch_size
+
+        pipe = self._pipeline(task)
+        stats = self._stats[task]
+        with self._task_locks[task]:
+            started = time.time()
+            try:
+                output = pipe(inputs, **kwargs)
+            except Exception:
+                stats["errors"] += 1
+                raise
+            finally:
+                stats["calls"] += 1
+                stats["inputs"] += len(inputs) if batched else 1
+                stats["seconds"] += time.time() - started
+
+        if task == SENTIMENT and not batched:
+            # single text: the API nests the label scores one level deeper
+            return [output]
+        if task == SUMMARY and batched:
+            return [item[0] if isinstance(item, list) else item for item in output]
+        return output
+
+    def stats(self) -> Dict[str, Any]:
+        tasks: Dict[str, Any] = {}
+        for task, stats in self._stats.items():
+            tasks[task] = {
+                **stats,
+                "seconds": round(stats["seconds"], 3),
+                "backend": backend_for(task),
+                "model": self.model_for(task),
+                "loaded": task in self._pipelines,
+            }
+        return {"available": self.available(), "engine": self.engine, "threads": self.threads, "batch_size": self.batch_size, "tasks": tasks}
+
+
+_LOCAL_BACKEND: Optional[LocalInferenceBackend] = None
+_LOCAL_BACKEND_LOCK = threading.Lock()
+
+
+def get_local_backend() -> LocalInferenceBackend:
+    """
+    Return the process-wide local backend, creating it on first use.
+    """
+    global _LOCAL_BACKEND
+    if _LOCAL_BACKEND is None:
+        with _LOCAL_BACKEND_LOCK:
+            if _LOCAL_BACKEND is None:
+                _LOCAL_BACKEND = LocalInferenceBackend()
+    return _LOCAL_BACKEND
+
+
+def warm_up_local_in_background() -> Optional[threading.Thread]:
+    """
+    Load the models of every task routed to the local backend on a daemon thread.
+    """
+    tasks = [task for task in _PIPELINE_TASKS if backend_for(task) == LOCAL]
+    if not tasks:
+        return None
+    backend = get_local_backend()
+    if not backend.available():
+        LOGGER.warning(f"Local inference requested for {', '.join(tasks)} but its dependencies are missing; using the remote API")
+        return None
+    thread = threading.Thread(target=backend.warm_up, args=(tasks,), name="local-inference-warmup", daemon=True)
+    thread.start()
+    return thread
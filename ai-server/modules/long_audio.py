@@ -0,0 +1,177 @@
+"""Long-audio mode: VAD chunking and parallel faster-whisper decoding across processes."""
+from __future__ import annotations
+
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .utils import LOGGER
+
+SAMPLING_RATE = 16000
+
+# (start sample, end sample) of one chunk in the decoded audio
+Chunk = Tuple[int, int]
+
+
+def long_audio_threshold_seconds() -> float:
+    """
+    Recordings at least this long use the chunked path; 0 disables it unless requested.
+    """
+    return float(os.getenv("TRANSCRIBE_LONG_AUDIO_SECONDS", "600"))
+
+
+def _parallel_workers() -> int:
+    configured = int(os.getenv("TRANSCRIBE_PARALLEL_WORKERS", "0"))
+    if configured > 0:
+        return configured
+    return max(1, (os.cpu_count() or 1) // 2)
+
+
+def plan_chunks(speech: List[Dict[str, int]], max_chunk_seconds: float, max_gap_seconds: float,
+                sampling_rate: int = SAMPLING_RATE) -> List[Chunk]:
+    """
+    Group VAD speech regions into chunks that end in silence.
+
+    A new chunk starts when the silence before a region exceeds
+    `max_gap_seconds` (so long pauses are never decoded) or when adding the
+    region would push the chunk past `max_chunk_seconds`.
+    """
+    max_len = int(max_chunk_seconds * sampling_rate)
+    max_gap = int(max_gap_seconds * sampling_rate)
+    chunks: List[Chunk] = []
+    for region in speech:
+        start, end = int(region["start"]), int(region["end"])
+        if chunks:
+            chunk_start, chunk_end = chunks[-1]
+            if start - chunk_end <= max_gap and end - chunk_start <= max_len:
+                chunks[-1] = (chunk_start, end)
+                continue
+        chunks.append((start, end))
+    return chunks
+
+
+def detect_chunks(audio: Any, sampling_rate: int = SAMPLING_RATE) -> List[Chunk]:
+    """
+    Run Silero VAD over decoded audio and return the chunks worth transcribing.
+    """
+    from faster_whisper.vad import VadOptions, get_speech_timestamps  # type: ignore
+
+    max_chunk_seconds = float(os.getenv("TRANSCRIBE_CHUNK_SECONDS", "60"))
+    options = VadOptions(
+        max_speech_duration_s=max_chunk_seconds,
+        min_silence_duration_ms=int(os.getenv("TRANSCRIBE_VAD_MIN_SILENCE_MS", "500")),
+    )
+    speech = get_speech_timestamps(audio, options, sampling_rate=sampling_rate)
+    return plan_chunks(
+        speech,
+        max_chunk_seconds=max_chunk_seconds,
+        max_gap_seconds=float(os.getenv("TRANSCRIBE_CHUNK_MAX_GAP_SECONDS", "2")),
+        sampling_rate=sampling_rate,
+    )
+
+
+# -- worker process side --
+
+_WORKER_MODEL: Any = None
+
+
+def _init_worker(model_name: str, device: str, compute_type: str, cpu_threads: int) -> None:
+    global _WORKER_MODEL
+    from faster_whisper import WhisperModel  # type: ignore
+    _WORKER_MODEL = WhisperModel(model_name, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+
+
+def _transcribe_chunk(audio: Any, offset: float, language: Optional[str],
+                      beam_size: int, best_of: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    segments, info = _WORKER_MODEL.transcribe(
+        audio, language=language, beam_size=beam_size, best_of=best_of
+    )
+    out = [{
+        "start": round(offset + float(seg.start), 3),
+        "end": round(offset + float(seg.end), 3),
+        "text": (seg.text or "").strip(),
+    } for seg in segments]
+    return out, getattr(info, "language", None)
+
+
+# -- parent process side --
+
+_POOLS: Dict[Tuple[str, str, str], ProcessPoolExecutor] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _get_pool(model_name: str, device: str, compute_type: str) -> ProcessPoolExecutor:
+    """
+    One long-lived process pool per model configuration, so each worker loads
+    its model once rather than once per recording. Those worker models live
+    outside the model registry and are not counted against
+    WHISPER_MODEL_BUDGET_MB: a pool adds about TRANSCRIBE_PARALLEL_WORKERS
+    times the model's size on top of the budget.
+    """
+    key = (model_name, device, compute_type)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            workers = _parallel_workers()
+            cpu_threads = max(1, (os.cpu_count() or 1) // workers)
+            LOGGER.info(f"Starting {workers} long-audio worker(s) for '{model_name}' ({cpu_threads} thread(s) each)")
+            # spawn: CTranslate2/OpenMP state does not survive fork()
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(model_name, device, compute_type, cpu_threads),
+            )
+            _POOLS[key] = pool
+        return pool
+
+
+def shutdown_pools() -> None:
+    """
+    Stop every worker pool (at interpreter exit, and on ASGI shutdown).
+    """
+    with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _POOLS.clear()
+
+
+atexit.register(shutdown_pools)
+
+
+def iter_long_audio_segments(audio: Any, model_name: str, language: Optional[str], device: str,
+                             compute_type: str, metadata: Dict[str, Any], beam_size: Optional[int] = None,
+                             best_of: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Transcribe decoded 16 kHz mono audio chunk by chunk on the process pool,
+    yielding segments in timeline order with chunk offsets applied.
+    """
+    chunks = detect_chunks(audio)
+    speech_seconds = sum(end - start for start, end in chunks) / SAMPLING_RATE
+    metadata["chunks"] = len(chunks)
+    metadata["speech_duration"] = round(speech_seconds, 3)
+    metadata["model"] = f"faster-whisper:{model_name}"
+    metadata["language"] = language
+    if not chunks:
+        return
+
+    pool = _get_pool(model_name, device, compute_type)
+    beam_size = beam_size or int(os.getenv("TRANSCRIBE_BEAM_SIZE", "5"))
+    best_of = best_of or int(os.getenv("TRANSCRIBE_BEST_OF", "5"))
+    futures = [
+        pool.submit(_transcribe_chunk, audio[start:end], start / SAMPLING_RATE, language, beam_size, best_of)
+        for start, end in chunks
+    ]
+    try:
+        for future in futures:
+            segments, chunk_language = future.result()
+            if not metadata.get("language") and chunk_language:
+                metadata["language"] = chunk_language
+            for segment in segments:
+                yield segment
+    finally:
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,285 @@
+"""Process-wide registry of loaded Whisper models with warm-up and LRU eviction."""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .utils import LOGGER
+from .inference_profiles import active_profile
+
+# (backend, model name, device, compute type, cpu threads, num workers)
+ModelKey = Tuple[str, str, str, str, int, int]
+
+# Approximate resident size in MB of each checkpoint at full precision, used
+# when the real footprint cannot be measured from /proc.
+_ESTIMATED_SIZE_MB: Dict[str, float] = {
+    "tiny": 150.0,
+    "base": 290.0,
+    "small": 950.0,
+    "medium": 2900.0,
+    "large": 6000.0,
+}
+
+_COMPUTE_TYPE_FACTOR: Dict[str, float] = {
+    "int8": 0.3,
+    "int8_float32": 0.35,
+    "int8_float16": 0.35,
+    "int8_bfloat16": 0.35,
+    "float16": 0.5,
+    "bfloat16": 0.5,
+}
+
+
+def _estimate_size_mb(model_name: str, compute_type: str) -> float:
+    base_name = model_name.split("/")[-1].lower()
+    base_name = base_name.replace("faster-whisper-", "").split(".")[0].split("-")[0]
+    size = _ESTIMATED_SIZE_MB.get(base_name, _ESTIMATED_SIZE_MB["medium"])
+    return size * _COMPUTE_TYPE_FACTOR.get(compute_type, 1.0)
+
+
+def _current_rss_mb() -> Optional[float]:
+    """
+    Read the current resident set size from /proc; returns None where unavailable.
+    """
+    try:
+        with open("/proc/self/statm", "r") as fh:
+            resident_pages = int(fh.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except Exception:
+        return None
+
+
+def _load_model(backend: str, model_name: str, device: str, compute_type: str,
+                cpu_threads: int = 0, num_workers: int = 1) -> Any:
+    if backend == "faster-whisper":
+        from faster_whisper import WhisperModel  # type: ignore
+        return WhisperModel(
+            model_name, device=device, compute_type=compute_type,
+            cpu_threads=cpu_threads, num_workers=num_workers,
+        )
+    if backend == "whisper":
+        import whisper  # type: ignore
+        return whisper.load_model(model_name, device=None if device == "auto" else device)
+    raise ValueError(f"Unknown whisper backend: {backend}")
+
+
+class _Entry:
+    __slots__ = ("model", "size_mb", "loaded_at", "last_used", "uses")
+
+    def __init__(self, model: Any, size_mb: float) -> None:
+        self.model = model
+        self.size_mb = size_mb
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.uses = 0
+
+
+class ModelRegistry:
+    """
+    Load each (backend, model, device, compute type, threading) combination
+    once per process and keep it resident until it is idle for too long or the
+    memory budget forces it out.
+    """
+
+    def __init__(self, budget_mb: Optional[float] = None, idle_seconds: Optional[float] = None) -> None:
+        self.budget_mb = budget_mb if budget_mb is not None else float(os.getenv("WHISPER_MODEL_BUDGET_MB", "0"))
+        self.idle_seconds = idle_seconds if idle_seconds is not None else float(os.getenv("WHISPER_MODEL_IDLE_SECONDS", "0"))
+        self._entries: "OrderedDict[ModelKey, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        # One load at a time: the RSS delta around a load is only its own while no other load runs.
+        self._load_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "loads": 0, "load_failures": 0, "evictions": 0}
+        self._load_times: Dict[str, float] = {}
+
+    def get(self, backend: str, model_name: str, device: str = "auto", compute_type: str = "default",
+            cpu_threads: int = 0, num_workers: int = 1) -> Any:
+        """
+        Return the loaded model for the key, loading it on first use.
+
+        The recorded size_mb is the growth of the process RSS across the load
+        (or a per-checkpoint estimate where /proc is unavailable). Loads are
+        serialized for that reason, but allocations by concurrent requests
+        still land in the delta, so treat it as approximate.
+        """
+        key: ModelKey = (backend, model_name, device, compute_type, cpu_threads, num_workers)
+        with self._lock:
+            self._evict_idle()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._stats["hits"] += 1
+                return self._touch(key, entry)
+
+        # Only one thread loads at a time; others waiting on the same key then hit.
+        with self._load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._stats["hits"] += 1
+                    return self._touch(key, entry)
+                self._stats["misses"] += 1
+
+            LOGGER.info(
+                f"Loading {backend} model '{model_name}' (device={device}, compute_type={compute_type}, "
+                f"cpu_threads={cpu_threads}, num_workers={num_workers})"
+            )
+            rss_before = _current_rss_mb()
+            start = time.time()
+            try:
+                model = _load_model(backend, model_name, device, compute_type, cpu_threads, num_workers)
+            except Exception:
+                with self._lock:
+                    self._stats["load_failures"] += 1
+                raise
+            load_time = round(time.time() - start, 3)
+            rss_after = _current_rss_mb()
+            if rss_before is not None and rss_after is not None and rss_after > rss_before:
+                size_mb = rss_after - rss_before
+            else:
+                size_mb = _estimate_size_mb(model_name, compute_type)
+
+            with self._lock:
+                entry = _Entry(model, round(size_mb, 1))
+                self._entries[key] = entry
+                self._stats["loads"] += 1
+                self._load_times[self._label(key)] = load_time
+                self._enforce_budget(keep=key)
+                LOGGER.info(f"Loaded '{model_name}' in {load_time}s (~{entry.size_mb} MB)")
+                return self._touch(key, entry)
+
+    def warm_up(self, specs: Iterable[ModelKey]) -> None:
+        """
+        Load the given models ahead of the first request; failures are logged only.
+        """
+        for backend, model_name, device, compute_type, cpu_threads, num_workers in specs:
+            try:
+                self.get(backend, model_name, device, compute_type, cpu_threads, num_workers)
+            except Exception as e:
+                LOGGER.warning(f"Warm-up of '{model_name}' ({backend}) failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of hit/miss counters, load times and the resident models.
+        """
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            now = time.time()
+            models: List[Dict[str, Any]] = []
+            for key, entry in self._entries.items():
+                backend, model_name, device, compute_type, cpu_threads, num_workers = key
+                models.append({
+                    "backend": backend,
+                    "model": model_name,
+                    "device": device,
+                    "compute_type": compute_type,
+                    "cpu_threads": cpu_threads,
+                    "num_workers": num_workers,
+                    "size_mb": entry.size_mb,
+                    "uses": entry.uses,
+                    "idle_seconds": round(now - entry.last_used, 1),
+                    "load_time": self._load_times.get(self._label(key)),
+                })
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                "resident_mb": round(sum(e.size_mb for e in self._entries.values()), 1),
+                "budget_mb": self.budget_mb,
+                "idle_seconds": self.idle_seconds,
+                "load_times": dict(self._load_times),
+                "models": models,
+            }
+
+    # -- internals (callers hold self._lock) --
+
+    @staticmethod
+    def _label(key: ModelKey) -> str:
+        return ":".join(str(part) for part in key)
+
+    def _touch(self, key: ModelKey, entry: _Entry) -> Any:
+        entry.last_used = time.time()
+        entry.uses += 1
+        self._entries.move_to_end(key)
+        return entry.model
+
+    def _drop(self, key: ModelKey) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        # In-flight transcriptions keep their own reference; this only releases ours.
+        self._stats["evictions"] += 1
+        LOGGER.info(f"Evicted whisper model {self._label(key)} (~{entry.size_mb} MB)")
+        return True
+
+    def _evict_idle(self) -> None:
+        if self.idle_seconds <= 0:
+            return
+        cutoff = time.time() - self.idle_seconds
+        for key in [k for k, e in self._entries.items() if e.last_used < cutoff]:
+            self._drop(key)
+
+    def _enforce_budget(self, keep: ModelKey) -> None:
+        if self.budget_mb <= 0:
+            return
+        while sum(e.size_mb for e in self._entries.values()) > self.budget_mb:
+            victim = next((k for k in self._entries if k != keep), None)
+            if victim is None:
+                LOGGER.warning(f"Model {self._label(keep)} alone exceeds WHISPER_MODEL_BUDGET_MB={self.budget_mb}")
+                return
+            self._drop(victim)
+
+
+_REGISTRY: Optional[ModelRegistry] = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """
+    Return the process-wide registry, creating it on first use.
+    """
+    global _REGISTRY
+    if _REGISTRY is None:
+        with _REGISTRY_LOCK:
+            if _REGISTRY is None:
+                _REGISTRY = ModelRegistry()
+    return _REGISTRY
+
+
+def warmup_specs_from_env() -> List[ModelKey]:
+    """
+    Parse WHISPER_WARMUP_MODELS, a comma separated list of model names
+    (optionally prefixed with 'whisper:' or 'faster-whisper:').
+    """
+    raw = os.getenv("WHISPER_WARMUP_MODELS", "").strip()
+    if not raw:
+        return []
+    device = os.getenv("WHISPER_DEVICE", "auto")
+    profile = active_profile()
+    specs: List[ModelKey] = []
+    for item in raw.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        backend, _, name = item.rpartition(":")
+        backend = backend or "faster-whisper"
+        if backend == "faster-whisper":
+            specs.append((backend, name, device, profile["compute_type"],
+                          profile["cpu_threads"], profile["num_workers"]))
+        else:
+            specs.append((backend, name, device, "default", 0, 1))
+    return specs
+
+
+def warm_up_in_background() -> Optional[threading.Thread]:
+    """
+    Start warming the models listed in WHISPER_WARMUP_MODELS on a daemon thread.
+    """
+    specs = warmup_specs_from_env()
+    if not specs:
+        return None
+    thread = threading.Thread(
+        target=get_model_registry().warm_up, args=(specs,), name="whisper-warmup", daemon=True
+    )
+    thread.start()
+    return thread
@@ -0,0 +1,188 @@
+"""Adaptive ordering of the text-generation fallback chain from observed model health."""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .utils import LOGGER
+
+AUTH = "auth"
+NOT_FOUND = "not_found"
+RATE_LIMITED = "rate_limited"
+UNAVAILABLE = "unavailable"
+SERVER = "server"
+CLIENT = "client"
+TIMEOUT = "timeout"
+NETWORK = "network"
+EMPTY = "empty"
+ERROR = "error"
+
+# Failures that say the model will not work for a while whatever we send.
+_HARD_FAILURES = (NOT_FOUND, CLIENT)
+# Failures that may clear up on their own; the model goes down after a streak of them.
+_TRANSIENT_FAILURES = (RATE_LIMITED, UNAVAILABLE, SERVER, TIMEOUT, NETWORK, AUTH, ERROR)
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    Map an exception from the sync (requests) or async (aiohttp) client to a failure kind.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status", None)
+    if isinstance(status, int):
+        if status in (401, 403):
+            return AUTH
+        if status == 404:
+            return NOT_FOUND
+        if status == 429:
+            return RATE_LIMITED
+        if status == 503:
+            return UNAVAILABLE
+        if status >= 500:
+            return SERVER
+        if status >= 400:
+            return CLIENT
+    name = type(error).__name__
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError)) or "Timeout" in name:
+        return TIMEOUT
+    # by class name: requests/urllib3 connection errors, and aiohttp's ClientConnectionError family (refused, disconnected)
+    if isinstance(error, ConnectionError) or "Connection" in name or any(
+        cls.__name__ == "ClientConnectionError" for cls in type(error).__mro__
+    ):
+        return NETWORK
+    return ERROR
+
+
+class _ModelHealth:
+    __slots__ = ("successes", "failures", "streak", "latency", "errors", "down_until")
+
+    def __init__(self) -> None:
+        self.successes = 0
+        self.failures = 0
+        self.streak = 0
+        self.latency: Optional[float] = None
+        self.errors: Deque[Tuple[float, str]] = deque(maxlen=10)
+        self.down_until = 0.0
+
+
+class GenerationRouter:
+    """
+    Per-model success rate, recent error kinds and latency EWMA for the
+    generation models. order() skips models in a cool-down and sorts the
+    rest by expected time to a usable answer (latency / success rate), with
+    the configured order breaking ties and ranking unmeasured models.
+    """
+
+    def __init__(self, alpha: float = 0.3) -> None:
+        self.alpha = alpha
+        self.prior_latency = float(os.getenv("HF_ROUTER_PRIOR_LATENCY_SECONDS", "10"))
+        self.failure_threshold = max(1, int(os.getenv("HF_ROUTER_FAILURE_THRESHOLD", "2")))
+        self.cooldown_seconds = float(os.getenv("HF_ROUTER_COOLDOWN_SECONDS", "120"))
+        self.hard_cooldown_seconds = float(os.getenv("HF_ROUTER_HARD_COOLDOWN_SECONDS", "3600"))
+        self._models: Dict[str, _ModelHealth] = {}
+        self._lock = threading.Lock()
+
+    def _health(self, model: str) -> _ModelHealth:
+        health = self._models.get(model)
+        if health is None:
+            health = self._models[model] = _ModelHealth()
+        return health
+
+    def expected_latency(self, model: str) -> float:
+        with self._lock:
+            return self._expected(self._health(model))
+
+    def _expected(self, health: _ModelHealth) -> float:
+        latency = health.latency if health.latency is not None else self.prior_latency
+        # Laplace-smoothed success rate, so one early failure does not bury a model.
+        success_rate = (health.successes + 1) / (health.successes + health.failures + 2)
+        return latency / success_rate
+
+    def order(self, models: List[str]) -> List[str]:
+        """
+        Candidates to try, best first. When every model is cooling down, they
+        are all returned by soonest recovery so the request still gets a try.
+        """
+        now = time.time()
+        with self._lock:
+            healthy = [m for m in models if self._health(m).down_until <= now]
+            if not healthy:
+                return sorted(models, key=lambda m: self._health(m).down_until)
+            rank = {m: i for i, m in enumerate(models)}
+            return sorted(healthy, key=lambda m: (self._expected(self._health(m)), rank[m]))
+
+    def record_success(self, model: str, latency: float) -> None:
+        with self._lock:
+            health = self._health(model)
+            health.successes += 1
+            health.streak = 0
+            health.down_until = 0.0
+            self._observe_latency(health, latency)
+
+    def record_failure(self, model: str, kind: str, latency: Optional[float] = None) -> None:
+        with self._lock:
+            health = self._health(model)
+            health.failures += 1
+            health.streak += 1
+            health.errors.append((time.time(), kind))
+            if latency is not None and kind in (TIMEOUT, EMPTY):
+                # Slow non-answers still cost the caller that long.
+                self._observe_latency(health, latency)
+            cooldown = 0.0
+            if kind in _HARD_FAILURES:
+                cooldown = self.hard_cooldown_seconds
+            elif kind in _TRANSIENT_FAILURES and health.streak >= self.failure_threshold:
+                cooldown = self.cooldown_seconds
+            if cooldown > 0:
+                health.down_until = time.time() + cooldown
+                LOGGER.warning(f"Generation model {model} skipped for {cooldown}s after {kind} ({health.streak} in a row)")
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            models: Dict[str, Any] = {}
+            for name, health in self._models.items():
+                attempts = health.successes + health.failures
+                models[name] = {
+                    "successes": health.successes,
+                    "failures": health.failures,
+                    "success_rate": round(health.successes / attempts, 4) if attempts else None,
+                    "latency_ewma": round(health.latency, 3) if health.latency is not None else None,
+                    "expected_latency": round(self._expected(health), 3),
+                    "recent_errors": [kind for _, kind in health.errors],
+                    "down_for_seconds": round(max(0.0, health.down_until - now), 1),
+                }
+            return {
+                "failure_threshold": self.failure_threshold,
+                "cooldown_seconds": self.cooldown_seconds,
+                "hard_cooldown_seconds": self.hard_cooldown_seconds,
+                "models": models,
+            }
+
+    # -- internals (callers hold self._lock) --
+
+    def _observe_latency(self, health: _ModelHealth, latency: float) -> None:
+        if health.latency is None:
+            health.latency = latency
+        else:
+            health.latency = self.alpha * latency + (1 - self.alpha) * health.latency
+
+
+_ROUTER: Optional[GenerationRouter] = None
+_ROUTER_LOCK = threading.Lock()
+
+
+def get_generation_router() -> GenerationRouter:
+    """
+    Return the process-wide router, creating it on first use.
+    """
+    global _ROUTER
+    if _ROUTER is None:
+        with _ROUTER_LOCK:
+            if _ROUTER is None:
+                _ROUTER = GenerationRouter()
+    return _ROUTER
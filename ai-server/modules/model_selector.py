@@ -0,0 +1,191 @@
+"""Pick whisper model size and beam settings from a latency budget or quality tier."""
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .utils import LOGGER
+
+# Real-time factor (decode seconds per audio second) at beam_size=5 on CPU,
+# used until this process has measured its own.
+_DEFAULT_RTF: Dict[str, float] = {
+    "tiny": 0.06,
+    "base": 0.12,
+    "small": 0.35,
+    "medium": 0.9,
+    "large-v3": 1.8,
+}
+
+# Relative decode cost of a beam size compared with beam_size=5.
+_BEAM_COST: Dict[int, float] = {1: 0.55, 2: 0.7, 3: 0.8, 4: 0.9, 5: 1.0}
+
+QUALITY_TIERS = ("fast", "balanced", "accurate")
+
+
+def _parse_rtf_defaults() -> Dict[str, float]:
+    table = dict(_DEFAULT_RTF)
+    raw = os.getenv("WHISPER_RTF_DEFAULTS", "")
+    for item in raw.split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip():
+            try:
+                table[name.strip()] = float(value)
+            except ValueError:
+                LOGGER.warning(f"Ignoring bad WHISPER_RTF_DEFAULTS entry: {item}")
+    return table
+
+
+def _beam_cost(beam_size: int) -> float:
+    return _BEAM_COST.get(beam_size, 1.0 + 0.1 * max(0, beam_size - 5))
+
+
+class ModelSelector:
+    """
+    Tracks per-model real-time factors (EWMA of observed decodes) and the
+    number of transcriptions in flight, and turns a latency budget or quality
+    tier into a concrete (model, beam_size, best_of).
+    """
+
+    def __init__(self, models: Optional[List[str]] = None, alpha: float = 0.3) -> None:
+        configured = os.getenv("WHISPER_SELECT_MODELS", "tiny,base,small,medium")
+        # Ordered from fastest to most accurate.
+        self.models = models or [m.strip() for m in configured.split(",") if m.strip()]
+        self.alpha = alpha
+        self._rtf = _parse_rtf_defaults()
+        self._observed: Dict[str, int] = {}
+        self._inflight = 0
+        self._queue_depth_providers: List[Callable[[], int]] = []
+        self._lock = threading.Lock()
+
+    # -- load tracking --
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """
+        Count a transcription as in flight for the duration of the block.
+        """
+        with self._lock:
+            self._inflight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+    def register_queue_depth(self, provider: Callable[[], int]) -> None:
+        """
+        Add a source of waiting work (e.g. the background job queue).
+        """
+        self._queue_depth_providers.append(provider)
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            depth = self._inflight
+        for provider in self._queue_depth_providers:
+            try:
+                depth += int(provider())
+            except Exception as e:
+                LOGGER.debug(f"Queue depth provider failed: {e}")
+        return depth
+
+    # -- real-time factors --
+
+    def rtf(self, model_name: str) -> float:
+        with self._lock:
+            return self._rtf.get(model_name, self._rtf.get("medium", 1.0))
+
+    def observe(self, model_name: str, beam_size: int, audio_seconds: float, decode_seconds: float) -> None:
+        """
+        Fold one measured decode into the model's beam-5-equivalent RTF.
+        """
+        if audio_seconds <= 0 or decode_seconds <= 0:
+            return
+        sample = (decode_seconds / audio_seconds) / _beam_cost(beam_size)
+        with self._lock:
+            if self._observed.get(model_name):
+                previous = self._rtf.get(model_name, sample)
+                self._rtf[model_name] = (1 - self.alpha) * previous + self.alpha * sample
+            else:
+                self._rtf[model_name] = sample
+            self._observed[model_name] = self._observed.get(model_name, 0) + 1
+
+    def predict(self, model_name: str, beam_size: int, audio_seconds: float, queue_depth: int) -> float:
+        # Work already in flight shares the same cores, so it stretches ours.
+        return audio_seconds * self.rtf(model_name) * _beam_cost(beam_size) * (1 + queue_depth)
+
+    # -- selection --
+
+    def _candidates(self, quality: Optional[str], default_beam: int) -> List[Tuple[str, int]]:
+        """
+        (model, beam) pairs allowed by the tier, most accurate first.
+        """
+        if quality == "fast":
+            models = self.models[:2]
+            beams = [1]
+        elif quality == "balanced":
+            models = self.models[:3]
+            beams = sorted({min(default_beam, 2), 1}, reverse=True)
+        else:
+            models = self.models
+            beams = sorted({default_beam, 1}, reverse=True)
+        return [(m, b) for m in reversed(models) for b in beams]
+
+    def choose(self, audio_seconds: float, latency_budget: Optional[float] = None,
+               quality: Optional[str] = None, default_beam: int = 5, default_best_of: int = 5) -> Dict[str, Any]:
+        """
+        Most accurate configuration whose predicted decode time fits the
+        budget; the fastest allowed one if nothing fits.
+        """
+        if quality is not None and quality not in QUALITY_TIERS:
+            raise ValueError(f"Unknown quality tier '{quality}' (expected one of {', '.join(QUALITY_TIERS)})")
+        depth = self.queue_depth()
+        candidates = self._candidates(quality, default_beam)
+        chosen = None
+        reason = "tier"
+        for model_name, beam in candidates:
+            predicted = self.predict(model_name, beam, audio_seconds, depth)
+            if latency_budget is None or predicted <= latency_budget:
+                chosen = (model_name, beam, predicted)
+                reason = "within_budget" if latency_budget is not None else "tier"
+                break
+        if chosen is None:
+            model_name, beam = min(candidates, key=lambda c: self.predict(c[0], c[1], audio_seconds, depth))
+            chosen = (model_name, beam, self.predict(model_name, beam, audio_seconds, depth))
+            reason = "over_budget_fastest"
+        model_name, beam, predicted = chosen
+        return {
+            "model": model_name,
+            "beam_size": beam,
+            "best_of": min(default_best_of, beam) if beam < default_beam else default_best_of,
+            "predicted_seconds": round(predicted, 3),
+            "rtf": round(self.rtf(model_name), 4),
+            "queue_depth": depth,
+            "audio_seconds": round(audio_seconds, 3),
+            "latency_budget": latency_budget,
+            "quality": quality,
+            "reason": reason,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "models": list(self.models),
+                "rtf": {k: round(v, 4) for k, v in self._rtf.items()},
+                "observations": dict(self._observed),
+                "inflight": self._inflight,
+            }
+
+
+_SELECTOR: Optional[ModelSelector] = None
+_SELECTOR_LOCK = threading.Lock()
+
+
+def get_model_selector() -> ModelSelector:
+    global _SELECTOR
+    if _SELECTOR is None:
+        with _SELECTOR_LOCK:
+            if _SELECTOR is None:
+                _SELECTOR = ModelSelector()
+    return _SELECTOR
@@ -0,0 +1,65 @@
+"""Array-backed transcript segment storage."""
+from __future__ import annotations
+
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Union
+
+
+class SegmentTable:
+    """
+    Segments stored column-wise: two float64 arrays for start/end and a list
+    of texts. Iterating or indexing yields the usual {"start", "end", "text"}
+    dicts, so it can stand in for the list of Segment dicts.
+    """
+
+    __slots__ = ("starts", "ends", "texts")
+
+    def __init__(self) -> None:
+        self.starts = array("d")
+        self.ends = array("d")
+        self.texts: List[str] = []
+
+    @classmethod
+    def from_segments(cls, segments: Iterable[Dict[str, Any]]) -> "SegmentTable":
+        table = cls()
+        for seg in segments:
+            table.append(seg["start"], seg["end"], seg["text"])
+        return table
+
+    @classmethod
+    def from_columnar(cls, columns: Dict[str, List[Any]]) -> "SegmentTable":
+        table = cls()
+        table.starts.extend(float(x) for x in columns.get("start", []))
+        table.ends.extend(float(x) for x in columns.get("end", []))
+        table.texts.extend(columns.get("text", []))
+        return table
+
+    def append(self, start: float, end: float, text: str) -> None:
+        self.starts.append(start)
+        self.ends.append(end)
+        self.texts.append(text)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for start, end, text in zip(self.starts, self.ends, self.texts):
+            yield {"start": start, "end": end, "text": text}
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        return {"start": self.starts[index], "end": self.ends[index], "text": self.texts[index]}
+
+    def raw_text(self) -> str:
+        """
+        All segment texts joined with single spaces.
+        """
+        return " ".join(" ".join(self.texts).split()).strip()
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+    def to_columnar(self) -> Dict[str, List[Any]]:
+        return {"start": self.starts.tolist(), "end": self.ends.tolist(), "text": list(self.texts)}
+
+
+SegmentsLike = Union[SegmentTable, List[Dict[str, Any]]]
@@ -0,0 +1,170 @@
+"""
+Single-flight coalescing: concurrent requests with the same canonical payload
+share one in-flight computation.
+
+The first caller for a key (the leader) runs the work; callers that arrive
+while it is running (followers) wait for the leader's result instead of
+repeating the transcription or Hugging Face calls. When the leader fails,
+each follower raises its own SharedCallError chained to the leader's
+exception, so no exception object is raised from several threads at once. Nothing is
+kept once the leader finishes, so this complements rather than replaces the
+response caches. Coalescing is per process (per gunicorn/uvicorn worker).
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .utils import LOGGER
+
+
+class SharedCallError(Exception):
+    """
+    Raised to a follower whose leader failed; carries the leader's message,
+    and the leader's exception is its __cause__.
+    """
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Keyed by namespace (the endpoint) plus a hash of the canonical JSON payload.
+    Followers that wait longer than SINGLE_FLIGHT_WAIT_SECONDS stop waiting and
+    run the work themselves.
+    """
+
+    def __init__(self, wait_seconds: Optional[float] = None) -> None:
+        self.enabled = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+        self.wait_seconds = wait_seconds if wait_seconds is not None else float(os.getenv("SINGLE_FLIGHT_WAIT_SECONDS", "300"))
+        self._flights: Dict[str, _Flight] = {}
+        self._tasks: Dict[str, "asyncio.Future[Any]"] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def key(namespace: str, payload: Any) -> str:
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return f"{namespace}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+    def do(self, namespace: str, payload: Any, fn: Callable[[], Any]) -> Any:
+        """
+        Return fn(), sharing one run among concurrent callers with an identical payload.
+        """
+        if not self.enabled:
+            return fn()
+        key = self.key(namespace, payload)
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            self._count(namespace, "leaders" if leader else "followers")
+
+        if not leader:
+            if not flight.done.wait(self.wait_seconds):
+                LOGGER.warning(f"Single-flight wait for {namespace} exceeded {self.wait_seconds}s; running it again")
+                with self._lock:
+                    self._count(namespace, "wait_timeouts")
+                return fn()
+            if flight.error is not None:
+                raise SharedCallError(str(flight.error)) from flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self._count(namespace, "errors")
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    async def do_async(self, namespace: str, payload: Any, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Coroutine counterpart of do(). The work runs as its own task, so a
+        cancelled leader does not cancel it for the followers. Must be used
+        from a single event loop.
+        """
+        if not self.enabled:
+            return await factory()
+        key = self.key(namespace, payload)
+        with self._lock:
+            task = self._tasks.get(key)
+            leader = task is None
+            if leader:
+                task = self._tasks[key] = asyncio.ensure_future(factory())
+                task.add_done_callback(lambda done, key=key, namespace=namespace: self._finish_task(key, namespace, done))
+            self._count(namespace, "leaders" if leader else "followers")
+        if leader:
+            return await asyncio.shield(task)
+        try:
+            return await asyncio.shield(task)
+        except Exception as e:
+            raise SharedCallError(str(e)) from e
+
+    def _finish_task(self, key: str, namespace: str, task: "asyncio.Future[Any]") -> None:
+        with self._lock:
+            self._tasks.pop(key, None)
+            if task.cancelled() or task.exception() is not None:
+                self._count(namespace, "errors")
+
+    def stats(self, *namespaces: str) -> Dict[str, Any]:
+        """
+        Leader/follower counts per namespace (all of them when none are given).
+        """
+        with self._lock:
+            in_flight: Dict[str, int] = {}
+            for key in list(self._flights) + list(self._tasks):
+                namespace = key.split(":", 1)[0]
+                in_flight[namespace] = in_flight.get(namespace, 0) + 1
+            result: Dict[str, Any] = {}
+            for namespace in namespaces or tuple(self._stats):
+                counts = self._stats.get(namespace, {})
+                requests = counts.get("leaders", 0) + counts.get("followers", 0)
+                result[namespace] = {
+                    "leaders": counts.get("leaders", 0),
+                    "followers": counts.get("followers", 0),
+                    "errors": counts.get("errors", 0),
+                    "wait_timeouts": counts.get("wait_timeouts", 0),
+                    "coalesced_ratio": round(counts.get("followers", 0) / requests, 4) if requests else 0.0,
+                    "in_flight": in_flight.get(namespace, 0),
+                }
+            return {"enabled": self.enabled, "endpoints": result}
+
+    # -- internals (callers hold self._lock) --
+
+    def _count(self, namespace: str, field: str) -> None:
+        counts = self._stats.setdefault(namespace, {})
+        counts[field] = counts.get(field, 0) + 1
+
+
+_SINGLE_FLIGHT: Optional[SingleFlight] = None
+_SINGLE_FLIGHT_LOCK = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """
+    Return the process-wide single-flight group, creating it on first use.
+    """
+    global _SINGLE_FLIGHT
+    if _SINGLE_FLIGHT is None:
+        with _SINGLE_FLIGHT_LOCK:
+            if _SINGLE_FLIGHT is None:
+                _SINGLE_FLIGHT = SingleFlight()
+    return _SINGLE_FLIGHT
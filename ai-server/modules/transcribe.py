@@ -3,25 +3,18 @@ from __future__ import annotations
 
 import os
 import time
-from typing import Dict, Any, Optional, List, TypedDict
+from typing import Dict, Any, Iterator, Optional, TypedDict, Union
 
 from .utils import LOGGER
-
-def _get_faster_model():
-    try:
-        from faster_whisper import WhisperModel  # type: ignore
-        return WhisperModel
-    except Exception as e:  # pragma: no cover
-        LOGGER.debug(f"faster-whisper import failed: {e}")
-        return None
-
-def _get_whisper_module():
-    try:
-        import whisper  # type: ignore
-        return whisper
-    except Exception as e:  # pragma: no cover
-        LOGGER.debug(f"openai-whisper import failed: {e}")
-        return None
+from .audio import AudioSource
+from .model_registry import get_model_registry
+from .inference_profiles import active_profile
+from .long_audio import iter_long_audio_segments, long_audio_threshold_seconds
+from .transcript_cache import get_transcript_cache
+from .model_selector import get_model_selector
+from .segments import SegmentTable
+from .backend_health import get_backend_health
+from .language_detect import detection_enabled, resolve_language
 
 
 class Segment(TypedDict):
@@ -30,94 +23,255 @@ class Segment(TypedDict):
     text: str
 
 
-def _default_language() -> str:
-    return os.getenv("TRANSCRIBE_LANGUAGE", "ar")
+def _default_language() -> Optional[str]:
+    language = os.getenv("TRANSCRIBE_LANGUAGE", "ar")
+    # "auto" means detect; None lets whisper detect on its own if the prepass cannot.
+    return None if language.lower() == "auto" else language
+
+
+def _device() -> str:
+    return os.getenv("WHISPER_DEVICE", "auto")
+
+
+def _compute_type() -> str:
+    return active_profile()["compute_type"]
+
+
+def _beam_size() -> int:
+    return int(os.getenv("TRANSCRIBE_BEAM_SIZE", "5"))
+
+
+def _best_of() -> int:
+    return int(os.getenv("TRANSCRIBE_BEST_OF", "5"))
+
 
+def _faster_whisper_segments(
+    source: AudioSource, model_name: str, language: Optional[str], decode: Dict[str, int], metadata: Dict[str, Any]
+) -> Iterator[Segment]:
+    profile = active_profile()
+    model = get_model_registry().get(
+        "faster-whisper", model_name, _device(), profile["compute_type"],
+        profile["cpu_threads"], profile["num_workers"],
+    )
+    segments, info = model.transcribe(
+        source.samples,
+        language=language,
+        beam_size=decode["beam_size"],
+        best_of=decode["best_of"],
+    )
+    metadata["language"] = getattr(info, "language", None) or language
+    metadata["model"] = f"faster-whisper:{model_name}"
+    # `segments` is lazy: each item is decoded only when we ask for it.
+    for seg in segments:
+        yield {
+            "start": float(getattr(seg, "start", 0.0)),
+            "end": float(getattr(seg, "end", 0.0)),
+            "text": (getattr(seg, "text", "") or "").strip(),
+        }
+
+
+def _long_audio_segments(
+    source: AudioSource, model_name: str, language: Optional[str], decode: Dict[str, int], metadata: Dict[str, Any]
+) -> Iterator[Segment]:
+    yield from iter_long_audio_segments(
+        source.samples, model_name, language, _device(), _compute_type(), metadata,
+        beam_size=decode["beam_size"], best_of=decode["best_of"],
+    )
+
+
+def _use_long_audio(source: AudioSource, long_audio: Optional[bool]) -> bool:
+    if long_audio is not None:
+        return long_audio
+    threshold = long_audio_threshold_seconds()
+    return threshold > 0 and source.duration >= threshold
+
+
+def _whisper_segments(
+    source: AudioSource, model_name: str, language: Optional[str], decode: Dict[str, int], metadata: Dict[str, Any]
+) -> Iterator[Segment]:
+    mdl = get_model_registry().get("whisper", model_name, _device())
+    result = mdl.transcribe(
+        source.samples,
+        language=language,
+        beam_size=decode["beam_size"],
+        best_of=decode["best_of"],
+    )
+    metadata["language"] = result.get("language") or language
+    metadata["model"] = f"whisper:{model_name}"
+    for s in result.get("segments") or []:
+        yield {
+            "start": float(s.get("start") or 0.0),
+            "end": float(s.get("end") or 0.0),
+            "text": (s.get("text") or "").strip(),
+        }
 
-def transcribe_audio(file_path: str, model_name: Optional[str] = None) -> Dict[str, Any]:
+
+def _apply_detection(metadata: Dict[str, Any], detection: Optional[Dict[str, Any]]) -> None:
+    if detection is None:
+        return
+    metadata["language_detection"] = detection
+    if detection.get("used"):
+        metadata["language"] = detection["language"]
+        metadata["language_probability"] = detection["probability"]
+
+
+def iter_segments(
+    audio: Union[str, AudioSource],
+    model_name: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    long_audio: Optional[bool] = None,
+    latency_budget: Optional[float] = None,
+    quality: Optional[str] = None,
+    backend: Optional[str] = None,
+) -> Iterator[Segment]:
     """
-    Transcribe an audio file and return a dict containing raw transcript,
-    segments with timestamps, and metadata.
+    Yield transcript segments as soon as the backend decodes them.
+
+    `audio` is a file path or an AudioSource (e.g. upload bytes held in
+    memory); it is decoded once to 16 kHz mono PCM which the model consumes
+    directly.
+
+    `metadata` (language, model, duration, processing_time) is filled in once the
+    generator is exhausted. A backend that fails before producing its first
+    segment falls through to the next one; a failure mid-stream is raised.
+
+    `long_audio` forces (True) or disables (False) VAD chunking with parallel
+    decoding; by default it is used for recordings of at least
+    TRANSCRIBE_LONG_AUDIO_SECONDS.
+
+    When no `model_name` is given but a `latency_budget` (seconds) or
+    `quality` tier (fast/balanced/accurate) is, the model size, beam_size and
+    best_of are chosen by the ModelSelector and reported in
+    metadata["selection"].
+
+    With TRANSCRIBE_DETECT_LANGUAGE=true (or TRANSCRIBE_LANGUAGE=auto) the
+    language is first detected from the opening seconds of speech with a
+    small model and the decode runs with it fixed; metadata["language"] and
+    metadata["language_probability"] report the result.
+
+    `backend` ("faster-whisper" or "whisper") pins a single backend with no
+    fallback, e.g. for benchmarking.
+
+    Results are looked up in, and stored to, the transcript cache keyed by the
+    audio bytes and the request's options (model or latency budget/quality,
+    language settings, decode parameters, long-audio mode, pinned backend and
+    the profile's compute type).
     """
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"File not found: {file_path}")
+    if isinstance(audio, str):
+        if not os.path.exists(audio):
+            raise FileNotFoundError(f"File not found: {audio}")
+        source = AudioSource.from_path(audio)
+    else:
+        source = audio
+
+    start_time = time.time()
+    metadata = metadata if metadata is not None else {}
+    decode = {"beam_size": _beam_size(), "best_of": _best_of()}
+    if model_name is None and latency_budget is None and quality is None:
+        model_name = os.getenv("WHISPER_MODEL", "medium")
+
+    # Keyed by the request's own options, so a hit skips decoding, language detection and model selection.
+    cache = get_transcript_cache()
+    cache_key: Optional[str] = None
+    if cache is not None:
+        cache_key = cache.key(
+            source.sha256, model_name, latency_budget, quality, _default_language(), detection_enabled(),
+            decode["beam_size"], decode["best_of"], long_audio, long_audio_threshold_seconds(),
+            backend, _compute_type(),
+        )
+        cached = cache.get(cache_key)
+        if cached is not None:
+            LOGGER.info(f"Transcript cache hit for '{source.name}'")
+            metadata.update(cached.get("metadata") or {})
+            metadata["cached"] = True
+            if "columns" in cached:
+                yield from SegmentTable.from_columnar(cached["columns"])
+            else:
+                yield from cached.get("segments") or []
+            metadata["processing_time"] = round(time.time() - start_time, 3)
+            return
+
+    selector = get_model_selector()
+    selection: Optional[Dict[str, Any]] = None
+    if model_name is None:
+        selection = selector.choose(
+            source.duration, latency_budget, quality, decode["beam_size"], decode["best_of"]
+        )
+        model_name = selection["model"]
+        decode = {"beam_size": selection["beam_size"], "best_of": selection["best_of"]}
 
-    model_name = model_name or os.getenv("WHISPER_MODEL", "medium")
     language = _default_language()
-    LOGGER.info(f"Transcribing '{file_path}' with model '{model_name}' (lang={language})")
+    detection: Optional[Dict[str, Any]] = None
+    if detection_enabled() and get_backend_health().healthy("faster-whisper"):
+        resolved = resolve_language(source, language)
+        language, detection = resolved["language"], resolved["detection"]
+    LOGGER.info(f"Transcribing '{source.name}' with model '{model_name}' (lang={language}, beam={decode['beam_size']})")
 
-    start_time = time.time()
-    raw_text: str = ""
-    segments_out: List[Segment] = []
-    detected_language: Optional[str] = None
-
-    WhisperModel = _get_faster_model()
-    if WhisperModel is not None:
-        try:
-            model = WhisperModel(model_name, device="auto")
-            segments, info = model.transcribe(
-                file_path,
-                language=language,
-                beam_size=int(os.getenv("TRANSCRIBE_BEAM_SIZE", "5")),
-                best_of=int(os.getenv("TRANSCRIBE_BEST_OF", "5")),
-            )
-            for seg in segments:
-                text_piece = (getattr(seg, "text", "") or "").strip()
-                raw_text += text_piece + " "
-                segments_out.append({
-                    "start": float(getattr(seg, "start", 0.0)),
-                    "end": float(getattr(seg, "end", 0.0)),
-                    "text": text_piece,
-                })
-            raw_text = " ".join(raw_text.split()).strip()
-            detected_language = getattr(info, "language", None)
-            processing_time = round(time.time() - start_time, 3)
-            return {
-                "raw_transcript": raw_text,
-                "segments": segments_out,
-                "metadata": {
-                    "language": detected_language or language,
-                    "model": f"faster-whisper:{model_name}",
-                    "processing_time": processing_time,
-                },
-            }
-        except Exception as e:
-            LOGGER.error(f"faster-whisper error: {e}")
-            # fall through to whisper backend
-
-    whisper = _get_whisper_module()
-    if whisper is not None:
-        try:
-            mdl = whisper.load_model(model_name)
-            result = mdl.transcribe(
-                file_path,
-                language=language,
-                beam_size=int(os.getenv("TRANSCRIBE_BEAM_SIZE", "5")),
-                best_of=int(os.getenv("TRANSCRIBE_BEST_OF", "5")),
-            )
-            raw_text = (result.get("text") or "").strip()
-            segs = result.get("segments") or []
-            for s in segs:
-                segments_out.append({
-                    "start": float(s.get("start") or 0.0),
-                    "end": float(s.get("end") or 0.0),
-                    "text": (s.get("text") or "").strip(),
-                })
-            detected_language = result.get("language") or language
-            processing_time = round(time.time() - start_time, 3)
-            return {
-                "raw_transcript": raw_text,
-                "segments": segments_out,
-                "metadata": {
-                    "language": detected_language,
-                    "model": f"whisper:{model_name}",
-                    "processing_time": processing_time,
-                },
-            }
-        except Exception as e:
-            LOGGER.error(f"whisper error: {e}")
+    metadata.update(source.decode().metadata())
+    if selection is not None:
+        metadata["selection"] = selection
+    _apply_detection(metadata, detection)
+    # Backends whose circuit is open (failed import or repeated failures) are skipped untried.
+    health = get_backend_health()
+    backends = []
+    if backend in (None, "faster-whisper") and health.allow("faster-whisper", model_name):
+        if _use_long_audio(source, long_audio):
+            backends.append(("faster-whisper", _long_audio_segments))
+        backends.append(("faster-whisper", _faster_whisper_segments))
+    if backend in (None, "whisper") and health.allow("whisper", model_name):
+        backends.append(("whisper", _whisper_segments))
 
+    with selector.track():
+        for backend_name, run_backend in backends:
+            produced = SegmentTable()
+            backend_start = time.time()
+            try:
+                for segment in run_backend(source, model_name, language, decode, metadata):
+                    produced.append(segment["start"], segment["end"], segment["text"])
+                    yield segment
+                health.record_success(backend_name, model_name)
+                metadata["processing_time"] = round(time.time() - start_time, 3)
+                if run_backend is not _long_audio_segments:
+                    # Chunked decodes run in parallel and would skew the single-stream RTF.
+                    selector.observe(model_name, decode["beam_size"], source.duration, time.time() - backend_start)
+                if cache is not None and cache_key is not None:
+                    cache.put(cache_key, {"columns": produced.to_columnar(), "metadata": dict(metadata)})
+                return
+            except Exception as e:
+                LOGGER.error(f"{backend_name} error: {e}")
+                if run_backend is not _long_audio_segments:
+                    # a failed worker pool is not a failure of the model; the plain decode below decides
+                    health.record_failure(backend_name, model_name, e)
+                if produced:
+                    raise
+                # fall through to the next backend
+
+    if health.installed():
+        raise RuntimeError("No healthy whisper backend available; see /api/transcribe/backends")
     raise RuntimeError(
         "No whisper backend available. Please install faster-whisper: pip install faster-whisper "
         "or openai-whisper: pip install openai-whisper"
     )
+
+
+def transcribe_audio(
+    audio: Union[str, AudioSource],
+    model_name: Optional[str] = None,
+    long_audio: Optional[bool] = None,
+    latency_budget: Optional[float] = None,
+    quality: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Transcribe an audio file (path or AudioSource) and return a dict containing
+    raw transcript, segments with timestamps (a SegmentTable, which iterates
+    as Segment dicts), and metadata.
+    """
+    metadata: Dict[str, Any] = {}
+    segments_out = SegmentTable()
+    for seg in iter_segments(audio, model_name, metadata, long_audio, latency_budget, quality):
+        segments_out.append(seg["start"], seg["end"], seg["text"])
+    return {
+        "raw_transcript": segments_out.raw_text(),
+        "segments": segments_out,
+        "metadata": metadata,
+    }
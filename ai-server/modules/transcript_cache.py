@@ -0,0 +1,152 @@
+"""Persistent content-addressed cache of transcription results."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .utils import LOGGER
+
+
+def _default_directory() -> str:
+    here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.getenv("TRANSCRIPT_CACHE_DIR", os.path.join(here, "data", "transcripts"))
+
+
+class TranscriptCache:
+    """
+    One JSON file per (audio hash, transcription options) under `directory`.
+    Reads refresh the file's mtime; when the directory grows past `max_bytes`
+    the least recently used entries are deleted.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None) -> None:
+        self.directory = directory or _default_directory()
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "512")) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "errors": 0}
+
+    @staticmethod
+    def key(audio_hash: str, *options: Any) -> str:
+        """
+        Entry key for an audio hash and the JSON-serializable options that shape its transcript.
+        """
+        params = json.dumps([audio_hash, *options])
+        return hashlib.sha256(params.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                value = json.load(fh)
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+        except Exception as e:
+            LOGGER.warning(f"Transcript cache read failed ({key}): {e}")
+            with self._lock:
+                self._stats["errors"] += 1
+                self._stats["misses"] += 1
+            return None
+        with self._lock:
+            self._stats["hits"] += 1
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(value, fh, ensure_ascii=False)
+            size = os.path.getsize(tmp_path)
+            try:
+                # overwriting an entry replaces its bytes rather than adding to them
+                size -= os.path.getsize(path)
+            except OSError:
+                pass
+            os.replace(tmp_path, path)
+        except Exception as e:
+            LOGGER.warning(f"Transcript cache write failed ({key}): {e}")
+            with self._lock:
+                self._stats["errors"] += 1
+            return
+        with self._lock:
+            self._stats["stores"] += 1
+            if self._size is not None:
+                self._size += size
+        self._enforce_limit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "directory": self.directory,
+            }
+
+    def _scan(self) -> List[Tuple[float, int, str]]:
+        entries: List[Tuple[float, int, str]] = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _enforce_limit(self) -> None:
+        if self.max_bytes <= 0:
+            return
+        with self._lock:
+            if self._size is not None and self._size <= self.max_bytes:
+                return
+            # Other workers write to the same directory, so re-measure before evicting.
+            entries = self._scan()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    self._stats["evictions"] += 1
+                except OSError:
+                    continue
+            self._size = total
+
+
+_CACHE: Optional[TranscriptCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_transcript_cache() -> Optional[TranscriptCache]:
+    """
+    Return the process-wide cache, or None when TRANSCRIPT_CACHE_ENABLED is false.
+    """
+    global _CACHE
+    if os.getenv("TRANSCRIPT_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = TranscriptCache()
+    return _CACHE
@@ -2,20 +2,39 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
+import threading
 import time
 import tempfile
 import os
 import mimetypes
+import json
 import requests # Added for debug endpoint
-
-from modules.utils import LOGGER, validate_api_key, audio_duration_seconds
-from modules.transcribe import transcribe_audio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
+
+from modules.utils import LOGGER, validate_api_key
+from modules.audio import AudioSource
+from modules.transcribe import iter_segments, transcribe_audio
+from modules.segments import SegmentTable
+from modules.encoding import dumps_json, encoded_response
+from modules.model_registry import get_model_registry, warm_up_in_background
+from modules.backend_health import get_backend_health
+from modules.inference_profiles import active_profile
+from modules.jobs import JobQueueFull, TranscriptionJobQueue
+from modules.transcript_cache import get_transcript_cache
+from modules.model_selector import QUALITY_TIERS, get_model_selector
 from modules.huggingface_analyzer import get_huggingface_analyzer  # Hugging Face API
+from modules.http_pool import pool_stats
+from modules.hf_cache import get_hf_cache
+from modules.model_router import get_generation_router
+from modules.local_inference import get_local_backend, warm_up_local_in_background
+from modules.single_flight import get_single_flight
+from modules.compatibility import get_compatibility_engine
 
 
 def _load_env() -> None:
@@ -76,7 +95,11 @@ def err_500(e) -> Any:
 
 @app.post("/api/generate")
 def api_generate() -> Any:
-    """نقطة نهاية عامة لتوليد النصوص (بديل لـ Ollama)"""
+    """
+    نقطة نهاية عامة لتوليد النصوص (بديل لـ Ollama).
+    مع `"stream": true` (أو `?stream=true`) تُرسل الأجزاء فور توليدها كـ NDJSON
+    أو SSE (`Accept: text/event-stream` / `?format=sse`): إطارات `token` ثم `done`.
+    """
     try:
         data = request.get_json()
         if not data or "prompt" not in data:
@@ -86,6 +109,9 @@ def api_generate() -> Any:
         params = data.get("options", {})
         
         analyzer = get_huggingface_analyzer()
+        if data.get("stream") or (request.args.get("stream") or "").lower() == "true":
+            return _generation_stream(analyzer.stream_text(prompt, params))
+
         result = analyzer.generate_text(prompt, params)
         
         return jsonify({
@@ -97,91 +123,565 @@ def api_generate() -> Any:
         return jsonify({"error": True, "message": str(e)}), 500
 
 
-@app.post("/api/transcribe")
-def api_transcribe() -> Any:
+def _validate_audio_upload(file: Any) -> Optional[Tuple[str, int]]:
     """
-    Accept an audio file, run transcription and refinement, and return JSON.
+    Check an uploaded audio file's size and type; returns (message, status) or None.
     """
-    backend_key = os.getenv("BACKEND_API_KEY")
-    if not backend_key:
-        return jsonify({"error": True, "message": "Server configuration error"}), 500
-
-    file = request.files.get("audio")
-    if not file:
-        return jsonify({"error": True, "message": "No audio file provided"}), 400
-
     # Validate size
     max_size = int(os.getenv("MAX_AUDIO_SIZE", str(50 * 1024 * 1024)))
     file.stream.seek(0, 2)  # move to end
     size = file.stream.tell()
     file.stream.seek(0)
     if size > max_size:
-        return jsonify({"error": True, "message": "Audio file too large"}), 413
+        return "Audio file too large", 413
 
     # Validate mimetype/extension
     ctype = file.mimetype or mimetypes.guess_type(file.filename)[0] or ""
     ext = os.path.splitext(file.filename)[1].lower()
     allowed_ext = {".wav", ".mp3", ".m4a", ".aac", ".flac", ".ogg", ".webm"}
     if not (ctype.startswith("audio/") or ext in allowed_ext):
-        return jsonify({"error": True, "message": "Invalid audio file type"}), 415
+        return "Invalid audio file type", 415
+    return None
+
 
-    # Save to temp uploads
+def _read_upload(file: Any) -> AudioSource:
+    """
+    Hold an uploaded file's bytes in memory for a single decode pass.
+    """
+    file.stream.seek(0)
+    return AudioSource.from_bytes(file.stream.read(), name=file.filename)
+
+
+def _save_upload(file: Any) -> str:
+    """
+    Save an uploaded file under uploads/ and return its path.
+    """
     uploads_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads")
     os.makedirs(uploads_dir, exist_ok=True)
     suffix = os.path.splitext(file.filename)[1] or ".wav"
     temp_fd, temp_path = tempfile.mkstemp(suffix=suffix, dir=uploads_dir)
     os.close(temp_fd)
     file.save(temp_path)
+    return temp_path
+
 
+def _form_flag(name: str) -> Optional[bool]:
+    """
+    Read an optional boolean form/query field ("true"/"false"); None when absent.
+    """
+    value = request.form.get(name) or request.args.get(name)
+    if value is None or value == "":
+        return None
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def _transcription_options() -> Dict[str, Any]:
+    """
+    Optional decode controls shared by the transcription endpoints:
+    long_audio (bool), latency_budget (seconds) and quality (fast/balanced/accurate).
+    Raises ValueError on malformed values.
+    """
+    options: Dict[str, Any] = {"long_audio": _form_flag("long_audio")}
+    budget = request.form.get("latency_budget") or request.args.get("latency_budget")
+    if budget:
+        try:
+            options["latency_budget"] = float(budget)
+        except ValueError:
+            raise ValueError("latency_budget must be a number of seconds")
+        if options["latency_budget"] <= 0:
+            raise ValueError("latency_budget must be positive")
+    quality = request.form.get("quality") or request.args.get("quality")
+    if quality:
+        if quality not in QUALITY_TIERS:
+            raise ValueError(f"quality must be one of: {', '.join(QUALITY_TIERS)}")
+        options["quality"] = quality
+    return options
+
+
+def _remove_upload(temp_path: str) -> None:
+    if os.getenv("DELETE_INPUT_FILES", "true").lower() == "true":
+        try:
+            os.remove(temp_path)
+        except Exception as re:
+            LOGGER.warning(f"Failed to remove temp file: {re}")
+
+
+def _refine_transcription(raw: str, metadata: Dict[str, Any], start: float) -> str:
+    """
+    Run the Hugging Face refinement on a raw transcript and enrich `metadata`
+    in place; returns the cleaned transcript.
+    """
+    # استخدام Hugging Face API للتحليل
+    try:
+        analyzer = get_huggingface_analyzer()
+        refinement_result = analyzer.refine_transcript(raw)
+        clean = refinement_result.get("cleaned_text", raw)
+
+        # إضافة معلومات التحليل للـ metadata
+        metadata["sentiment"] = refinement_result.get("sentiment", "neutral")
+        metadata["summary"] = refinement_result.get("summary", "")
+        metadata["key_points"] = refinement_result.get("key_points", [])
+
+    except Exception as hf_error:
+        LOGGER.warning(f"Hugging Face API failed, using basic cleaning: {hf_error}")
+        # نستخدم تنظيف بسيط كبديل
+        clean = raw.strip()
+    processing_time = round(time.time() - start, 3)
+    # metadata enrichment
+    metadata["processing_time"] = processing_time
+    metadata["language"] = metadata.get("language") or os.getenv("TRANSCRIBE_LANGUAGE", "ar")
+    metadata["model"] = metadata.get("model") or f"faster-whisper:{os.getenv('WHISPER_MODEL','medium')}"
+    # duration comes from the decode pass
+    metadata.setdefault("duration", None)
+    return clean
+
+
+def _transcribe_upload(source: AudioSource, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Transcribe + refine an upload into the /api/transcribe response body.
+    """
     start = time.time()
+    result = transcribe_audio(source, **options)
+    raw = result.get("raw_transcript", "")
+    metadata = result.get("metadata", {})
+    clean = _refine_transcription(raw, metadata, start)
+    return {
+        "success": True,
+        "raw_transcript": raw,
+        "clean_transcript": clean,
+        "segments": result.get("segments", []),
+        "metadata": metadata,
+    }
+
+
+@app.post("/api/transcribe")
+def api_transcribe() -> Any:
+    """
+    Accept an audio file, run transcription and refinement, and return JSON.
+    """
+    backend_key = os.getenv("BACKEND_API_KEY")
+    if not backend_key:
+        return jsonify({"error": True, "message": "Server configuration error"}), 500
+
+    file = request.files.get("audio")
+    if not file:
+        return jsonify({"error": True, "message": "No audio file provided"}), 400
+
+    invalid = _validate_audio_upload(file)
+    if invalid:
+        message, status = invalid
+        return jsonify({"error": True, "message": message}), status
     try:
-        result = transcribe_audio(temp_path)
-        raw = result.get("raw_transcript", "")
-        segments = result.get("segments", [])
-        metadata = result.get("metadata", {})
-        
-        # استخدام Hugging Face API للتحليل
-        try:
-            analyzer = get_huggingface_analyzer()
-            refinement_result = analyzer.refine_transcript(raw)
-            clean = refinement_result.get("cleaned_text", raw)
-            
-            # إضافة معلومات التحليل للـ metadata
-            metadata["sentiment"] = refinement_result.get("sentiment", "neutral")
-            metadata["summary"] = refinement_result.get("summary", "")
-            metadata["key_points"] = refinement_result.get("key_points", [])
-            
-        except Exception as hf_error:
-            LOGGER.warning(f"Hugging Face API failed, using basic cleaning: {hf_error}")
-            # نستخدم تنظيف بسيط كبديل
-            clean = raw.strip()
-        processing_time = round(time.time() - start, 3)
-        # metadata enrichment
-        metadata["processing_time"] = processing_time
-        metadata["language"] = metadata.get("language") or os.getenv("TRANSCRIBE_LANGUAGE", "ar")
-        metadata["model"] = metadata.get("model") or f"faster-whisper:{os.getenv('WHISPER_MODEL','medium')}"
-        # duration
-        duration = audio_duration_seconds(temp_path)
-        response = {
-            "success": True,
-            "raw_transcript": raw,
-            "clean_transcript": clean,
-            "segments": segments,
-            "metadata": {
-                **metadata,
-                "duration": duration,
-            },
-        }
-        return jsonify(response)
+        options = _transcription_options()
+    except ValueError as ve:
+        return jsonify({"error": True, "message": str(ve)}), 400
+
+    try:
+        source = _read_upload(file)
+        # Identical uploads (same bytes, same options) in flight at once share one transcription.
+        body = get_single_flight().do(
+            "transcribe", {"audio": source.sha256, **options}, lambda: _transcribe_upload(source, options)
+        )
+        return encoded_response(body)
     except Exception as e:
         LOGGER.error(f"Transcription endpoint error: {e}")
         return jsonify({"success": False, "message": str(e)}), 500
-    finally:
-            if os.getenv("DELETE_INPUT_FILES", "true").lower() == "true":
-                try:
-                    os.remove(temp_path)
-                except Exception as re:
-                    LOGGER.warning(f"Failed to remove temp file: {re}")
+
+
+def _wants_sse() -> bool:
+    fmt = (request.args.get("format") or "").lower()
+    if fmt:
+        return fmt == "sse"
+    return "text/event-stream" in (request.headers.get("Accept") or "")
+
+
+def _stream_frame(event: str, payload: Dict[str, Any], sse: bool) -> str:
+    body = json.dumps({"type": event, **payload}, ensure_ascii=False)
+    if sse:
+        return f"event: {event}\ndata: {body}\n\n"
+    return body + "\n"
+
+
+def _generation_stream(tokens: Iterator[str]) -> Response:
+    sse = _wants_sse()
+
+    def generate() -> Iterator[str]:
+        # When the client disconnects the server closes this generator; closing
+        # `tokens` with it drops the upstream connection and stops the generation.
+        with closing(tokens):
+            texts: List[str] = []
+            try:
+                for text in tokens:
+                    texts.append(text)
+                    yield _stream_frame("token", {"text": text}, sse)
+                yield _stream_frame("done", {"success": True, "response": "".join(texts)}, sse)
+            except Exception as e:
+                LOGGER.error(f"Streaming generation error: {e}")
+                yield _stream_frame("error", {"success": False, "message": str(e), "response": "".join(texts)}, sse)
+
+    mimetype = "text/event-stream" if sse else "application/x-ndjson"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/transcribe/stream")
+def api_transcribe_stream() -> Any:
+    """
+    Like /api/transcribe, but sends each segment as soon as it is decoded
+    (NDJSON, or Server-Sent Events with `Accept: text/event-stream` / `?format=sse`),
+    followed by a final `result` frame carrying the refinement and metadata.
+    """
+    backend_key = os.getenv("BACKEND_API_KEY")
+    if not backend_key:
+        return jsonify({"error": True, "message": "Server configuration error"}), 500
+
+    file = request.files.get("audio")
+    if not file:
+        return jsonify({"error": True, "message": "No audio file provided"}), 400
+
+    invalid = _validate_audio_upload(file)
+    if invalid:
+        message, status = invalid
+        return jsonify({"error": True, "message": message}), status
+
+    try:
+        options = _transcription_options()
+    except ValueError as ve:
+        return jsonify({"error": True, "message": str(ve)}), 400
+
+    source = _read_upload(file)
+    sse = _wants_sse()
+
+    def generate() -> Iterator[str]:
+        start = time.time()
+        try:
+            metadata: Dict[str, Any] = {}
+            texts: List[str] = []
+            segments = iter_segments(source, metadata=metadata, **options)
+            for index, segment in enumerate(segments):
+                texts.append(segment["text"])
+                yield _stream_frame("segment", {"index": index, **segment}, sse)
+            raw = " ".join(" ".join(texts).split()).strip()
+            clean = _refine_transcription(raw, metadata, start)
+            yield _stream_frame("result", {
+                "success": True,
+                "raw_transcript": raw,
+                "clean_transcript": clean,
+                "metadata": metadata,
+            }, sse)
+        except Exception as e:
+            LOGGER.error(f"Streaming transcription error: {e}")
+            yield _stream_frame("error", {"success": False, "message": str(e)}, sse)
+
+    mimetype = "text/event-stream" if sse else "application/x-ndjson"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+_BATCH_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_BATCH_EXECUTOR_LOCK = threading.Lock()
+
+
+def _batch_executor() -> ThreadPoolExecutor:
+    """
+    The pool batch files are transcribed on, shared by all batch requests so
+    TRANSCRIBE_BATCH_CONCURRENCY bounds the decodes in flight per process.
+    """
+    global _BATCH_EXECUTOR
+    if _BATCH_EXECUTOR is None:
+        with _BATCH_EXECUTOR_LOCK:
+            if _BATCH_EXECUTOR is None:
+                _BATCH_EXECUTOR = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("TRANSCRIBE_BATCH_CONCURRENCY", "2")), thread_name_prefix="transcribe-batch"
+                )
+    return _BATCH_EXECUTOR
+
+
+@app.post("/api/transcribe/batch")
+def api_transcribe_batch() -> Any:
+    """
+    Transcribe several `audio` files from one multipart request on the shared
+    model. Each file succeeds or fails on its own; results come back in upload
+    order, or as NDJSON lines in completion order with `?stream=true`.
+    """
+    backend_key = os.getenv("BACKEND_API_KEY")
+    if not backend_key:
+        return jsonify({"error": True, "message": "Server configuration error"}), 500
+
+    files = request.files.getlist("audio")
+    if not files:
+        return jsonify({"error": True, "message": "No audio file provided"}), 400
+    max_files = int(os.getenv("MAX_BATCH_FILES", "20"))
+    if len(files) > max_files:
+        return jsonify({"error": True, "message": f"Too many files (max {max_files})"}), 413
+
+    try:
+        options = _transcription_options()
+    except ValueError as ve:
+        return jsonify({"error": True, "message": str(ve)}), 400
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(files)
+    paths: Dict[int, str] = {}
+    for index, file in enumerate(files):
+        invalid = _validate_audio_upload(file)
+        if invalid is None:
+            # spooled to disk rather than held in memory: a batch can carry MAX_BATCH_FILES uploads
+            try:
+                paths[index] = _save_upload(file)
+            except OSError as e:
+                LOGGER.error(f"Failed to save batch upload ({file.filename}): {e}")
+                invalid = ("Failed to store audio file", 500)
+        if invalid:
+            message, status = invalid
+            results[index] = {"index": index, "filename": file.filename, "success": False,
+                              "message": message, "status": status}
+
+    def run_one(index: int) -> Dict[str, Any]:
+        try:
+            body = _transcribe_upload(AudioSource(path=paths[index], name=files[index].filename), options)
+        except Exception as e:
+            LOGGER.error(f"Batch transcription error ({files[index].filename}): {e}")
+            body = {"success": False, "message": str(e), "status": 500}
+        finally:
+            _remove_upload(paths[index])
+        return {"index": index, "filename": files[index].filename, **body}
+
+    futures = [_batch_executor().submit(run_one, index) for index in paths]
+
+    if _form_flag("stream"):
+        def generate() -> Iterator[bytes]:
+            for result in results:
+                if result is not None:
+                    yield dumps_json(result) + b"\n"
+            for future in as_completed(futures):
+                yield dumps_json(future.result()) + b"\n"
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype="application/x-ndjson",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    for future in futures:
+        result = future.result()
+        results[result["index"]] = result
+    failed = sum(1 for r in results if not (r and r.get("success")))
+    return encoded_response({
+        "success": failed < len(results),
+        "total": len(results),
+        "failed": failed,
+        "results": results,
+    })
+
+
+def _run_transcription_job(audio_path: str, options: Dict[str, Any],
+                           report_progress: Callable[[float], None]) -> Dict[str, Any]:
+    """
+    Job runner: the same transcription + refinement as /api/transcribe, reporting
+    progress as the fraction of the audio decoded so far.
+    """
+    start = time.time()
+    metadata: Dict[str, Any] = {}
+    segments = SegmentTable()
+    for segment in iter_segments(audio_path, metadata=metadata, **options):
+        segments.append(segment["start"], segment["end"], segment["text"])
+        # iter_segments fills in the duration before the first segment arrives
+        if metadata.get("duration"):
+            report_progress(segment["end"] / metadata["duration"])
+    raw = segments.raw_text()
+    clean = _refine_transcription(raw, metadata, start)
+    return {
+        "success": True,
+        "raw_transcript": raw,
+        "clean_transcript": clean,
+        # stored column-wise; expanded again when the result is served
+        "segments": segments.to_columnar(),
+        "metadata": metadata,
+    }
+
+
+job_queue = TranscriptionJobQueue(_run_transcription_job)
+# Jobs waiting in the queue count as load when picking a model for a latency budget.
+get_model_selector().register_queue_depth(job_queue.waiting)
+
+_STARTED = False
+_START_LOCK = threading.Lock()
+
+
+def start_background_services() -> None:
+    """
+    Probe the whisper backends, start the model warm-ups and resume interrupted
+    jobs, once per serving process. Called from run(), the gunicorn post_fork
+    hook (gunicorn.conf.py) and the ASGI lifespan rather than on import, so the
+    Flask reloader's watcher process and the long-audio spawn workers (which
+    re-import __main__) neither load models nor claim queued jobs.
+    """
+    global _STARTED
+    with _START_LOCK:
+        if _STARTED:
+            return
+        _STARTED = True
+    # Probe the whisper backends once; broken ones are skipped until their cool-down ends.
+    get_backend_health().probe_all()
+    # Load the models listed in WHISPER_WARMUP_MODELS before the first transcription.
+    warm_up_in_background()
+    # Load the local CPU models of analysis tasks routed to HF_BACKEND_<TASK>=local.
+    warm_up_local_in_background()
+    # Pick up jobs that were queued or running when the previous process died.
+    job_queue.recover()
+
+
+def _job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "filename": job["filename"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    }
+
+
+@app.post("/api/transcribe/jobs")
+def api_transcribe_job_submit() -> Any:
+    """
+    Queue an audio file for background transcription and return its job id immediately.
+    """
+    backend_key = os.getenv("BACKEND_API_KEY")
+    if not backend_key:
+        return jsonify({"error": True, "message": "Server configuration error"}), 500
+
+    file = request.files.get("audio")
+    if not file:
+        return jsonify({"error": True, "message": "No audio file provided"}), 400
+
+    invalid = _validate_audio_upload(file)
+    if invalid:
+        message, status = invalid
+        return jsonify({"error": True, "message": message}), status
+
+    try:
+        options = _transcription_options()
+    except ValueError as ve:
+        return jsonify({"error": True, "message": str(ve)}), 400
+
+    temp_path = _save_upload(file)
+    try:
+        job_id = job_queue.submit(temp_path, file.filename, options)
+    except JobQueueFull as e:
+        _remove_upload(temp_path)
+        return jsonify({"error": True, "message": str(e)}), 503
+
+    return jsonify({
+        "success": True,
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/api/transcribe/jobs/{job_id}",
+        "result_url": f"/api/transcribe/jobs/{job_id}/result",
+    }), 202
+
+
+@app.get("/api/transcribe/jobs/<job_id>")
+def api_transcribe_job_status(job_id: str) -> Any:
+    """
+    Poll a transcription job's status and progress (0..1).
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": True, "message": "Job not found"}), 404
+    return jsonify({"success": True, **_job_status(job)})
+
+
+@app.get("/api/transcribe/jobs/<job_id>/result")
+def api_transcribe_job_result(job_id: str) -> Any:
+    """
+    Fetch a finished job's transcription; 202 while it is still queued or running.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": True, "message": "Job not found"}), 404
+    if job["status"] == "done":
+        result = dict(job["result"])
+        result["segments"] = SegmentTable.from_columnar(result.get("segments") or {})
+        return encoded_response(result)
+    if job["status"] == "failed":
+        return jsonify({"success": False, "message": job["error"], **_job_status(job)}), 500
+    return jsonify({"success": False, **_job_status(job)}), 202
+
+
+@app.get("/api/transcribe/stats")
+def api_transcribe_stats() -> Any:
+    """
+    Report transcription state: resident whisper models, job queue, backend health, transcript cache
+    counters and coalesced identical uploads.
+    """
+    cache = get_transcript_cache()
+    return jsonify({
+        "success": True,
+        "models": get_model_registry().stats(),
+        "profile": active_profile(),
+        "jobs": job_queue.stats(),
+        "selector": get_model_selector().stats(),
+        "backends": get_backend_health().status(),
+        "transcript_cache": cache.stats() if cache is not None else None,
+        "single_flight": get_single_flight().stats("transcribe"),
+    })
+
+
+@app.get("/api/transcribe/backends")
+def api_transcribe_backends() -> Any:
+    """
+    Circuit-breaker state of each whisper backend.
+    """
+    return jsonify({"success": True, **get_backend_health().status()})
+
+
+@app.post("/api/transcribe/backends/reset")
+def api_transcribe_backends_reset() -> Any:
+    """
+    Close the circuit of one backend (JSON {"backend": ...}) or all of them, and probe again.
+    """
+    data = request.get_json(silent=True) or {}
+    backend = data.get("backend")
+    health = get_backend_health()
+    if backend is not None and backend not in health.status()["backends"]:
+        return jsonify({"error": True, "message": f"Unknown backend: {backend}"}), 400
+    health.reset(backend)
+    if backend:
+        health.probe(backend)
+    else:
+        health.probe_all()
+    return jsonify({"success": True, **health.status()})
+
+
+@app.get("/api/analyzer/stats")
+def api_analyzer_stats() -> Any:
+    """
+    Hugging Face connection pool usage (requests, in-flight peak, per-host connections),
+    response cache hit/miss counters, per-model generation routing health,
+    local CPU inference usage, coalescing of identical in-flight analysis requests
+    and the CV/job compatibility engine's embedding caches.
+    """
+    cache = get_hf_cache()
+    return jsonify({
+        "success": True,
+        "http_pool": pool_stats(),
+        "cache": cache.stats() if cache is not None else None,
+        "generation_router": get_generation_router().stats(),
+        "local_inference": get_local_backend().stats(),
+        "compatibility": get_compatibility_engine().stats(),
+        "single_flight": get_single_flight().stats(
+            "analyze-question", "analyze-questions", "analyze-cv", "analyze-job", "comprehensive-analysis"
+        ),
+    })
 
 
 @app.post("/api/analyze-question")
@@ -193,7 +693,7 @@ def api_analyze_question() -> Any:
             return jsonify({"error": True, "message": "No question provided"}), 400
         
         analyzer = get_huggingface_analyzer()
-        result = analyzer.analyze_question(data["question"])
+        result = get_single_flight().do("analyze-question", data["question"], lambda: analyzer.analyze_question(data["question"]))
         
         return jsonify({
             "success": True,
@@ -205,6 +705,42 @@ def api_analyze_question() -> Any:
         return jsonify({"error": True, "message": str(e)}), 500
 
 
+def validate_question_list(data: Any) -> Tuple[Optional[List[str]], Optional[str]]:
+    """
+    Validate {"questions": [...]}; returns (questions, None) or (None, error message).
+    """
+    questions = data.get("questions") if isinstance(data, dict) else None
+    if not isinstance(questions, list) or not questions:
+        return None, "No questions provided"
+    if not all(isinstance(q, str) and q.strip() for q in questions):
+        return None, "Every question must be a non-empty string"
+    max_questions = int(os.getenv("HF_QUESTION_BATCH_MAX", "100"))
+    if len(questions) > max_questions:
+        return None, f"At most {max_questions} questions per request"
+    return questions, None
+
+
+@app.post("/api/analyze-questions")
+def api_analyze_questions() -> Any:
+    """تحليل نوع مجموعة أسئلة (نموذج وظيفة كامل) في طلب واحد"""
+    try:
+        questions, error = validate_question_list(request.get_json(silent=True))
+        if error:
+            return jsonify({"error": True, "message": error}), 400
+        
+        analyzer = get_huggingface_analyzer()
+        results = get_single_flight().do("analyze-questions", questions, lambda: analyzer.analyze_questions(questions))
+        
+        return jsonify({
+            "success": True,
+            "analyses": results
+        })
+        
+    except Exception as e:
+        LOGGER.error(f"Questions analysis error: {e}")
+        return jsonify({"error": True, "message": str(e)}), 500
+
+
 @app.post("/api/analyze-cv")
 def api_analyze_cv() -> Any:
     """تحليل السيرة الذاتية"""
@@ -214,7 +750,7 @@ def api_analyze_cv() -> Any:
             return jsonify({"error": True, "message": "No CV text provided"}), 400
         
         analyzer = get_huggingface_analyzer()
-        result = analyzer.analyze_cv_text(data["cv_text"])
+        result = get_single_flight().do("analyze-cv", data["cv_text"], lambda: analyzer.analyze_cv_text(data["cv_text"]))
         
         return jsonify({
             "success": True,
@@ -235,7 +771,7 @@ def api_analyze_job() -> Any:
             return jsonify({"error": True, "message": "No job description provided"}), 400
         
         analyzer = get_huggingface_analyzer()
-        result = analyzer.analyze_job_description(data["job_description"])
+        result = get_single_flight().do("analyze-job", data["job_description"], lambda: analyzer.analyze_job_description(data["job_description"]))
         
         return jsonify({
             "success": True,
@@ -247,6 +783,57 @@ def api_analyze_job() -> Any:
         return jsonify({"error": True, "message": str(e)}), 500
 
 
+def _logged(message: str, task: Callable[[], Dict[str, Any]]) -> Callable[[], Dict[str, Any]]:
+    """
+    `task`, logging `message` when it actually starts running.
+    """
+    def run() -> Dict[str, Any]:
+        LOGGER.info(message)
+        return task()
+    return run
+
+
+def _comprehensive_analysis(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The /api/comprehensive-analysis response body for a request payload.
+    """
+    analyzer = get_huggingface_analyzer()
+    
+    # تحليل كل عنصر (بالتوازي، كل تحليل مستقل عن الآخر)
+    tasks: Dict[str, Callable[[], Dict[str, Any]]] = {}
+    
+    if "cv_text" in data:
+        tasks["cv"] = _logged("Analyzing CV text...", lambda: analyzer.analyze_cv_text(data["cv_text"]))
+    
+    if "job_description" in data:
+        tasks["job"] = _logged("Analyzing job description...", lambda: analyzer.analyze_job_description(data["job_description"]))
+    
+    if "transcript" in data:
+        tasks["transcript"] = _logged("Refining transcript...", lambda: analyzer.refine_transcript(data["transcript"]))
+    
+    results = analyzer.run_concurrently(tasks)
+    cv_analysis = results.get("cv", {})
+    job_analysis = results.get("job", {})
+    transcript_analysis = results.get("transcript", {})
+    
+    # الربط والمقارنة
+    compatibility_score = 0
+    if cv_analysis and job_analysis:
+        compatibility_score = calculate_compatibility(cv_analysis, job_analysis)
+    
+    LOGGER.info("Analysis complete, sending response")
+    return {
+        "success": True,
+        "comprehensive_analysis": {
+            "cv_analysis": cv_analysis,
+            "job_analysis": job_analysis,
+            "transcript_analysis": transcript_analysis,
+            "compatibility_score": compatibility_score,
+            "recommendations": generate_recommendations(cv_analysis, job_analysis, transcript_analysis)
+        }
+    }
+
+
 @app.post("/api/comprehensive-analysis")
 def api_comprehensive_analysis() -> Any:
     """التحليل الشامل (الربط بين كل العناصر)"""
@@ -264,41 +851,8 @@ def api_comprehensive_analysis() -> Any:
         if "job_description" in data:
             LOGGER.info(f"Job description present: {data['job_description'].keys()}")
 
-        analyzer = get_huggingface_analyzer()
-        
-        # تحليل كل عنصر
-        cv_analysis = {}
-        job_analysis = {}
-        transcript_analysis = {}
-        
-        if "cv_text" in data:
-            LOGGER.info("Analyzing CV text...")
-            cv_analysis = analyzer.analyze_cv_text(data["cv_text"])
-        
-        if "job_description" in data:
-            LOGGER.info("Analyzing job description...")
-            job_analysis = analyzer.analyze_job_description(data["job_description"])
-        
-        if "transcript" in data:
-            LOGGER.info("Refining transcript...")
-            transcript_analysis = analyzer.refine_transcript(data["transcript"])
-        
-        # الربط والمقارنة
-        compatibility_score = 0
-        if cv_analysis and job_analysis:
-            compatibility_score = calculate_compatibility(cv_analysis, job_analysis)
-        
-        LOGGER.info("Analysis complete, sending response")
-        return jsonify({
-            "success": True,
-            "comprehensive_analysis": {
-                "cv_analysis": cv_analysis,
-                "job_analysis": job_analysis,
-                "transcript_analysis": transcript_analysis,
-                "compatibility_score": compatibility_score,
-                "recommendations": generate_recommendations(cv_analysis, job_analysis, transcript_analysis)
-            }
-        })
+        # نفس الطلب من عدة مستخدمين في نفس اللحظة => حساب واحد مشترك
+        return jsonify(get_single_flight().do("comprehensive-analysis", data, lambda: _comprehensive_analysis(data)))
         
     except Exception as e:
         LOGGER.error(f"Comprehensive analysis error: {e}")
@@ -306,18 +860,15 @@ def api_comprehensive_analysis() -> Any:
 
 
 def calculate_compatibility(cv_analysis: Dict, job_analysis: Dict) -> float:
-    """حساب نسبة التوافق بين السيرة الذاتية والوظيفة"""
-    score = 0.0
-    
-    if cv_analysis.get("skills") and job_analysis.get("requirements"):
-        cv_skills = set(cv_analysis["skills"].keys())
-        job_reqs = set(job_analysis["requirements"].keys())
-        
-        if job_reqs:
-            matching = len(cv_skills.intersection(job_reqs))
-            score = (matching / len(job_reqs)) * 100
-    
-    return round(score, 2)
+    """
+    حساب نسبة التوافق بين السيرة الذاتية والوظيفة (0-100): تشابه الـ embeddings
+    بين عبارات المهارات وعبارات المتطلبات، وليس تقاطع تصنيفات zero-shot المختلفة.
+    """
+    skills = cv_analysis.get("skill_phrases") or []
+    requirements = job_analysis.get("requirement_phrases") or []
+    if not skills or not requirements:
+        return 0.0
+    return get_compatibility_engine().score(skills, requirements)
 
 
 def generate_recommendations(cv_analysis: Dict, job_analysis: Dict, transcript_analysis: Dict) -> List[str]:
@@ -375,6 +926,9 @@ def run() -> None:
     """
     port = int(os.environ.get('PORT', 5002))
     debug = os.getenv("FLASK_ENV", "development") == "development"
+    # with the debug reloader only the child process (WERKZEUG_RUN_MAIN) serves requests
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_services()
     app.run(host="0.0.0.0", port=port, debug=debug)
 
 
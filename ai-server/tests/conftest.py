@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The tests import the server's modules package the way server.py does.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+from modules import backend_health
+from modules.backend_health import CLOSED, HALF_OPEN, OPEN, BackendHealth
+
+
+def _missing():
+    raise ImportError("not installed")
+
+
+@pytest.fixture
+def health(monkeypatch):
+    monkeypatch.setitem(backend_health._PROBES, "faster-whisper", lambda: None)
+    monkeypatch.setitem(backend_health._PROBES, "whisper", _missing)
+    return BackendHealth(failure_threshold=2, cooldown_seconds=0.05)
+
+
+def _state(health, backend, model):
+    return health.status()["backends"][backend]["models"][model]["state"]
+
+
+def test_failed_import_skips_backend(health):
+    assert health.available("small") == ["faster-whisper"]
+    assert health.installed()
+    status = health.status()["backends"]["whisper"]
+    assert status["installed"] is False and "not installed" in status["import_error"]
+
+
+def test_threshold_opens_only_that_model(health):
+    health.record_failure("faster-whisper", "large", MemoryError("oom"))
+    assert health.allow("faster-whisper", "large")
+    health.record_failure("faster-whisper", "large", MemoryError("oom"))
+
+    assert _state(health, "faster-whisper", "large") == OPEN
+    assert not health.allow("faster-whisper", "large")
+    assert not health.healthy("faster-whisper", "large")
+    assert health.allow("faster-whisper", "small")
+    assert health.healthy("faster-whisper")
+
+
+def test_success_resets_consecutive_failures(health):
+    health.record_failure("faster-whisper", "base", RuntimeError("x"))
+    health.record_success("faster-whisper", "base")
+    health.record_failure("faster-whisper", "base", RuntimeError("x"))
+    assert _state(health, "faster-whisper", "base") == CLOSED
+
+
+def test_half_open_hands_out_one_trial(health):
+    for _ in range(2):
+        health.record_failure("faster-whisper", "large", RuntimeError("x"))
+    time.sleep(0.06)
+
+    assert health.allow("faster-whisper", "large")
+    assert _state(health, "faster-whisper", "large") == HALF_OPEN
+    assert not health.allow("faster-whisper", "large")
+
+    health.record_failure("faster-whisper", "large", RuntimeError("still broken"))
+    assert _state(health, "faster-whisper", "large") == OPEN
+
+    time.sleep(0.06)
+    assert health.allow("faster-whisper", "large")
+    health.record_success("faster-whisper", "large")
+    assert _state(health, "faster-whisper", "large") == CLOSED
+
+
+def test_reset_forgets_circuits(health):
+    for _ in range(2):
+        health.record_failure("faster-whisper", "large", RuntimeError("x"))
+    health.reset("faster-whisper")
+    assert health.status()["backends"]["faster-whisper"] == {"installed": None, "import_error": None, "models": {}}
+    assert health.allow("faster-whisper", "large")
@@ -0,0 +1,77 @@
+import io
+import json
+import os
+
+import pytest
+
+import server
+
+HEADERS = {"X-API-Key": "test-key"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("BACKEND_API_KEY", "test-key")
+    monkeypatch.setenv("DELETE_INPUT_FILES", "true")
+    transcribed = []
+
+    def transcribe_audio(source, **options):
+        # uploads reach the transcriber as spooled files, not in-memory bytes
+        assert source.data is None and os.path.exists(source.path)
+        transcribed.append(source.path)
+        with open(source.path, "rb") as fh:
+            content = fh.read()
+        if content == b"corrupt":
+            raise RuntimeError("could not decode audio")
+        return {"raw_transcript": content.decode(), "segments": [], "metadata": {}}
+
+    monkeypatch.setattr(server, "transcribe_audio", transcribe_audio)
+    monkeypatch.setattr(server, "_refine_transcription", lambda raw, metadata, start: raw.upper())
+    client = server.app.test_client()
+    client.transcribed = transcribed
+    return client
+
+
+def _post(client, query=""):
+    files = [
+        (io.BytesIO(b"hello"), "a.wav"),
+        (io.BytesIO(b"notes"), "b.txt"),
+        (io.BytesIO(b"corrupt"), "c.wav"),
+        (io.BytesIO(b"world"), "d.mp3"),
+    ]
+    return client.post("/api/transcribe/batch" + query, headers=HEADERS, data={"audio": files},
+                       content_type="multipart/form-data")
+
+
+def test_batch_reports_each_file_on_its_own(client):
+    response = _post(client)
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body["success"], body["total"], body["failed"]) == (True, 4, 2)
+    ok_a, bad_type, broken, ok_d = body["results"]
+    assert [r["filename"] for r in body["results"]] == ["a.wav", "b.txt", "c.wav", "d.mp3"]
+    assert (ok_a["success"], ok_a["clean_transcript"]) == (True, "HELLO")
+    assert (ok_d["success"], ok_d["clean_transcript"]) == (True, "WORLD")
+    assert (bad_type["success"], bad_type["status"]) == (False, 415)
+    assert (broken["success"], broken["status"], broken["message"]) == (False, 500, "could not decode audio")
+
+    # every spooled upload is removed once transcribed, failed or not
+    assert len(client.transcribed) == 3
+    assert not any(os.path.exists(path) for path in client.transcribed)
+
+
+def test_streamed_batch_has_one_line_per_file(client):
+    response = _post(client, "?stream=true")
+
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    by_index = {line["index"]: line for line in lines}
+    assert sorted(by_index) == [0, 1, 2, 3]
+    assert [by_index[i]["success"] for i in range(4)] == [True, False, False, True]
+
+
+def test_too_many_files_is_rejected(client, monkeypatch):
+    monkeypatch.setenv("MAX_BATCH_FILES", "3")
+    assert _post(client).status_code == 413
+    assert client.transcribed == []
@@ -0,0 +1,128 @@
+import pytest
+
+from modules.chunking import (
+    SENTIMENT, SUMMARY, ZERO_SHOT, ChunkPlan, chunk_text, estimate_tokens, merge_sentiment, merge_zero_shot,
+    split_sentences,
+)
+
+MNLI = "facebook/bart-large-mnli"
+CNN = "facebook/bart-large-cnn"
+KINDS = {MNLI: ZERO_SHOT, CNN: SUMMARY}
+
+
+def _long_text(sentences=400):
+    return " ".join(f"Sentence {i} is about Python and teamwork." for i in range(sentences))
+
+
+def _kind_of(model_name, payload):
+    return KINDS.get(model_name)
+
+
+def _run(plan, answer):
+    """Drive a plan to completion; returns the batches it sent."""
+    batches = []
+    pending = plan.calls
+    while pending:
+        batches.append(dict(pending))
+        pending = plan.reduce({key: answer(key, model, payload) for key, (model, payload) in pending.items()})
+    return batches
+
+
+def test_split_and_pack_sentences():
+    assert split_sentences("One. Two?\nThree!  ") == ["One.", "Two?", "Three!"]
+    chunks = chunk_text(_long_text(50), 60)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 60 for chunk in chunks)
+    assert " ".join(chunks) == _long_text(50)
+
+
+def test_overlong_sentence_is_split_on_words():
+    sentence = " ".join(["word"] * 300)
+    chunks = chunk_text(sentence, 50)
+    assert all(estimate_tokens(chunk) <= 50 for chunk in chunks)
+    assert sum(len(chunk.split()) for chunk in chunks) == 300
+
+
+def test_arabic_counts_per_character():
+    assert estimate_tokens("مرحبا") == 6
+    assert estimate_tokens("hello world again") == 4
+
+
+def test_merges_weight_by_chunk_size():
+    merged = merge_zero_shot(
+        [{"labels": ["a", "b"], "scores": [0.9, 0.1]}, {"labels": ["b", "a"], "scores": [0.6, 0.4]}, None],
+        [3.0, 1.0, 5.0],
+    )
+    assert merged["labels"] == ["a", "b"]
+    assert abs(merged["scores"][0] - (0.9 * 3 + 0.4) / 4) < 1e-9
+    assert merge_zero_shot([None], [1.0]) is None
+
+    sentiment = merge_sentiment([[[{"label": "pos", "score": 1.0}]], [{"label": "pos", "score": 0.0}]], [1.0, 1.0])
+    assert sentiment == [[{"label": "pos", "score": 0.5}]]
+
+
+def test_short_and_unknown_calls_pass_through():
+    calls = {"short": (MNLI, {"inputs": "Hi."}), "other": ("gpt2", {"inputs": _long_text()})}
+    plan = ChunkPlan(calls, _kind_of)
+    assert plan.calls == calls
+    assert plan.reduce({"short": "r1", "other": "r2"}) == {}
+    assert plan.results == {"short": "r1", "other": "r2"}
+
+
+def test_every_chunk_is_reduced_in_waves():
+    text = _long_text()
+    total = len(chunk_text(text, 900))
+    assert total > 3
+    payload = {"inputs": text, "parameters": {"candidate_labels": ["a", "b"]}}
+    plan = ChunkPlan({"topic": (MNLI, payload)}, _kind_of, max_chunks=3)
+
+    batches = _run(plan, lambda key, model, p: {"labels": ["a", "b"], "scores": [0.75, 0.25]})
+
+    assert [len(batch) for batch in batches][:-1] == [3] * (len(batches) - 1)
+    sent = [p["inputs"] for batch in batches for _, p in batch.values()]
+    assert len(sent) == total and " ".join(sent) == text
+    assert all(p["parameters"] == payload["parameters"] for batch in batches for _, p in batch.values())
+    assert plan.results["topic"] == {"labels": ["a", "b"], "scores": [0.75, 0.25]}
+
+
+def test_summaries_are_summarized_again():
+    plan = ChunkPlan({"summary": (CNN, {"inputs": _long_text(), "parameters": {"max_length": 60}})}, _kind_of)
+
+    def answer(key, model, payload):
+        # chunk calls are "summary#<round>.<i>"; the short second round passes through as "summary"
+        return [{"summary_text": f"S{key.rsplit('.', 1)[-1]}." if "#" in key else "Final."}]
+
+    batches = _run(plan, answer)
+
+    assert len(batches) == 2
+    assert len(batches[1]) == 1
+    (_, second), = batches[1].values()
+    assert second["inputs"].startswith("S0. S1.")
+    assert plan.results["summary"] == [{"summary_text": "Final."}]
+
+
+def test_summary_lengths_fit_each_chunk():
+    params = {"max_length": 1000, "min_length": 400, "do_sample": False}
+    plan = ChunkPlan({"summary": (CNN, {"inputs": _long_text(150), "parameters": params})}, _kind_of)
+
+    chunks = [payload for _, payload in plan.calls.values()]
+    sizes = [estimate_tokens(payload["inputs"]) for payload in chunks]
+    assert len(chunks) == 2 and sizes[0] > 800 > sizes[1] > 400
+    assert chunks[0]["parameters"] == {"max_length": sizes[0], "min_length": 400, "do_sample": False}
+    # too short for the requested minimum: only the cap applies
+    assert chunks[1]["parameters"] == {"max_length": sizes[1], "do_sample": False}
+    assert params == {"max_length": 1000, "min_length": 400, "do_sample": False}
+
+
+def test_unsplit_summary_keeps_its_lengths():
+    payload = {"inputs": "A short answer.", "parameters": {"max_length": 150, "min_length": 50}}
+    plan = ChunkPlan({"summary": (CNN, payload)}, _kind_of)
+    assert plan.calls == {"summary": (CNN, payload)}
+
+
+def test_failed_chunks_are_skipped_in_the_merge():
+    plan = ChunkPlan({"mood": ("cardiffnlp/twitter-roberta-base-sentiment-latest", {"inputs": _long_text()})},
+                     lambda model, payload: SENTIMENT)
+    _run(plan, lambda key, model, p: None if key.endswith(".0") else [[{"label": "positive", "score": 0.8}]])
+    (entry,), = plan.results["mood"]
+    assert entry["label"] == "positive" and entry["score"] == pytest.approx(0.8)
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from modules.compatibility import CompatibilityEngine, extract_phrases, phrase_match_score
+
+CV = """Jane Doe
+Berlin, Germany
+jane.doe@example.com | +49 170 1234567 | linkedin.com/in/janedoe
+
+Summary
+Backend engineer with 7 years of experience.
+
+Skills
+Python, Django; Docker
+
+Experience
+Built REST APIs in Flask.
+"""
+
+
+def test_extract_phrases_drops_header_contacts_and_labels():
+    phrases = extract_phrases(CV)
+    assert phrases[:3] == ["Python", "Django", "Docker"]
+    assert "Backend engineer with 7 years of experience" in phrases
+    assert "Built REST APIs in Flask" in phrases
+    joined = " ".join(phrases)
+    for noise in ("Jane", "Berlin", "example.com", "1234567", "linkedin", "Summary", "Skills", "Experience"):
+        assert noise not in joined
+
+
+def test_extract_phrases_known_first_dedup_and_limit():
+    phrases = extract_phrases("Python and SQL. Docker, python", known=["sql", "kubernetes"])
+    assert phrases == ["sql", "kubernetes", "Python and SQL", "Docker", "python"]
+    assert extract_phrases("a1, b2, c3, d4", limit=2) == ["a1", "b2"]
+    assert extract_phrases(["Go", "go", " Rust "]) == ["Go", "Rust"]
+
+
+def test_text_without_headings_is_all_body():
+    assert extract_phrases("Alice\nPython developer") == ["Alice", "Python developer"]
+
+
+def test_one_line_skill_label():
+    assert extract_phrases("Intro line\nSkills: Go, Rust\nShipped things") == ["Go", "Rust", "Shipped things"]
+
+
+# Orthogonal "concepts": phrases that share a concept embed to the same direction.
+_CONCEPTS = {"python": 0, "django": 0, "docker": 1, "kubernetes": 2, "sql": 3}
+
+
+def _fake_embed(calls):
+    def embed(texts):
+        calls.append(list(texts))
+        vectors = []
+        for text in texts:
+            vector = np.zeros(4)
+            vector[_CONCEPTS[text.lower()]] = 2.0
+            vectors.append(vector.tolist())
+        return vectors
+    return embed
+
+
+def test_score_is_mean_best_match_above_the_floor(monkeypatch):
+    monkeypatch.setenv("HF_COMPAT_SIMILARITY_FLOOR", "0.3")
+    engine = CompatibilityEngine(_fake_embed([]))
+    assert engine.score(["Django", "Docker"], ["python", "docker", "kubernetes", "sql"]) == 50.0
+    assert engine.score([], ["python"]) == 0.0
+    assert engine.score(["python"], []) == 0.0
+
+
+def test_vectors_and_job_matrices_are_cached():
+    calls = []
+    engine = CompatibilityEngine(_fake_embed(calls))
+    requirements = ["python", "docker"]
+    engine.score(["python"], requirements)
+    engine.score(["python", "sql"], requirements)
+
+    assert calls == [["python", "docker"], ["sql"]]
+    stats = engine.stats()
+    assert (stats["job_builds"], stats["job_hits"], stats["embedded"]) == (1, 1, 3)
+
+
+def test_score_candidates_in_one_product():
+    engine = CompatibilityEngine(_fake_embed([]))
+    scores = engine.score_candidates(
+        [["python"], [], ["docker", "kubernetes"], ["sql", "python", "docker", "kubernetes"]],
+        ["python", "docker", "kubernetes", "sql"],
+    )
+    assert scores == [25.0, 0.0, 50.0, 100.0]
+
+
+def test_falls_back_to_phrase_matching_when_embedding_fails():
+    def broken(texts):
+        raise RuntimeError("embedding model down")
+
+    engine = CompatibilityEngine(broken)
+    assert engine.score(["Python", "Docker Compose"], ["python", "docker", "kubernetes"]) == pytest.approx(66.67)
+    assert engine.stats()["fallbacks"] == 1
+    assert phrase_match_score(["python"], []) == 0.0
+
+
+def test_missing_vector_counts_as_failure():
+    engine = CompatibilityEngine(lambda texts: [None for _ in texts])
+    assert engine.score(["python"], ["python"]) == 100.0
+    assert engine.stats()["fallbacks"] == 1
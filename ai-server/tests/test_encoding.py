@@ -0,0 +1,67 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask
+
+from modules import encoding
+from modules.encoding import COLUMNAR_JSON, JSON, MSGPACK, dumps_json, encode_body, encoded_response
+from modules.segments import SegmentTable
+
+
+def _table():
+    table = SegmentTable()
+    table.append(0.0, 1.5, "مرحبا")
+    table.append(1.5, 3.0, "hello")
+    return table
+
+
+def test_json_rows_and_columns():
+    payload = {"segments": _table(), 1: "int key"}
+    assert json.loads(dumps_json(payload)) == {
+        "segments": [{"start": 0.0, "end": 1.5, "text": "مرحبا"}, {"start": 1.5, "end": 3.0, "text": "hello"}],
+        "1": "int key",
+    }
+    assert json.loads(dumps_json(payload, columnar=True))["segments"] == {
+        "start": [0.0, 1.5], "end": [1.5, 3.0], "text": ["مرحبا", "hello"],
+    }
+
+
+def test_stdlib_fallback_matches_orjson(monkeypatch):
+    payload = {"segments": _table(), "n": 3}
+    fast = dumps_json(payload)
+    monkeypatch.setattr(encoding, "_ORJSON", None)
+    assert json.loads(dumps_json(payload)) == json.loads(fast)
+
+
+def test_negotiation():
+    payload = {"segments": _table()}
+    assert encode_body(payload, "")[1] == JSON
+    body, mimetype = encode_body(payload, f"{COLUMNAR_JSON}, application/json")
+    assert mimetype == COLUMNAR_JSON and json.loads(body)["segments"]["text"] == ["مرحبا", "hello"]
+
+
+def test_msgpack_is_columnar():
+    msgpack = pytest.importorskip("msgpack")
+    body, mimetype = encode_body({"segments": _table()}, "application/x-msgpack")
+    assert mimetype == MSGPACK
+    assert msgpack.unpackb(body)["segments"]["end"] == [1.5, 3.0]
+
+
+def test_gzip_only_large_bodies_when_accepted(monkeypatch):
+    monkeypatch.setenv("RESPONSE_GZIP_MIN_BYTES", "100")
+    app = Flask(__name__)
+    big = {"text": "word " * 200}
+
+    with app.test_request_context(headers={"Accept-Encoding": "gzip, br"}):
+        response = encoded_response(big, status=201)
+        assert response.status_code == 201
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert json.loads(gzip.decompress(response.get_data())) == big
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert "Content-Encoding" not in encoded_response({"ok": True}).headers
+
+    with app.test_request_context():
+        response = encoded_response(big)
+        assert "Content-Encoding" not in response.headers
+        assert response.mimetype == JSON
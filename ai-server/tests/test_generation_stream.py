@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from modules.generation_stream import (
+    InstStripper, StreamError, is_event_stream, parse_stream_line, parse_whole_response,
+)
+from modules.huggingface_analyzer import HuggingFaceAnalyzer
+
+
+def _stream(pieces):
+    stripper = InstStripper()
+    out = [stripper.feed(piece) for piece in pieces]
+    return "".join(out) + stripper.flush(), out
+
+
+def _pieces(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_echoed_prompt_matches_the_non_streaming_cleanup(size):
+    generated = "<s>[INST] Summarize the CV [/INST]  The candidate knows Python.\nStrong fit"
+    text, out = _stream(_pieces(generated, size))
+    assert text == HuggingFaceAnalyzer._parse_generation([{"generated_text": generated}])
+    if size < len(generated):
+        # released as it arrives, not all at the end
+        assert sum(1 for piece in out if piece) > 1
+
+
+def test_plain_output_is_released_immediately():
+    stripper = InstStripper()
+    assert stripper.feed("  Hello") == "Hello"
+    assert stripper.feed(" world") == " world"
+    assert stripper.flush() == ""
+
+
+def test_marker_split_across_tokens_is_dropped():
+    text, out = _stream(["Hello [/IN", "ST]", " world"])
+    assert text == "Hello  world"
+    assert "[/IN" not in "".join(out)
+
+
+def test_partial_marker_is_held_until_flush():
+    stripper = InstStripper()
+    assert stripper.feed("price [/I") == "price "
+    assert stripper.flush() == "[/I"
+
+
+def test_unclosed_echo_is_flushed():
+    text, out = _stream(["<s>[INST] only", " a prompt"])
+    assert out == ["", ""]
+    assert text == "<s>[INST] only a prompt"
+
+
+def _event(payload):
+    return b"data: " + json.dumps(payload).encode("utf-8") + b"\n"
+
+
+def test_parse_stream_line():
+    assert parse_stream_line(_event({"token": {"text": "Hi", "special": False}})) == "Hi"
+    assert parse_stream_line(_event({"token": {"text": "</s>", "special": True}})) == ""
+    assert parse_stream_line(b"data: [DONE]") == ""
+    assert parse_stream_line(b": keep-alive") is None
+    assert parse_stream_line(b"event: message") is None
+    with pytest.raises(StreamError, match="overloaded"):
+        parse_stream_line(_event({"error": "Model is overloaded"}))
+
+
+def test_parse_whole_response():
+    assert parse_whole_response(json.dumps([{"generated_text": "Hi"}]).encode()) == "Hi"
+    assert parse_whole_response(b"[]") == ""
+    with pytest.raises(StreamError):
+        parse_whole_response(b'{"error": "loading"}')
+    assert is_event_stream("text/event-stream; charset=utf-8")
+    assert not is_event_stream(None)
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from modules.hf_cache import HFResponseCache
+
+MODEL = "facebook/bart-large-mnli"
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    def make(**kwargs):
+        kwargs.setdefault("memory_entries", 2)
+        kwargs.setdefault("default_ttl", 60)
+        kwargs.setdefault("model_ttls", {})
+        kwargs.setdefault("max_disk_entries", 100)
+        return HFResponseCache(str(tmp_path / "hf.db"), **kwargs)
+    return make
+
+
+def test_key_is_canonical():
+    assert HFResponseCache.key(MODEL, {"a": 1, "b": [1, 2]}) == HFResponseCache.key(MODEL, {"b": [1, 2], "a": 1})
+    assert HFResponseCache.key(MODEL, {"a": 1}) != HFResponseCache.key("other", {"a": 1})
+
+
+def test_memory_lru_falls_back_to_disk(make_cache):
+    cache = make_cache()
+    for i in range(3):
+        cache.put(MODEL, {"inputs": str(i)}, {"labels": [str(i)]})
+
+    assert cache.get(MODEL, {"inputs": "2"}) == {"labels": ["2"]}
+    # evicted from the 2-entry LRU, still on disk, then promoted back
+    assert cache.get(MODEL, {"inputs": "0"}) == {"labels": ["0"]}
+    assert cache.get(MODEL, {"inputs": "0"}) == {"labels": ["0"]}
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (2, 1, 0)
+
+
+def test_disk_tier_is_shared_between_instances(make_cache):
+    make_cache().put(MODEL, {"inputs": "x"}, [1])
+    assert make_cache().get(MODEL, {"inputs": "x"}) == [1]
+
+
+def test_entries_expire_after_the_model_ttl(make_cache):
+    cache = make_cache(model_ttls={MODEL: 0.05, "no-cache": 0})
+    cache.put(MODEL, {"inputs": "x"}, [1])
+    cache.put("other", {"inputs": "x"}, [2])
+    cache.put("no-cache", {"inputs": "x"}, [3])
+    time.sleep(0.06)
+
+    assert cache.get(MODEL, {"inputs": "x"}) is None
+    assert cache.get("other", {"inputs": "x"}) == [2]
+    assert cache.get("no-cache", {"inputs": "x"}) is None
+    assert cache.sweep() == 1
+
+
+def test_failures_and_sampled_generations_are_not_stored(make_cache):
+    cache = make_cache()
+    cache.put(MODEL, {"inputs": "x"}, {"error": "Model is loading"})
+    cache.put(MODEL, {"inputs": "y"}, [])
+    cache.put("gpt2", {"inputs": "z", "parameters": {"do_sample": True}}, [{"generated_text": "hi"}])
+
+    assert cache.get(MODEL, {"inputs": "x"}) is None
+    assert cache.get("gpt2", {"inputs": "z", "parameters": {"do_sample": True}}) is None
+    assert cache.stats()["skipped"] == 3
+
+
+def test_sweep_caps_disk_entries(make_cache):
+    cache = make_cache(max_disk_entries=2)
+    for i in range(4):
+        cache.put(MODEL, {"inputs": str(i)}, [i])
+        time.sleep(0.001)
+    assert cache.sweep() == 2
+    assert cache.stats()["disk_entries"] == 2
@@ -0,0 +1,145 @@
+import time
+
+import pytest
+
+from modules import huggingface_analyzer
+from modules.hf_cache import HFResponseCache
+from modules.huggingface_analyzer import HuggingFaceAnalyzer
+from modules.local_inference import InferenceBackend
+
+
+class _Backend(InferenceBackend):
+    name = "remote"
+
+    def __init__(self, answer=None, delay=0.0, namespace=""):
+        self.answer = answer
+        self.namespace = namespace
+        self.delay = delay
+        self.calls = []
+
+    def available(self):
+        return True
+
+    def cache_name(self, task, model_name):
+        return self.namespace + model_name
+
+    def run(self, task, model_name, payload, use_token=True, timeout=None):
+        self.calls.append((payload, timeout))
+        if self.delay:
+            time.sleep(self.delay)
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer(payload) if callable(self.answer) else self.answer
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.setenv("HUGGINGFACE_API_TOKEN", "test")
+    monkeypatch.setenv("HF_CACHE_ENABLED", "false")
+    analyzer = HuggingFaceAnalyzer()
+    analyzer.remote = _Backend()
+    return analyzer
+
+
+def test_concurrent_calls_pass_the_deadline_to_the_request(analyzer, monkeypatch):
+    monkeypatch.setenv("HF_CALL_TIMEOUT_SECONDS", "5")
+    analyzer.remote.answer = [{"label": "positive", "score": 1.0}]
+    model = analyzer.models["sentiment_analysis"]
+
+    results = analyzer._call_concurrently({"a": (model, {"inputs": "good"})})
+
+    assert results == {"a": [{"label": "positive", "score": 1.0}]}
+    (_, timeout), = analyzer.remote.calls
+    assert 4.0 < timeout <= 5.0
+
+
+def test_direct_calls_have_no_deadline(analyzer):
+    analyzer._make_api_call(analyzer.models["sentiment_analysis"], {"inputs": "good"})
+    assert analyzer.remote.calls[0][1] is None
+
+
+def test_expired_deadline_skips_the_request(analyzer):
+    model = analyzer.models["sentiment_analysis"]
+    assert analyzer._make_api_call(model, {"inputs": "good"}, deadline=time.time() - 1) is None
+    assert analyzer.remote.calls == []
+
+
+def _classified(question):
+    return {"sequence": question, "labels": ["technical", "skills"], "scores": [0.9, 0.1]}
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = HFResponseCache(str(tmp_path / "hf.db"))
+    monkeypatch.setattr(huggingface_analyzer, "get_hf_cache", lambda: cache)
+    return cache
+
+
+def test_question_batches_split_distinct_uncached_questions(analyzer, cache, monkeypatch):
+    monkeypatch.setenv("HF_QUESTION_BATCH_SIZE", "2")
+    model_name, payload = analyzer._question_call("cached?")
+    cache.put(model_name, payload, _classified("cached?"))
+
+    known, calls, batches = analyzer._question_batch_calls(["a", "cached?", "b", "a", "c"])
+
+    assert known == {"cached?": _classified("cached?")}
+    assert batches == {"batch0": ["a", "b"], "batch1": ["c"]}
+    assert calls["batch0"][1]["inputs"] == ["a", "b"]
+    assert calls["batch0"][1]["parameters"] == payload["parameters"]
+
+
+def test_collect_spreads_results_and_reports_failed_batches(analyzer, cache):
+    batches = {"batch0": ["a", "b"], "batch1": ["c"], "batch2": ["d", "e"], "batch3": ["f"]}
+    results = {
+        "batch0": ("remote-ns", [_classified("a"), _classified("b")]),
+        # a single input may come back unwrapped
+        "batch1": ("remote-ns", _classified("c")),
+        # length mismatch: the whole batch is retried
+        "batch2": ("remote-ns", [_classified("d")]),
+        "batch3": None,
+    }
+    known = {}
+
+    missing = analyzer._collect_question_batches(known, batches, results)
+
+    assert missing == ["d", "e", "f"]
+    assert known == {q: _classified(q) for q in "abc"}
+    assert cache.get("remote-ns", analyzer._question_call("c")[1]) == _classified("c")
+    assert cache.get("remote-ns", analyzer._question_call("d")[1]) is None
+
+
+def test_batches_are_cached_per_question_under_the_answering_backend(analyzer, cache, monkeypatch):
+    local = _Backend(RuntimeError("no model"), namespace="local:")
+    local.name = "local"
+    monkeypatch.setattr(analyzer, "_backends", lambda task: [local, analyzer.remote])
+    analyzer.remote.answer = lambda payload: [_classified(q) for q in payload["inputs"]]
+
+    results = analyzer.analyze_questions(["a", "b"])
+
+    assert [r["type"] for r in results] == ["technical", "technical"]
+    model_name = analyzer.models["question_classification"]
+    batch_payload = analyzer.remote.calls[0][0]
+    # the batch itself is not cached, each answer is, under the remote namespace
+    assert cache.get(model_name, batch_payload) is None
+    assert cache.get(model_name, analyzer._question_call("a")[1]) == _classified("a")
+    assert cache.get("local:" + model_name, analyzer._question_call("a")[1]) is None
+
+    # both namespaces are looked up, so the next run needs no call at all
+    analyzer.remote.calls.clear()
+    assert analyzer.analyze_questions(["b", "a"])[0]["type"] == "technical"
+    assert analyzer.remote.calls == []
+
+
+def test_failed_batch_falls_back_to_single_calls(analyzer, cache):
+    def answer(payload):
+        if isinstance(payload["inputs"], list):
+            return [_classified(payload["inputs"][0])]
+        return _classified(payload["inputs"])
+    analyzer.remote.answer = answer
+
+    results = analyzer.analyze_questions(["a", "b"])
+
+    assert [r["type"] for r in results] == ["technical", "technical"]
+    batch, *singles = [p["inputs"] for p, _ in analyzer.remote.calls]
+    assert batch == ["a", "b"]
+    assert sorted(singles) == ["a", "b"]
@@ -0,0 +1,123 @@
+import os
+import time
+
+from modules.jobs import DONE, FAILED, QUEUED, RUNNING, JobStore, TranscriptionJobQueue, _worker_id
+
+
+def _store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+def _set_worker(store, job_id, worker, heartbeat_at):
+    with store._connect() as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, worker = ?, heartbeat_at = ? WHERE id = ?",
+            (RUNNING, worker, heartbeat_at, job_id),
+        )
+
+
+def test_claim_is_exclusive(tmp_path):
+    store = _store(tmp_path)
+    job_id = store.create("/tmp/a.wav", "a.wav", {"model_name": "tiny"})
+
+    assert store.claim(job_id) is True
+    assert store.claim(job_id) is False
+    job = store.get(job_id)
+    assert job["status"] == RUNNING
+    assert job["worker"] == _worker_id()
+    assert job["options"] == {"model_name": "tiny"}
+
+
+def test_requeue_orphans_reclaims_expired_leases(tmp_path):
+    store = _store(tmp_path)
+    live = store.create("/tmp/live.wav", None, {})
+    gone = store.create("/tmp/gone.wav", None, {})
+    stale_queued = store.create("/tmp/queued.wav", None, {})
+    # same host and PID as a live process does not matter, only the lease does
+    _set_worker(store, live, "host:1:aaaa", time.time())
+    _set_worker(store, gone, "host:1:bbbb", time.time() - 120)
+    with store._connect() as conn:
+        conn.execute("UPDATE jobs SET worker = ?, heartbeat_at = ? WHERE id = ?", ("host:2:cccc", None, stale_queued))
+
+    assert sorted(store.requeue_orphans(60)) == sorted([gone, stale_queued])
+    assert store.get(live)["status"] == RUNNING
+    orphan = store.get(gone)
+    assert orphan["status"] == QUEUED and orphan["worker"] == _worker_id() and orphan["progress"] == 0
+    assert store.requeue_orphans(60) == []
+
+
+def test_heartbeat_renews_only_own_jobs(tmp_path):
+    store = _store(tmp_path)
+    mine = store.create("/tmp/mine.wav", None, {})
+    other = store.create("/tmp/other.wav", None, {})
+    _set_worker(store, mine, _worker_id(), time.time() - 120)
+    _set_worker(store, other, "host:1:dead", time.time() - 120)
+
+    assert store.heartbeat() == 1
+    assert store.requeue_orphans(60) == [other]
+
+
+def test_purge_finished_returns_audio_paths(tmp_path):
+    store = _store(tmp_path)
+    old = store.create("/tmp/old.wav", None, {})
+    store.finish(old, {"ok": True})
+    recent = store.create("/tmp/recent.wav", None, {})
+
+    assert store.purge_finished(time.time() + 1) == ["/tmp/old.wav"]
+    assert store.get(old) is None
+    assert store.get(recent)["status"] == QUEUED
+
+
+def _wait_for(queue, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in (DONE, FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_queue_runs_jobs_and_records_failures(tmp_path, monkeypatch):
+    monkeypatch.setenv("DELETE_INPUT_FILES", "true")
+    audio = tmp_path / "a.wav"
+    audio.write_bytes(b"RIFF")
+
+    def runner(path, options, report_progress):
+        if options.get("fail"):
+            raise RuntimeError("decode failed")
+        report_progress(0.5)
+        return {"text": os.path.basename(path)}
+
+    queue = TranscriptionJobQueue(runner, store=_store(tmp_path), max_workers=1)
+    ok = _wait_for(queue, queue.submit(str(audio), "a.wav"))
+    bad = _wait_for(queue, queue.submit(str(tmp_path / "b.wav"), "b.wav", {"fail": True}))
+
+    assert ok["status"] == DONE and ok["progress"] == 1 and ok["result"] == {"text": "a.wav"}
+    assert not audio.exists()
+    assert bad["status"] == FAILED and bad["error"] == "decode failed"
+
+
+def test_recover_reschedules_orphaned_jobs(tmp_path, monkeypatch):
+    monkeypatch.setenv("TRANSCRIBE_JOB_HEARTBEAT_SECONDS", "0")
+    store = _store(tmp_path)
+    job_id = store.create(str(tmp_path / "c.wav"), None, {})
+    _set_worker(store, job_id, "other-host:1:dead", time.time() - 600)
+
+    queue = TranscriptionJobQueue(lambda path, options, report: {"done": True}, store=store, max_workers=1)
+    assert queue.recover() == 1
+    assert _wait_for(queue, job_id)["result"] == {"done": True}
+
+
+def test_lease_check_picks_up_jobs_of_a_dead_sibling(tmp_path, monkeypatch):
+    monkeypatch.setenv("TRANSCRIBE_JOB_HEARTBEAT_SECONDS", "0.05")
+    monkeypatch.setenv("TRANSCRIBE_JOB_LEASE_SECONDS", "0.2")
+    store = _store(tmp_path)
+    queue = TranscriptionJobQueue(lambda path, options, report: {"done": True}, store=store, max_workers=1)
+    queue.recover()
+
+    # a sibling process started this job, then died while this process kept running
+    job_id = store.create(str(tmp_path / "d.wav"), None, {})
+    _set_worker(store, job_id, "host:7:sibling", time.time())
+    assert store.get(job_id)["status"] == RUNNING
+    assert _wait_for(queue, job_id)["result"] == {"done": True}
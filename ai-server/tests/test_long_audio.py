@@ -0,0 +1,84 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from modules import long_audio
+from modules.long_audio import SAMPLING_RATE, plan_chunks
+
+
+def _speech(*regions):
+    """VAD regions given in seconds."""
+    return [{"start": int(s * SAMPLING_RATE), "end": int(e * SAMPLING_RATE)} for s, e in regions]
+
+
+def _seconds(chunks):
+    return [(start / SAMPLING_RATE, end / SAMPLING_RATE) for start, end in chunks]
+
+
+def test_close_regions_merge_into_one_chunk():
+    chunks = plan_chunks(_speech((0, 5), (6, 10), (11.5, 20)), max_chunk_seconds=60, max_gap_seconds=2)
+    assert _seconds(chunks) == [(0, 20)]
+
+
+def test_long_pause_starts_a_new_chunk():
+    chunks = plan_chunks(_speech((0, 5), (8, 10), (10.5, 12)), max_chunk_seconds=60, max_gap_seconds=2)
+    assert _seconds(chunks) == [(0, 5), (8, 12)]
+
+
+def test_chunks_are_split_at_the_max_length():
+    regions = _speech(*[(i * 10, i * 10 + 9) for i in range(7)])
+    chunks = plan_chunks(regions, max_chunk_seconds=30, max_gap_seconds=2)
+    assert _seconds(chunks) == [(0, 29), (30, 59), (60, 69)]
+    assert all(end - start <= 30 * SAMPLING_RATE for start, end in chunks)
+
+
+def test_no_speech_no_chunks():
+    assert plan_chunks([], max_chunk_seconds=60, max_gap_seconds=2) == []
+
+
+class _Model:
+    """Stands in for a worker's WhisperModel: one segment per chunk, later chunks finish first."""
+
+    def transcribe(self, audio, language=None, beam_size=5, best_of=5):
+        seconds = len(audio) / SAMPLING_RATE
+        time.sleep(0.05 / seconds)
+        segments = [SimpleNamespace(start=0.0, end=seconds, text=f" {seconds:g}s ")]
+        return iter(segments), SimpleNamespace(language="en")
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=4)
+    monkeypatch.setattr(long_audio, "_WORKER_MODEL", _Model())
+    monkeypatch.setattr(long_audio, "_get_pool", lambda *args: pool)
+    yield pool
+    pool.shutdown()
+
+
+def test_segments_come_back_in_order_with_offsets(fake_pool, monkeypatch):
+    chunks = [(s * SAMPLING_RATE, e * SAMPLING_RATE) for s, e in ((0, 1), (5, 7), (20, 24))]
+    monkeypatch.setattr(long_audio, "detect_chunks", lambda audio: chunks)
+    audio = np.zeros(30 * SAMPLING_RATE, dtype=np.float32)
+    metadata = {}
+
+    segments = list(long_audio.iter_long_audio_segments(audio, "tiny", None, "cpu", "int8", metadata))
+
+    assert segments == [
+        {"start": 0.0, "end": 1.0, "text": "1s"},
+        {"start": 5.0, "end": 7.0, "text": "2s"},
+        {"start": 20.0, "end": 24.0, "text": "4s"},
+    ]
+    assert metadata["chunks"] == 3
+    assert metadata["speech_duration"] == 7.0
+    assert metadata["language"] == "en"
+
+
+def test_silent_audio_yields_nothing(monkeypatch):
+    monkeypatch.setattr(long_audio, "detect_chunks", lambda audio: [])
+    monkeypatch.setattr(long_audio, "_get_pool", pytest.fail)
+    metadata = {}
+    assert list(long_audio.iter_long_audio_segments(np.zeros(10), "tiny", "en", "cpu", "int8", metadata)) == []
+    assert metadata["chunks"] == 0 and metadata["language"] == "en"
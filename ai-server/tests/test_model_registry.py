@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+from modules import model_registry
+from modules.model_registry import ModelRegistry
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Stub loader: records each load and returns a fresh object per call."""
+    loads = []
+
+    def load(backend, model_name, device, compute_type, cpu_threads=0, num_workers=1):
+        loads.append((backend, model_name, device, compute_type, cpu_threads, num_workers))
+        time.sleep(0.05)
+        return object()
+
+    monkeypatch.setattr(model_registry, "_load_model", load)
+    # sizes come from the per-checkpoint estimates (tiny 150 MB, base 290 MB, small 950 MB)
+    monkeypatch.setattr(model_registry, "_current_rss_mb", lambda: None)
+    return loads
+
+
+def _resident(registry):
+    return [m["model"] for m in registry.stats()["models"]]
+
+
+def test_models_are_keyed_by_every_setting(loads):
+    registry = ModelRegistry(budget_mb=0, idle_seconds=0)
+    model = registry.get("faster-whisper", "tiny", "cpu", "int8", 4, 1)
+
+    assert registry.get("faster-whisper", "tiny", "cpu", "int8", 4, 1) is model
+    assert registry.get("faster-whisper", "tiny", "cpu", "float32", 4, 1) is not model
+    assert registry.get("faster-whisper", "tiny", "cpu", "int8", 2, 1) is not model
+    assert registry.get("whisper", "tiny", "cpu", "int8", 4, 1) is not model
+    assert len(loads) == 4
+
+    stats = registry.stats()
+    assert (stats["hits"], stats["misses"], stats["loads"]) == (1, 4, 4)
+
+
+def test_budget_evicts_least_recently_used_first(loads):
+    registry = ModelRegistry(budget_mb=1200, idle_seconds=0)
+    registry.get("whisper", "tiny")
+    registry.get("whisper", "base")
+    registry.get("whisper", "tiny")  # base is now the least recently used
+    registry.get("whisper", "small")  # 150 + 290 + 950 > 1200
+
+    assert _resident(registry) == ["tiny", "small"]
+    assert registry.stats()["evictions"] == 1
+
+    registry.get("whisper", "tiny")
+    registry.get("whisper", "base")  # small goes, tiny was used more recently
+    assert _resident(registry) == ["tiny", "base"]
+    assert registry.stats()["resident_mb"] == 440.0
+
+
+def test_a_model_over_budget_on_its_own_stays_loaded(loads):
+    registry = ModelRegistry(budget_mb=100, idle_seconds=0)
+    model = registry.get("whisper", "small")
+    assert registry.get("whisper", "small") is model
+    assert len(loads) == 1
+
+
+def test_idle_models_expire(loads):
+    registry = ModelRegistry(budget_mb=0, idle_seconds=60)
+    registry.get("whisper", "tiny")
+    registry.get("whisper", "base")
+    for key, entry in registry._entries.items():
+        if key[1] == "tiny":
+            entry.last_used -= 120
+
+    registry.get("whisper", "base")
+    assert _resident(registry) == ["base"]
+
+    registry.get("whisper", "tiny")
+    assert len(loads) == 3
+
+
+def test_concurrent_gets_load_once(loads):
+    registry = ModelRegistry(budget_mb=0, idle_seconds=0)
+    barrier = threading.Barrier(8)
+    models = []
+
+    def get():
+        barrier.wait()
+        models.append(registry.get("faster-whisper", "base", "cpu", "int8"))
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert len(models) == 8 and all(m is models[0] for m in models)
+    assert registry.stats()["hits"] == 7
+
+
+def test_failed_load_is_counted_and_not_cached(monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("no such model")
+
+    monkeypatch.setattr(model_registry, "_load_model", fail)
+    registry = ModelRegistry(budget_mb=0, idle_seconds=0)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            registry.get("whisper", "tiny")
+    assert registry.stats()["load_failures"] == 2
+    assert _resident(registry) == []
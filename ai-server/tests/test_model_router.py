@@ -0,0 +1,81 @@
+import asyncio
+
+import aiohttp
+import pytest
+import requests
+
+from modules.model_router import (
+    AUTH, CLIENT, ERROR, NETWORK, NOT_FOUND, RATE_LIMITED, SERVER, TIMEOUT, UNAVAILABLE,
+    GenerationRouter, classify_error,
+)
+
+
+def _http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status}", response=response)
+
+
+def _aiohttp_error(status):
+    return aiohttp.ClientResponseError(request_info=None, history=(), status=status)
+
+
+@pytest.mark.parametrize("status, kind", [
+    (401, AUTH), (403, AUTH), (404, NOT_FOUND), (429, RATE_LIMITED),
+    (503, UNAVAILABLE), (500, SERVER), (502, SERVER), (400, CLIENT), (422, CLIENT),
+])
+def test_http_status(status, kind):
+    assert classify_error(_http_error(status)) == kind
+    assert classify_error(_aiohttp_error(status)) == kind
+
+
+class _Key:
+    host, port, ssl = "localhost", 1, None
+
+
+@pytest.mark.parametrize("error, kind", [
+    (TimeoutError(), TIMEOUT),
+    (asyncio.TimeoutError(), TIMEOUT),
+    (requests.exceptions.ReadTimeout(), TIMEOUT),
+    (requests.exceptions.ConnectTimeout(), TIMEOUT),
+    (aiohttp.ServerTimeoutError(), TIMEOUT),
+    (requests.exceptions.ConnectionError(), NETWORK),
+    (ConnectionResetError(), NETWORK),
+    (aiohttp.ClientConnectorError(_Key(), OSError(111, "refused")), NETWORK),
+    (aiohttp.ServerDisconnectedError(), NETWORK),
+    (ValueError("bad json"), ERROR),
+])
+def test_transport_errors(error, kind):
+    assert classify_error(error) == kind
+
+
+def test_router_cools_down_and_reorders(monkeypatch):
+    monkeypatch.setenv("HF_ROUTER_FAILURE_THRESHOLD", "2")
+    router = GenerationRouter()
+    models = ["a", "b", "c"]
+    assert router.order(models) == models
+
+    router.record_failure("a", NOT_FOUND)
+    assert router.order(models) == ["b", "c"]
+
+    # one transient failure only lowers b's success rate
+    router.record_failure("b", RATE_LIMITED)
+    assert router.order(models) == ["c", "b"]
+    router.record_failure("b", RATE_LIMITED)
+    assert router.order(models) == ["c"]
+
+    router.record_success("c", 30.0)
+    router.record_failure("c", SERVER)
+    # every model down: still try them all, soonest recovery first
+    router.record_failure("c", SERVER)
+    assert router.order(models) == ["b", "c", "a"]
+
+    router.record_success("a", 1.0)
+    assert router.order(models)[0] == "a"
+
+
+def test_faster_model_ranks_first():
+    router = GenerationRouter()
+    router.record_success("slow", 20.0)
+    router.record_success("fast", 2.0)
+    assert router.order(["slow", "fast"]) == ["fast", "slow"]
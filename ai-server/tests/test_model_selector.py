@@ -0,0 +1,79 @@
+import pytest
+
+from modules.model_selector import ModelSelector
+
+MODELS = ["tiny", "base", "small", "medium"]
+
+
+@pytest.fixture
+def selector(monkeypatch):
+    monkeypatch.delenv("WHISPER_RTF_DEFAULTS", raising=False)
+    return ModelSelector(MODELS)
+
+
+def test_most_accurate_config_within_the_budget(selector):
+    # 60s of audio: small needs 21s (beam 5) or 11.6s (beam 1), base at beam 5 needs 7.2s
+    choice = selector.choose(60, latency_budget=10)
+    assert (choice["model"], choice["beam_size"], choice["best_of"]) == ("base", 5, 5)
+    assert choice["predicted_seconds"] == pytest.approx(7.2)
+    assert choice["reason"] == "within_budget"
+
+    choice = selector.choose(60, latency_budget=12)
+    assert (choice["model"], choice["beam_size"], choice["best_of"]) == ("small", 1, 1)
+
+
+def test_fastest_config_when_nothing_fits(selector):
+    choice = selector.choose(60, latency_budget=0.1)
+    assert (choice["model"], choice["beam_size"]) == ("tiny", 1)
+    assert choice["reason"] == "over_budget_fastest"
+
+
+def test_no_budget_takes_the_tier_ceiling(selector):
+    assert selector.choose(60)["model"] == "medium"
+    assert selector.choose(60)["reason"] == "tier"
+
+
+def test_quality_tiers_limit_models_and_beams(selector):
+    assert selector._candidates("fast", 5) == [("base", 1), ("tiny", 1)]
+    assert selector._candidates("balanced", 5) == [
+        ("small", 2), ("small", 1), ("base", 2), ("base", 1), ("tiny", 2), ("tiny", 1),
+    ]
+    assert selector._candidates("accurate", 5)[0] == ("medium", 5)
+    assert selector._candidates(None, 1) == [(m, 1) for m in reversed(MODELS)]
+
+    choice = selector.choose(60, quality="fast")
+    assert (choice["model"], choice["beam_size"]) == ("base", 1)
+
+    with pytest.raises(ValueError):
+        selector.choose(60, quality="best")
+
+
+def test_work_in_flight_stretches_the_prediction(selector):
+    with selector.track():
+        assert selector.queue_depth() == 1
+        choice = selector.choose(60, latency_budget=10)
+    # base at beam 5 now needs 14.4s, at beam 1 7.9s
+    assert (choice["model"], choice["beam_size"]) == ("base", 1)
+    assert choice["queue_depth"] == 1
+    assert selector.queue_depth() == 0
+
+    selector.register_queue_depth(lambda: 3)
+    assert selector.queue_depth() == 3
+
+
+def test_observations_converge_by_ewma(monkeypatch):
+    monkeypatch.delenv("WHISPER_RTF_DEFAULTS", raising=False)
+    selector = ModelSelector(MODELS, alpha=0.5)
+
+    # the first measurement replaces the default; beam 1 is normalized to beam 5
+    selector.observe("small", 1, audio_seconds=100, decode_seconds=55)
+    assert selector.rtf("small") == pytest.approx(1.0)
+
+    selector.observe("small", 5, audio_seconds=100, decode_seconds=20)
+    assert selector.rtf("small") == pytest.approx(0.6)
+    for _ in range(20):
+        selector.observe("small", 5, audio_seconds=100, decode_seconds=20)
+    assert selector.rtf("small") == pytest.approx(0.2, abs=1e-4)
+
+    selector.observe("small", 5, audio_seconds=0, decode_seconds=20)
+    assert selector.stats()["observations"] == {"small": 22}
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from modules.single_flight import SharedCallError, SingleFlight
+
+
+@pytest.fixture
+def group(monkeypatch):
+    monkeypatch.setenv("SINGLE_FLIGHT_ENABLED", "true")
+    return SingleFlight(wait_seconds=5)
+
+
+def _run_together(group, payloads, fn, namespace="analyze"):
+    results = [None] * len(payloads)
+    errors = [None] * len(payloads)
+
+    def call(i):
+        try:
+            results[i] = group.do(namespace, payloads[i], fn)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(payloads))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_key_ignores_key_order():
+    assert SingleFlight.key("a", {"x": 1, "y": [1, 2]}) == SingleFlight.key("a", {"y": [1, 2], "x": 1})
+    assert SingleFlight.key("a", {"x": 1}) != SingleFlight.key("b", {"x": 1})
+
+
+def test_identical_concurrent_calls_share_one_run(group):
+    runs = []
+
+    def work():
+        runs.append(1)
+        time.sleep(0.1)
+        return {"score": 1}
+
+    results, errors = _run_together(group, [{"cv": "same"}] * 5, work)
+
+    assert len(runs) == 1
+    assert results == [{"score": 1}] * 5 and errors == [None] * 5
+    stats = group.stats("analyze")["endpoints"]["analyze"]
+    assert (stats["leaders"], stats["followers"], stats["in_flight"]) == (1, 4, 0)
+
+
+def test_different_payloads_run_separately(group):
+    runs = []
+
+    def work():
+        runs.append(1)
+        time.sleep(0.05)
+        return len(runs)
+
+    _run_together(group, [{"cv": "a"}, {"cv": "b"}], work)
+    assert len(runs) == 2
+
+
+def test_followers_get_the_leaders_exception(group):
+    def work():
+        time.sleep(0.1)
+        raise RuntimeError("model down")
+
+    _, errors = _run_together(group, [{"q": 1}] * 3, work)
+    assert all(str(e) == "model down" for e in errors)
+    leader_error = next(e for e in errors if type(e) is RuntimeError)
+    followers = [e for e in errors if e is not leader_error]
+    # each follower raises its own exception, chained to the leader's
+    assert len(followers) == 2 and followers[0] is not followers[1]
+    assert all(isinstance(e, SharedCallError) and e.__cause__ is leader_error for e in followers)
+    assert group.stats("analyze")["endpoints"]["analyze"]["errors"] == 1
+
+
+def test_nothing_is_kept_after_the_leader_finishes(group):
+    runs = []
+    group.do("analyze", {"q": 1}, lambda: runs.append(1))
+    group.do("analyze", {"q": 1}, lambda: runs.append(1))
+    assert len(runs) == 2
+
+
+def test_slow_leader_releases_followers_after_the_wait(monkeypatch):
+    monkeypatch.setenv("SINGLE_FLIGHT_ENABLED", "true")
+    group = SingleFlight(wait_seconds=0.05)
+    release = threading.Event()
+    runs = []
+
+    def work():
+        runs.append(1)
+        if len(runs) == 1:
+            release.wait(2)
+        return len(runs)
+
+    leader = threading.Thread(target=group.do, args=("t", {"a": 1}, work))
+    leader.start()
+    time.sleep(0.02)
+    assert group.do("t", {"a": 1}, work) == 2
+    release.set()
+    leader.join()
+    assert group.stats("t")["endpoints"]["t"]["wait_timeouts"] == 1
+
+
+def test_disabled_runs_every_call(monkeypatch):
+    monkeypatch.setenv("SINGLE_FLIGHT_ENABLED", "false")
+    group = SingleFlight()
+    runs = []
+    _run_together(group, [{"q": 1}] * 3, lambda: runs.append(1))
+    assert len(runs) == 3
+
+
+def test_async_followers_survive_a_cancelled_leader(group):
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        leader = asyncio.ensure_future(group.do_async("gen", {"p": 1}, work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(group.do_async("gen", {"p": 1}, work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == "done"
+    assert len(runs) == 1
+
+
+def test_async_followers_get_their_own_exception(group):
+    async def work():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("model down")
+
+    async def main():
+        calls = [group.do_async("gen", {"p": 1}, work) for _ in range(3)]
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    leader_error, *followers = asyncio.run(main())
+    assert type(leader_error) is RuntimeError
+    assert all(isinstance(e, SharedCallError) and e.__cause__ is leader_error for e in followers)
+    assert followers[0] is not followers[1] and str(followers[0]) == "model down"
@@ -0,0 +1,113 @@
+import pytest
+
+from modules import backend_health, transcribe, transcript_cache
+from modules.transcript_cache import TranscriptCache
+
+
+def test_key_covers_every_option():
+    base = TranscriptCache.key("abc", "small", "ar", 5, 5, None)
+    assert base == TranscriptCache.key("abc", "small", "ar", 5, 5, None)
+    assert base != TranscriptCache.key("abd", "small", "ar", 5, 5, None)
+    assert base != TranscriptCache.key("abc", "small", "ar", 5, 5, True)
+    assert base != TranscriptCache.key("abc", "small", None, 5, 5, None)
+
+
+def test_get_put_and_lru_eviction(tmp_path):
+    cache = TranscriptCache(str(tmp_path), max_bytes=0)
+    assert cache.get("k1") is None
+    cache.put("k1", {"text": "مرحبا"})
+    assert cache.get("k1") == {"text": "مرحبا"}
+
+    small = TranscriptCache(str(tmp_path / "small"), max_bytes=150)
+    for i in range(4):
+        small.put(f"key{i}", {"text": "x" * 60})
+    stats = small.stats()
+    assert stats["evictions"] > 0 and stats["size_bytes"] <= 150
+    assert small.get("key3") is not None and small.get("key0") is None
+
+
+def test_overwrite_does_not_grow_tracked_size(tmp_path):
+    cache = TranscriptCache(str(tmp_path), max_bytes=10_000)
+    cache._size = 0
+    cache.put("k", {"text": "x" * 100})
+    first = cache.stats()["size_bytes"]
+    cache.put("k", {"text": "x" * 100})
+    assert cache.stats()["size_bytes"] == first
+    cache.put("k", {"text": "x" * 10})
+    assert cache.stats()["size_bytes"] == first - 90
+
+
+class _Decoded:
+    def metadata(self):
+        return {"duration": 3.0}
+
+
+class _FakeSource:
+    """Stands in for AudioSource; counts decodes."""
+
+    sha256 = "feedface"
+    name = "fake.wav"
+    duration = 3.0
+
+    def __init__(self):
+        self.decodes = 0
+
+    def decode(self):
+        self.decodes += 1
+        return _Decoded()
+
+
+@pytest.fixture
+def fake_transcriber(tmp_path, monkeypatch):
+    monkeypatch.setenv("TRANSCRIPT_CACHE_ENABLED", "true")
+    monkeypatch.setenv("TRANSCRIPT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("TRANSCRIBE_DETECT_LANGUAGE", "false")
+    monkeypatch.setenv("TRANSCRIBE_LANGUAGE", "en")
+    monkeypatch.setattr(transcript_cache, "_CACHE", None)
+    monkeypatch.setitem(backend_health._PROBES, "faster-whisper", lambda: None)
+    monkeypatch.setitem(backend_health._PROBES, "whisper", lambda: None)
+    health = backend_health.BackendHealth()
+    monkeypatch.setattr(transcribe, "get_backend_health", lambda: health)
+
+    runs = []
+
+    def fake_backend(mode):
+        def run(source, model_name, language, decode, metadata):
+            runs.append(mode)
+            metadata["model"] = f"{mode}:{model_name}"
+            yield {"start": 0.0, "end": 1.0, "text": mode}
+        return run
+
+    monkeypatch.setattr(transcribe, "_long_audio_segments", fake_backend("long"))
+    monkeypatch.setattr(transcribe, "_faster_whisper_segments", fake_backend("plain"))
+    monkeypatch.setattr(transcribe, "_whisper_segments", fake_backend("whisper"))
+    return runs
+
+
+def _transcribe_once(source, **options):
+    metadata = {}
+    texts = [s["text"] for s in transcribe.iter_segments(source, "tiny", metadata, **options)]
+    return texts, metadata.get("cached", False)
+
+
+def test_iter_segments_caches_per_long_audio_mode_before_decoding(fake_transcriber):
+    source = _FakeSource()
+    assert _transcribe_once(source, long_audio=True) == (["long"], False)
+    assert source.decodes == 1
+
+    again = _FakeSource()
+    assert _transcribe_once(again, long_audio=True) == (["long"], True)
+    assert again.decodes == 0
+
+    assert _transcribe_once(_FakeSource(), long_audio=False) == (["plain"], False)
+    assert fake_transcriber == ["long", "plain"]
+
+
+def test_cache_key_includes_pinned_backend_and_compute_type(fake_transcriber, monkeypatch):
+    assert _transcribe_once(_FakeSource(), long_audio=False) == (["plain"], False)
+    assert _transcribe_once(_FakeSource(), long_audio=False, backend="whisper") == (["whisper"], False)
+    assert _transcribe_once(_FakeSource(), long_audio=False, backend="whisper") == (["whisper"], True)
+
+    monkeypatch.setenv("WHISPER_COMPUTE_TYPE", "float32")
+    assert _transcribe_once(_FakeSource(), long_audio=False) == (["plain"], False)
+    assert fake_transcriber == ["plain", "whisper", "plain"]